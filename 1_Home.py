@@ -1,5 +1,7 @@
 import streamlit as st
 
+from olist import assets
+
 # --- CONFIGURAÇÃO INICIAL E ESTILO ---
 
 st.set_page_config(
@@ -22,7 +24,11 @@ with st.container():
     
     col1, col2 = st.columns([1, 3])
     with col1:
-        st.image("me.jpg", caption="Caio Alexandre", use_container_width=True)
+        # Bytes da foto já em memória (`olist.assets`): nada é lido do disco nem recodificado
+        try:
+            st.image(assets.image_variant("me.jpg"), caption="Caio Alexandre", use_container_width=True)
+        except FileNotFoundError:
+            st.error("Erro: Arquivo 'me.jpg' não encontrado.")
 
     with col2:
         st.markdown('<h2 class="intro-title" style="text-align: left;">Olá, me chamo <span class="highlight">Caio Alexandre dos Santos</span>.</h2>', unsafe_allow_html=True)
@@ -34,14 +40,14 @@ with st.container():
         # Substitua 'curriculo.pdf' pelo nome EXATO do seu arquivo de currículo
         curriculo_filename = "Curriculo_Caio.pdf"
 
+        # O PDF é lido uma única vez por processo e servido da memória nas visitas seguintes
         try:
-            with open(curriculo_filename, "rb") as file:
-                btn = st.download_button(
-                    label="Baixar Currículo",
-                    data=file,
-                    file_name=f"Curriculo_Caio.pdf", # Nome que o arquivo terá ao ser baixado
-                    mime="application/pdf"
-                )
+            btn = st.download_button(
+                label="Baixar Currículo",
+                data=assets.read_bytes(curriculo_filename),
+                file_name=f"Curriculo_Caio.pdf", # Nome que o arquivo terá ao ser baixado
+                mime="application/pdf"
+            )
         except FileNotFoundError:
             st.error(f"Erro: Arquivo '{curriculo_filename}' não encontrado. Por favor, verifique se o arquivo está na mesma pasta que o script.")
 
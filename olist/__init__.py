@@ -0,0 +1 @@
+# Camada de dados e cálculos do dashboard da Olist (usada pelas páginas em `pages/`).
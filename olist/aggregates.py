@@ -0,0 +1,349 @@
+# Cálculos de cada página de análise, separados da renderização e memorizados.
+#
+# Cada função recebe o dataset (`OlistData`/`SharedData`) ou os cubos (`OlistCubes`) e
+# os parâmetros da página (filtros da barra lateral, top N, quantil de corte, limites dos
+# grupos de fotos...) e devolve um objeto pequeno com tudo o que a página mostra. Nenhuma
+# delas desenha nada nem lê o estado do Streamlit, então também servem ao benchmark e a
+# scripts.
+#
+# O resultado fica em memória por processo, dividido entre as sessões, com a chave
+# (impressão digital dos dados, parâmetros): voltar a uma página já visitada não refaz
+# nenhuma conta do pandas. Sem impressão digital (ex.: cubos já filtrados com `where`,
+# tabelas montadas à mão) a função só calcula. Os resultados são compartilhados: quem os
+# usa não deve alterá-los.
+import functools
+import inspect
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from olist import contingency, features, groupstats, resampling, summaries
+
+# Resultados guardados por função (os mais antigos saem primeiro)
+MEMO_SIZE = 128
+MAIN_PAYMENT_TYPES = ('credit_card', 'boleto', 'voucher', 'debit_card')
+DISCRETE_TABLES = {'payment_installments': 'pagamentos', 'product_photos_qty': 'produtos'}
+
+
+def freeze(value):
+    # Versão hashable de um parâmetro (listas, dicionários e arrays de filtros)
+    if isinstance(value, dict):
+        return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, pd.Index, np.ndarray)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def memoize(fn=None, *, ignore=()):
+    # Memoriza pela impressão digital do primeiro argumento e pelos demais argumentos (com
+    # os valores padrão preenchidos: `f(x, filtros)` e `f(x, filters=filtros)` dão a mesma
+    # chave), menos os de `ignore` (que não mudam o resultado, como o número de processos).
+    # Se outra thread já está calculando a mesma chave (ex.: o aquecimento de
+    # `olist.warmup`), espera por ela em vez de repetir a conta
+    if fn is None:
+        return functools.partial(memoize, ignore=ignore)
+    cache = OrderedDict()
+    running = {}
+    lock = threading.Lock()
+    signature = inspect.signature(fn)
+
+    @functools.wraps(fn)
+    def wrapper(source, *args, **kwargs):
+        fingerprint = getattr(source, 'fingerprint', '')
+        if not fingerprint:
+            return fn(source, *args, **kwargs)
+        bound = signature.bind(source, *args, **kwargs)
+        bound.apply_defaults()
+        key = (fingerprint, freeze([(k, v) for k, v in list(bound.arguments.items())[1:] if k not in ignore]))
+        with lock:
+            if key in cache:
+                cache.move_to_end(key)
+                return cache[key]
+            pending = running.get(key)
+            if pending is None:
+                pending = running[key] = threading.Event()
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            pending.wait()
+            with lock:
+                if key in cache:
+                    return cache[key]
+            return fn(source, *args, **kwargs)  # o cálculo da outra thread falhou
+        try:
+            result = fn(source, *args, **kwargs)
+            with lock:
+                cache[key] = result
+                while len(cache) > MEMO_SIZE:
+                    cache.popitem(last=False)
+        finally:
+            with lock:
+                del running[key]
+            pending.set()
+        return result
+
+    wrapper.cache_clear = cache.clear
+    return wrapper
+
+
+# --- Análise Descritiva Geral ---
+
+@dataclass(frozen=True)
+class DescriptiveSummary:
+    resumo_nota: pd.Series
+    moda_nota: float
+    resumo_preco: pd.Series
+    valores_nota: np.ndarray
+    contagens_nota: np.ndarray
+    box_nota: pd.DataFrame
+
+
+@memoize
+def descriptive_summary(data):
+    review_score = data.pedidos['review_score']
+    valores, contagens = summaries.discrete_counts(review_score)
+    return DescriptiveSummary(
+        resumo_nota=review_score.describe(), moda_nota=review_score.mode()[0],
+        resumo_preco=data.itens['price'].describe(),
+        valores_nota=valores, contagens_nota=contagens,
+        box_nota=summaries.box_stats_from_counts(valores, contagens, 'review_score'),
+    )
+
+
+@dataclass(frozen=True)
+class PriceFreight:
+    correlacao: float
+    fit: dict
+    grade: tuple
+
+
+def _price_freight_filtered(data, quantile_threshold):
+    # Itens com preço e frete abaixo do quantil de corte (tira a cauda longa dos gráficos)
+    df = data.itens[['price', 'freight_value']].dropna()
+    return df[(df['price'] < df['price'].quantile(quantile_threshold)) &
+              (df['freight_value'] < df['freight_value'].quantile(quantile_threshold))]
+
+
+@memoize
+def price_freight(data, quantile_threshold=0.99):
+    # Correlação em todos os itens; a reta OLS e a grade de densidade, nos itens filtrados
+    correlacao = summaries.ols_fit(data.itens['price'], data.itens['freight_value'])['r']
+    df = _price_freight_filtered(data, quantile_threshold)
+    return PriceFreight(correlacao=correlacao, fit=summaries.ols_fit(df['price'], df['freight_value']),
+                        grade=summaries.density_grid(df['price'], df['freight_value']))
+
+
+@memoize
+def price_freight_sample(data, quantile_threshold=0.99, max_points=5000):
+    # Amostra estratificada por preço dos itens filtrados, para o gráfico de pontos
+    df = _price_freight_filtered(data, quantile_threshold)
+    return df.iloc[summaries.stratified_sample(df['price'], max_points=max_points)].reset_index(drop=True)
+
+
+@memoize
+def discrete_distribution(data, variable):
+    # Contagens e resumo do box de uma variável discreta (parcelas, fotos...)
+    valores, contagens = summaries.discrete_counts(getattr(data, DISCRETE_TABLES[variable])[variable])
+    return valores, contagens, summaries.box_stats_from_counts(valores, contagens, variable)
+
+
+# --- Páginas filtradas (a partir dos cubos) ---
+
+@dataclass(frozen=True)
+class StateSummary:
+    valor_medio: pd.DataFrame
+    top_categorias: pd.DataFrame
+
+
+@memoize
+def state_summary(cubes, filters, top_n=15):
+    cubes = cubes.where(**filters)
+    pedidos = cubes.pedidos
+    valor_medio = pedidos.total('customer_state', 'total_order_value_sum') / pedidos.total('customer_state', 'total_order_value_n')
+    valor_medio = valor_medio.dropna().sort_values(ascending=False).rename_axis('customer_state').reset_index(name='total_order_value')
+    categorias = cubes.itens.total('product_category_name_english')
+    top = categorias[categorias > 0].nlargest(top_n).astype(int).reset_index()
+    top.columns = ['Categoria', 'Número de Pedidos']
+    return StateSummary(valor_medio=valor_medio, top_categorias=top)
+
+
+@dataclass(frozen=True)
+class SeasonalSummary:
+    media_mensal: pd.DataFrame
+    por_dia_semana: pd.DataFrame
+
+
+@memoize
+def seasonal_summary(cubes, filters):
+    cubes = cubes.where(**filters)
+    # Média de pedidos de cada mês do ano, só com os meses (ano-mês) que tiveram pedidos
+    vendas_mensais = cubes.pedidos.total('year_month')
+    vendas_mensais = vendas_mensais[vendas_mensais > 0]
+    media_mensal = vendas_mensais.groupby(vendas_mensais.index % 100).mean().rename_axis('month')
+    media_mensal = media_mensal.reindex(range(1, 13)).dropna().reset_index(name='order_id')
+    media_mensal['month_name'] = [features.MONTH_NAMES[m - 1] for m in media_mensal['month']]
+    por_dia = cubes.pedidos.total('weekday').astype(int)
+    return SeasonalSummary(
+        media_mensal=media_mensal,
+        por_dia_semana=pd.DataFrame({'day_of_week': features.DAY_NAMES, 'order_id': por_dia.to_numpy()}),
+    )
+
+
+@dataclass(frozen=True)
+class CategorySummary:
+    box: pd.DataFrame
+    ordem_mediana: pd.Index
+    estatisticas: pd.DataFrame
+
+
+@memoize
+def category_summary(cubes, filters, top_n=10):
+    cubes = cubes.where(**filters)
+    # Contagem de itens por categoria e nota; as categorias mais populares são as de mais itens
+    notas = cubes.itens.total(['product_category_name_english', 'review_score'])
+    itens_categoria = notas.sum(axis=1)
+    top = itens_categoria[itens_categoria > 0].nlargest(top_n).index
+    notas_top = notas.loc[top]
+
+    # Quartis, cercas e atípicos calculados do vetor de contagens das notas de cada categoria:
+    # o gráfico recebe só um resumo por categoria
+    box = pd.concat([summaries.box_stats_from_counts(notas_top.columns[c > 0], c[c > 0], categoria)
+                     for categoria, c in notas_top.iterrows()]) if len(top) else pd.DataFrame()
+
+    momentos = cubes.itens.moments('product_category_name_english', 'review_score').loc[top]
+    estatisticas = groupstats.stats_from_sums(momentos['count'], momentos['sum'], momentos['sumsq'], momentos.index)
+    estatisticas = estatisticas[['mean', 'std', 'var']].rename_axis('Categoria').reset_index()
+    estatisticas.columns = ['Categoria', 'Média', 'Desvio Padrão', 'Variância']
+    return CategorySummary(box=box, ordem_mediana=box['median'].sort_values(ascending=False).index if len(box) else pd.Index([]),
+                           estatisticas=estatisticas.sort_values(by='Média', ascending=False))
+
+
+@memoize
+def payment_summary(cubes, filters, payment_types=MAIN_PAYMENT_TYPES, confidence=0.95):
+    # Média, contagem, erro padrão e IC t de todos os tipos numa única passada, a partir da
+    # contagem, soma e soma dos quadrados das notas por tipo de pagamento
+    momentos = cubes.where(**filters).pagamentos.moments('payment_type', 'review_score')
+    momentos = momentos[momentos.index.isin(payment_types)]
+    agg = groupstats.stats_from_sums(momentos['count'], momentos['sum'], momentos['sumsq'], momentos.index,
+                                     confidence=confidence)
+    return agg.rename(columns={'ci_margin': 'confidence_margin'}).rename_axis('payment_type').reset_index()
+
+
+# --- Fotos vs. vendas (a partir da tabela de produtos) ---
+
+@dataclass(frozen=True)
+class PhotoSummary:
+    grupos: list
+    estatisticas: pd.DataFrame
+    box: pd.DataFrame
+    vendas_poucas: np.ndarray
+    vendas_muitas: np.ndarray
+    t_stat: float
+    p_value: float
+
+
+def photo_groups(few=1, many=3):
+    # Rótulos dos grupos: até `few` fotos, entre `few` e `many`, mais de `many`
+    first = '1 Foto' if few == 1 else f'≤ {few} Fotos'
+    middle = f'{few + 1} Fotos' if many == few + 1 else f'{few + 1}-{many} Fotos'
+    return [first, middle, f'> {many} Fotos']
+
+
+@memoize
+def photo_summary(data, few=1, many=3):
+    # A tabela de produtos já traz o total de vendas (pedidos distintos) e o número de fotos
+    df = data.produtos[['total_vendas', 'product_photos_qty']].dropna()
+    grupos = photo_groups(few, many)
+    fotos = df['product_photos_qty'].to_numpy()
+    codigo = np.select([fotos <= few, fotos > many], [0, 2], default=1)
+    vendas = df['total_vendas'].to_numpy()
+    estatisticas = groupstats.grouped_stats(codigo, vendas, grupos, order_stats=True).reindex(grupos)
+
+    # Teste de Welch direto das estatísticas suficientes (média, desvio, n) de cada grupo
+    poucas, muitas = estatisticas.loc[grupos[0]], estatisticas.loc[grupos[2]]
+    t_stat = p_value = np.nan
+    if poucas['count'] >= 2 and muitas['count'] >= 2:
+        from scipy import stats
+        t_stat, p_value = stats.ttest_ind_from_stats(poucas['mean'], poucas['std'], poucas['count'],
+                                                     muitas['mean'], muitas['std'], muitas['count'],
+                                                     equal_var=False)
+    return PhotoSummary(grupos=grupos, estatisticas=estatisticas,
+                        box=summaries.box_stats(df['total_vendas'], pd.Categorical.from_codes(codigo, grupos)),
+                        vendas_poucas=vendas[codigo == 0], vendas_muitas=vendas[codigo == 2],
+                        t_stat=float(t_stat), p_value=float(p_value))
+
+
+@dataclass(frozen=True)
+class PhotoResampling:
+    ic_poucas: tuple
+    ic_muitas: tuple
+    p_permutacao: float
+
+
+@memoize(ignore=('resumo', 'workers'))
+def photo_resampling(source, resumo, few=1, many=3, n_resamples=resampling.DEFAULT_RESAMPLES, seed=0, workers=1):
+    # IC bootstrap das médias de vendas e valor-p do teste de permutação entre os grupos de
+    # `resumo` (o `photo_summary(source, few, many)`, que não entra na chave: a impressão
+    # digital da fonte e `few`/`many` já o identificam)
+    poucas, muitas = resumo.vendas_poucas, resumo.vendas_muitas
+    opcoes = {'n_resamples': n_resamples, 'seed': seed, 'workers': workers}
+    _, p_permutacao = resampling.permutation_welch_test(poucas, muitas, **opcoes)
+    return PhotoResampling(ic_poucas=resampling.bootstrap_mean_ci(poucas, **opcoes),
+                           ic_muitas=resampling.bootstrap_mean_ci(muitas, **opcoes),
+                           p_permutacao=float(p_permutacao))
+
+
+# --- Qui-quadrado (categoria vs. estado) ---
+
+@dataclass(frozen=True)
+class ContingencySummary:
+    tabela: pd.DataFrame
+    esparsa: bool
+
+
+@memoize
+def contingency_summary(cubes, filters, full=False, top_n=10):
+    # Itens por estado e categoria: o Top N x Top N ou a tabela completa, só com estados e
+    # categorias com alguma observação
+    tabela = cubes.where(**filters).itens.total(['customer_state', 'product_category_name_english']).astype(int)
+    if not full:
+        top_estados = tabela.sum(axis=1).nlargest(top_n).index
+        top_categorias = tabela.sum(axis=0).nlargest(top_n).index
+        tabela = tabela.loc[tabela.index.isin(top_estados), tabela.columns.isin(top_categorias)]
+    tabela = tabela.loc[tabela.sum(axis=1) > 0, tabela.sum(axis=0) > 0]
+    tabela = tabela.rename_axis(index='customer_state', columns='product_category_name_english')
+    return ContingencySummary(tabela=tabela, esparsa=bool(full and tabela.size and contingency.is_sparse(tabela)))
+
+
+@dataclass(frozen=True)
+class ChiSquare:
+    tabela_teste: pd.DataFrame
+    chi2: float
+    p_value: float
+    dof: int
+
+
+@memoize
+def chi_square(cubes, filters, full=False, top_n=10, merge_sparse=False):
+    # Teste sobre a tabela de contingência; com `merge_sparse`, as linhas e colunas raras
+    # de uma tabela esparsa são agrupadas antes
+    from scipy import stats
+
+    resumo = contingency_summary(cubes, filters, full=full, top_n=top_n)
+    tabela = contingency.merge_sparse(resumo.tabela) if merge_sparse and resumo.esparsa else resumo.tabela
+    chi2, p_value, dof, _ = stats.chi2_contingency(tabela)
+    return ChiSquare(tabela_teste=tabela, chi2=float(chi2), p_value=float(p_value), dof=int(dof))
+
+
+@memoize(ignore=('tabela', 'workers'))
+def chi_square_monte_carlo(source, tabela, filters, full=False, top_n=10, n_resamples=resampling.DEFAULT_RESAMPLES,
+                           seed=0, workers=1):
+    # Valor-p Monte Carlo do qui-quadrado de `tabela` (a de `contingency_summary(source,
+    # filters, full, top_n)`, identificada na chave pelos mesmos parâmetros)
+    _, p_value = resampling.monte_carlo_chi2_test(*contingency.table_codes(tabela), n_resamples=n_resamples,
+                                                  seed=seed, workers=workers)
+    return float(p_value)
@@ -0,0 +1,47 @@
+# Arquivos estáticos da página inicial (currículo em PDF e foto) carregados uma vez por
+# processo.
+#
+# Antes, cada visita à página inicial reabria o PDF para o `st.download_button` e relia a
+# foto para o `st.image`. Aqui os bytes são lidos na primeira chamada e servidos da
+# memória nas seguintes. A foto é preparada no tamanho em que é exibida: se ela já cabe
+# na largura máxima, os bytes originais são usados como estão (o `st.image` não
+# recodifica um JPEG que já está no formato e no tamanho certos); se for maior, é
+# reduzida e codificada uma única vez.
+#
+# O `st.image` só transfere JPEG, PNG ou GIF (um WebP seria recodificado para JPEG a cada
+# execução), então a variante é gerada no formato da própria imagem.
+import functools
+import io
+
+# Largura máxima da foto na página inicial (coluna de 1/4 do layout largo, em telas de
+# alta densidade)
+PHOTO_WIDTH = 720
+JPEG_QUALITY = 85
+
+
+@functools.lru_cache(maxsize=None)
+def read_bytes(path):
+    # Conteúdo do arquivo (FileNotFoundError não fica em cache: a próxima chamada tenta de
+    # novo)
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+@functools.lru_cache(maxsize=None)
+def image_variant(path, max_width=PHOTO_WIDTH):
+    # Bytes da imagem com no máximo `max_width` pixels de largura, no formato original
+    from PIL import Image
+
+    data = read_bytes(path)
+    image = Image.open(io.BytesIO(data))
+    if image.width <= max_width:
+        return data
+    height = round(image.height * max_width / image.width)
+    resized = image.resize((max_width, height), resample=Image.LANCZOS)
+    out = io.BytesIO()
+    if image.format == 'JPEG':
+        resized.convert('RGB').save(out, format='JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    else:
+        resized.save(out, format=image.format or 'PNG', optimize=True)
+    return out.getvalue()
+
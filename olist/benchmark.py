@@ -0,0 +1,292 @@
+# Benchmark das etapas de cálculo do dashboard em dados sintéticos de tamanho crescente.
+#
+# Para cada escala (1 = tamanho do dataset do Kaggle) gera os CSVs com `olist.synthetic`
+# (uma única vez; os CSVs ficam em `--data-dir`) e mede, separadamente:
+#   - o carregamento (`ingest.load_tables`, o que `load_data()` chama): a frio, a partir dos
+#     CSVs e gravando o snapshot, e a quente, a partir do snapshot;
+#   - a construção do cubo dos filtros (`olist.cube`), ou a abertura do banco DuckDB com
+#     `--backend duckdb` (`olist.sqlcube`; as páginas então consultam o DuckDB);
+#   - cada página da barra lateral em etapas de agregação, estatística e figura (a figura
+#     inclui a serialização para JSON, que é o que o Streamlit envia ao navegador).
+# As etapas das páginas chamam as mesmas funções de `olist.aggregates` que
+# `pages/3_Analise_de_Dados.py`, sem filtros, com a memória delas limpa antes de cada
+# execução: cada medida é a de uma primeira visita à página.
+#
+# O tempo é a mediana de `--repeat` execuções, depois de uma de aquecimento; a memória é
+# o pico do `tracemalloc` em uma execução à parte (para não distorcer os tempos) e o RSS
+# máximo do processo. Cada medida
+# vira uma linha JSON no arquivo de saída. Com `--baseline`, as medidas são comparadas a
+# uma execução anterior e o comando termina com erro se alguma etapa ficar mais lenta ou
+# usar mais memória do que a tolerância.
+#
+#   python -m olist.benchmark --scales 1 10 100 --repeat 3 --output bench_output.txt
+#   python -m olist.benchmark --scales 1 --baseline bench_base.txt --tolerance 0.25
+#   python -m olist.benchmark --scales 1 10 --backend duckdb --output bench_duckdb.txt
+import argparse
+import json
+import os
+import resource
+import shutil
+import statistics
+import sys
+import time
+import tracemalloc
+
+import plotly.express as px
+
+from olist import aggregates, bundle, charts, cube, ingest, sqlcube, synthetic
+
+DEFAULT_SCALES = [1, 10, 100]
+DEFAULT_DATA_DIR = os.path.join(ingest.CACHE_DIR, 'bench')
+DEFAULT_OUTPUT = 'bench_output.txt'
+# Etapas mais rápidas que isso (na base) não entram na checagem de regressão de tempo
+MIN_COMPARABLE_S = 0.005
+MIN_COMPARABLE_MB = 1.0
+
+
+def _to_json(*figs):
+    for fig in figs:
+        fig.to_json()
+
+
+# --- Etapas de cada página (cada `yield` fecha uma etapa) ---
+
+def _carregamento(data_dir):
+    cache_dir = os.path.join(data_dir, 'cache')
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    ingest.load_tables(cache_dir)
+    yield 'csv'
+    ingest.load_tables(cache_dir)
+    yield 'snapshot'
+
+
+def _clear_memos():
+    for fn in vars(aggregates).values():
+        if hasattr(fn, 'cache_clear'):
+            fn.cache_clear()
+
+
+def _sem_memoria(steps, dados, cubos):
+    # Limpa a memória antes de criar o gerador: a limpeza fica fora do tempo medido
+    _clear_memos()
+    return steps(dados, cubos)
+
+
+def _cubo(dados, backend, cache_dir):
+    if backend == 'duckdb':
+        sqlcube.connect(dados, cache_dir)
+    else:
+        cube.build_cubes(dados)
+    yield 'agregacao'
+
+
+def _descritiva(dados, cubos):
+    resumo = aggregates.descriptive_summary(dados)
+    yield 'agregacao'
+    preco_frete = aggregates.price_freight(dados, quantile_threshold=0.99)
+    yield 'estatistica'
+    counts, x_centers, y_centers = preco_frete.grade
+    labels = ('Preço do Produto (R$)', 'Valor do Frete (R$)')
+    _to_json(charts.count_histogram(resumo.valores_nota, resumo.contagens_nota, resumo.box_nota,
+                                    title='Nota', label='review_score'),
+             charts.density_scatter(counts, x_centers, y_centers, preco_frete.fit, 'Preço e Frete', labels))
+    yield 'figura'
+
+
+def _estado(dados, cubos):
+    resumo = aggregates.state_summary(cubos, bundle.NO_FILTERS, top_n=15)
+    yield 'agregacao'
+    _to_json(px.bar(resumo.valor_medio.head(15), y='customer_state', x='total_order_value', orientation='h',
+                    color='customer_state'),
+             px.bar(resumo.top_categorias, y='Categoria', x='Número de Pedidos', orientation='h', color='Categoria'))
+    yield 'figura'
+
+
+def _sazonal(dados, cubos):
+    resumo = aggregates.seasonal_summary(cubos, bundle.NO_FILTERS)
+    yield 'agregacao'
+    _to_json(px.line(resumo.media_mensal, x='month_name', y='order_id', markers=True),
+             px.bar(resumo.por_dia_semana, x='day_of_week', y='order_id', color='day_of_week'))
+    yield 'figura'
+
+
+def _categoria(dados, cubos):
+    resumo = aggregates.category_summary(cubos, bundle.NO_FILTERS, top_n=10)
+    yield 'agregacao'
+    _to_json(charts.box_from_stats(resumo.box, orientation='h', order=resumo.ordem_mediana,
+                                   title='Categorias', labels=('Categoria', 'Nota')))
+    yield 'figura'
+
+
+def _pagamento(dados, cubos):
+    agg = aggregates.payment_summary(cubos, bundle.NO_FILTERS, confidence=0.95)
+    yield 'estatistica'
+    _to_json(px.bar(agg, y='payment_type', x='mean', error_x='confidence_margin', orientation='h', color='payment_type'))
+    yield 'figura'
+
+
+def _fotos(dados, cubos):
+    resumo = aggregates.photo_summary(dados, few=1, many=3)
+    yield 'estatistica'
+    _to_json(charts.box_from_stats(resumo.box, order=[g for g in resumo.grupos if g in resumo.box.index],
+                                   log_axis=True, title='Fotos', labels=('Fotos', 'Vendas')))
+    yield 'figura'
+
+
+def _qui_quadrado(dados, cubos):
+    top = aggregates.contingency_summary(cubos, bundle.NO_FILTERS, full=False, top_n=10)
+    completa = aggregates.contingency_summary(cubos, bundle.NO_FILTERS, full=True, top_n=10)
+    yield 'agregacao'
+    aggregates.chi_square(cubos, bundle.NO_FILTERS, full=False, top_n=10)
+    aggregates.chi_square(cubos, bundle.NO_FILTERS, full=True, top_n=10, merge_sparse=True)
+    yield 'estatistica'
+    _to_json(px.imshow(top.tabela, text_auto=True), px.imshow(completa.tabela))
+    yield 'figura'
+
+
+PAGE_STEPS = {
+    "Análise Descritiva Geral": _descritiva,
+    "Hábitos de Compra por Estado": _estado,
+    "Padrões Sazonais de Vendas": _sazonal,
+    "Avaliação por Categoria Popular": _categoria,
+    "Satisfação por Tipo de Pagamento": _pagamento,
+    "Análise de Fotos vs. Vendas": _fotos,
+    "Qui-Quadrado (Categoria vs. Estado)": _qui_quadrado,
+}
+
+
+# --- Medição ---
+
+def _rss_mb():
+    # ru_maxrss vem em KB no Linux e em bytes no macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def time_steps(steps):
+    # Tempo de cada etapa de um gerador de etapas
+    times = {}
+    start = time.perf_counter()
+    for step in steps:
+        now = time.perf_counter()
+        times[step] = now - start
+        start = time.perf_counter()
+    return times
+
+
+def memory_steps(steps):
+    # Pico de memória alocada (MB) em cada etapa, segundo o tracemalloc
+    peaks = {}
+    tracemalloc.start()
+    try:
+        for step in steps:
+            peaks[step] = tracemalloc.get_traced_memory()[1] / 1e6
+            tracemalloc.reset_peak()
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def measure(make_steps, repeat):
+    # Uma execução de aquecimento antes (importações tardias, caches do pandas/plotly)
+    for _ in make_steps():
+        pass
+    runs = [time_steps(make_steps()) for _ in range(repeat)]
+    peaks = memory_steps(make_steps())
+    return [{'etapa': step, 'tempo_s': statistics.median(r[step] for r in runs),
+             'tempo_min_s': min(r[step] for r in runs), 'repeticoes': repeat,
+             'pico_mb': round(peaks[step], 3), 'rss_mb': round(_rss_mb(), 1)} for step in runs[0]]
+
+
+def dataset(scale, data_dir, seed):
+    # Diretório com os CSVs sintéticos da escala (gerados só na primeira vez)
+    path = os.path.join(data_dir, f'escala_{scale:g}_semente_{seed}')
+    info_path = os.path.join(path, 'linhas.json')
+    if not os.path.exists(info_path):
+        rows = synthetic.generate(scale, path, seed)
+        with open(info_path, 'w', encoding='utf-8') as f:
+            json.dump(rows, f)
+    with open(info_path, encoding='utf-8') as f:
+        return path, json.load(f)
+
+
+def bench_scale(scale, data_dir, seed=0, repeat=3, pages=None, backend='cubo'):
+    path, rows = dataset(scale, data_dir, seed)
+    base = {'escala': scale, 'backend': backend, **rows}
+    records = []
+    cwd = os.getcwd()
+    os.chdir(path)  # `ingest` lê os CSVs do diretório atual, como o app
+    try:
+        for row in measure(lambda: _carregamento(path), repeat):
+            records.append({**base, 'pagina': 'load_data', **row})
+        cache_dir = os.path.join(path, 'cache')
+        dados = ingest.load_tables(cache_dir)
+        cubos = cube.build_cubes(dados) if backend == 'cubo' else sqlcube.connect(dados, cache_dir)
+        for row in measure(lambda: _cubo(dados, backend, cache_dir), repeat):
+            records.append({**base, 'pagina': 'cubo', **row})
+        for page, steps in PAGE_STEPS.items():
+            if pages and page not in pages:
+                continue
+            for row in measure(lambda: _sem_memoria(steps, dados, cubos), repeat):
+                records.append({**base, 'pagina': page, **row})
+    finally:
+        os.chdir(cwd)
+    return records
+
+
+def read_records(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def regressions(records, baseline, tolerance):
+    # Etapas mais lentas ou com pico de memória maior que a base além da tolerância
+    # (medidas anteriores à opção --backend são do backend 'cubo')
+    base = {(r['escala'], r.get('backend', 'cubo'), r['pagina'], r['etapa']): r for r in baseline}
+    found = []
+    for r in records:
+        old = base.get((r['escala'], r.get('backend', 'cubo'), r['pagina'], r['etapa']))
+        if old is None:
+            continue
+        if old['tempo_s'] >= MIN_COMPARABLE_S and r['tempo_s'] > old['tempo_s'] * (1 + tolerance):
+            found.append({**r, 'medida': 'tempo_s', 'base': old['tempo_s']})
+        if old['pico_mb'] >= MIN_COMPARABLE_MB and r['pico_mb'] > old['pico_mb'] * (1 + tolerance):
+            found.append({**r, 'medida': 'pico_mb', 'base': old['pico_mb']})
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark das etapas de cálculo do dashboard.")
+    parser.add_argument('--scales', type=float, nargs='+', default=DEFAULT_SCALES,
+                        help="escalas do dataset sintético (1 = tamanho do Kaggle)")
+    parser.add_argument('--repeat', type=int, default=3, help="repetições por medida (usa a mediana)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--pages', nargs='*', help="só estas páginas (padrão: todas)")
+    parser.add_argument('--backend', choices=sqlcube.BACKENDS, default='cubo', help="backend das agregações filtradas")
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help="onde ficam os CSVs sintéticos")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="arquivo de saída (uma linha JSON por medida)")
+    parser.add_argument('--baseline', help="saída de uma execução anterior para checar regressões")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="piora relativa aceita na checagem")
+    args = parser.parse_args(argv)
+
+    data_dir = os.path.abspath(args.data_dir)
+    records = []
+    for scale in args.scales:
+        for r in bench_scale(scale, data_dir, args.seed, args.repeat, args.pages, args.backend):
+            print(f"{r['escala']:>6g}x {r['pagina']:<38} {r['etapa']:<12} {r['tempo_s'] * 1000:>10.1f} ms "
+                  f"{r['pico_mb']:>9.1f} MB")
+            records.append(r)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        for r in records:
+            f.write(json.dumps(r, ensure_ascii=False) + '\n')
+
+    if args.baseline:
+        found = regressions(records, read_records(args.baseline), args.tolerance)
+        for r in found:
+            print(f"REGRESSÃO {r['escala']:g}x {r['pagina']} / {r['etapa']}: {r['medida']} {r['base']:.4g} -> {r[r['medida']]:.4g}")
+        if found:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+# Pacote de resultados pré-calculados: o dashboard sem os dados brutos.
+#
+# O deploy só precisa do que as páginas mostram, não das linhas dos CSVs. Este módulo
+# roda, uma única vez e fora do app, todas as análises das páginas de
+# `pages/3_Analise_de_Dados.py` (as funções de `olist.aggregates`, com os parâmetros que
+# as páginas usam, sem filtros na barra lateral) e grava os resultados num diretório:
+#   - uma tabela Parquet por dataframe, série ou array dos resultados;
+#   - `manifest.json` com a versão do formato, a impressão digital dos dados e do código,
+#     as estatísticas dos testes (χ², valores-p, t...) e a descrição de cada resultado.
+# Com a variável de ambiente OLIST_BUNDLE apontando para esse diretório, a página de
+# análise não carrega os CSVs nem monta os cubos: cada resultado é lido do pacote na
+# primeira vez que uma página o pede. Os filtros da barra lateral ficam desativados, já
+# que só os resultados sem filtro foram calculados.
+#
+#   python -m olist.bundle --output bundle
+#   OLIST_BUNDLE=bundle streamlit run 1_Home.py
+import argparse
+import dataclasses
+import datetime
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from olist import aggregates, cube, ingest, persist, tables
+from olist.persist import CACHE_DIR
+
+BUNDLE_DIR = os.environ.get('OLIST_BUNDLE')
+DEFAULT_OUTPUT = 'bundle'
+MANIFEST_NAME = 'manifest.json'
+# Incrementar sempre que o formato do pacote mudar (pacotes antigos deixam de abrir)
+BUNDLE_VERSION = 1
+CODE_MODULES = ['aggregates', 'bundle', 'contingency', 'groupstats', 'summaries']
+
+# Filtros da barra lateral sem nada selecionado (o que a página passa nesse caso)
+NO_FILTERS = {'year_month': None, 'customer_state': [], 'product_category_name_english': [], 'payment_type': []}
+
+
+def _memory_report(data):
+    return data.memory_report
+
+
+# Análises das páginas: nome -> (função, fonte do primeiro argumento)
+ANALYSES = {
+    'sample_rows': (tables.sample_rows, 'dados'),
+    'memory_report': (_memory_report, 'dados'),
+    'descriptive_summary': (aggregates.descriptive_summary, 'dados'),
+    'price_freight': (aggregates.price_freight, 'dados'),
+    'price_freight_sample': (aggregates.price_freight_sample, 'dados'),
+    'discrete_distribution': (aggregates.discrete_distribution, 'dados'),
+    'photo_summary': (aggregates.photo_summary, 'dados'),
+    'state_summary': (aggregates.state_summary, 'cubos'),
+    'seasonal_summary': (aggregates.seasonal_summary, 'cubos'),
+    'category_summary': (aggregates.category_summary, 'cubos'),
+    'payment_summary': (aggregates.payment_summary, 'cubos'),
+    'contingency_summary': (aggregates.contingency_summary, 'cubos'),
+    'chi_square': (aggregates.chi_square, 'cubos'),
+}
+
+
+def page_calls():
+    # Todas as chamadas que as páginas fazem sem filtros (com cada opção dos controles)
+    calls = [('sample_rows', {}), ('memory_report', {}), ('descriptive_summary', {}),
+             ('price_freight', {'quantile_threshold': 0.99}),
+             ('price_freight_sample', {'quantile_threshold': 0.99, 'max_points': 5000}),
+             ('photo_summary', {'few': 1, 'many': 3}),
+             ('state_summary', {'filters': NO_FILTERS, 'top_n': 15}),
+             ('seasonal_summary', {'filters': NO_FILTERS}),
+             ('category_summary', {'filters': NO_FILTERS, 'top_n': 10}),
+             ('payment_summary', {'filters': NO_FILTERS, 'payment_types': list(aggregates.MAIN_PAYMENT_TYPES),
+                                  'confidence': 0.95})]
+    calls += [('discrete_distribution', {'variable': v}) for v in aggregates.DISCRETE_TABLES]
+    for full in (False, True):
+        calls.append(('contingency_summary', {'filters': NO_FILTERS, 'full': full, 'top_n': 10}))
+        calls += [('chi_square', {'filters': NO_FILTERS, 'full': full, 'top_n': 10, 'merge_sparse': merge})
+                  for merge in (False, True)]
+    return calls
+
+
+def result_key(name, *args, **kwargs):
+    # Chave de uma chamada: o nome e os parâmetros com os valores padrão preenchidos, em
+    # JSON (assim `f(x, 10)` e `f(x, top_n=10)` caem no mesmo resultado)
+    fn, _ = ANALYSES[name]
+    bound = inspect.signature(fn).bind(None, *args, **kwargs)
+    bound.apply_defaults()
+    params = dict(list(bound.arguments.items())[1:])
+    return f"{name}:{json.dumps(params, sort_keys=True, default=list)}"
+
+
+def compute(name, dados, cubos, *args, **kwargs):
+    # Resultado calculado agora, a partir do dataset ou dos cubos
+    fn, source = ANALYSES[name]
+    return fn(dados if source == 'dados' else cubos, *args, **kwargs)
+
+
+# --- Formato: cada valor vira uma descrição JSON e, se for tabular, um arquivo Parquet ---
+
+def _write_frame(frame, out_dir, files):
+    # Os nomes das colunas do Parquet precisam ser texto: os rótulos originais (e o tipo
+    # deles) ficam na descrição
+    file_name = f"t{len(files):03d}.parquet"
+    files.append(file_name)
+    columns = frame.columns
+    frame.set_axis([str(i) for i in range(frame.shape[1])], axis=1).to_parquet(os.path.join(out_dir, file_name))
+    return {'arquivo': file_name, 'colunas': columns.tolist(), 'tipo_colunas': str(columns.dtype),
+            'nome_colunas': columns.name}
+
+
+def _encode(value, out_dir, files):
+    if dataclasses.is_dataclass(value):
+        return {'tipo': 'dataclass', 'classe': type(value).__name__,
+                'campos': {f.name: _encode(getattr(value, f.name), out_dir, files) for f in dataclasses.fields(value)}}
+    if isinstance(value, pd.DataFrame):
+        return {'tipo': 'dataframe', **_write_frame(value, out_dir, files)}
+    if isinstance(value, pd.Series):
+        return {'tipo': 'series', 'nome': value.name, **_write_frame(value.to_frame(name=0), out_dir, files)}
+    if isinstance(value, pd.Index):
+        return {'tipo': 'index', 'nome': value.name, **_write_frame(value.to_frame(index=False, name=0), out_dir, files)}
+    if isinstance(value, np.ndarray):
+        # Arrays de 2 dimensões (ex.: a grade de densidade) viram uma coluna do Parquet por coluna
+        matrix = value.reshape(value.shape[0], int(np.prod(value.shape[1:])))
+        return {'tipo': 'array', 'forma': list(value.shape), **_write_frame(pd.DataFrame(matrix), out_dir, files)}
+    if isinstance(value, tuple):
+        return {'tipo': 'tuple', 'itens': [_encode(v, out_dir, files) for v in value]}
+    if isinstance(value, dict):
+        return {'tipo': 'dict', 'itens': {k: _encode(v, out_dir, files) for k, v in value.items()}}
+    if isinstance(value, np.generic):
+        value = value.item()
+    return {'tipo': 'valor', 'valor': value}
+
+
+def _read_frame(desc, bundle_dir):
+    frame = pd.read_parquet(os.path.join(bundle_dir, desc['arquivo']))
+    columns = pd.Index(desc['colunas'], dtype=desc['tipo_colunas'] if desc['colunas'] else None, name=desc['nome_colunas'])
+    return frame.set_axis(columns, axis=1)
+
+
+def _decode(desc, bundle_dir):
+    kind = desc['tipo']
+    if kind == 'dataclass':
+        fields = {k: _decode(v, bundle_dir) for k, v in desc['campos'].items()}
+        return getattr(aggregates, desc['classe'])(**fields)
+    if kind == 'dataframe':
+        return _read_frame(desc, bundle_dir)
+    if kind == 'series':
+        return _read_frame(desc, bundle_dir)[0].rename(desc['nome'])
+    if kind == 'index':
+        return pd.Index(_read_frame(desc, bundle_dir)[0], name=desc['nome'])
+    if kind == 'array':
+        return _read_frame(desc, bundle_dir).to_numpy().reshape(desc['forma'])
+    if kind == 'tuple':
+        return tuple(_decode(v, bundle_dir) for v in desc['itens'])
+    if kind == 'dict':
+        return {k: _decode(v, bundle_dir) for k, v in desc['itens'].items()}
+    return desc['valor']
+
+
+# --- Gravação e leitura ---
+
+def build(dados, cubos, output=DEFAULT_OUTPUT):
+    # Calcula todas as análises e grava o pacote (num diretório temporário trocado no
+    # final: o app nunca encontra um pacote pela metade). Devolve o manifesto
+    fingerprint = hashlib.sha256((dados.fingerprint + persist.code_version(tuple(CODE_MODULES))).encode()).hexdigest()[:32]
+    tmp_dir = f"{output.rstrip(os.sep)}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    try:
+        files, results = [], {}
+        for name, kwargs in page_calls():
+            results[result_key(name, **kwargs)] = _encode(compute(name, dados, cubos, **kwargs), tmp_dir, files)
+        manifest = {'versao': BUNDLE_VERSION, 'fingerprint': fingerprint, 'dados': dados.fingerprint,
+                    'criado_em': datetime.datetime.now().isoformat(timespec='seconds'), 'resultados': results}
+        with open(os.path.join(tmp_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1)
+        shutil.rmtree(output, ignore_errors=True)
+        os.replace(tmp_dir, output)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return manifest
+
+
+class ResultadoAusente(KeyError):
+    pass
+
+
+class Bundle:
+    # Pacote aberto: só o manifesto é lido na abertura; cada resultado, na primeira vez
+    # que é pedido (e fica em memória, dividido entre as sessões)
+    def __init__(self, path, manifest):
+        self.path = path
+        self.manifest = manifest
+        self.fingerprint = manifest['fingerprint']
+        self.results = {}
+        self.lock = threading.Lock()
+
+    @property
+    def created(self):
+        return self.manifest['criado_em']
+
+    def result(self, name, *args, **kwargs):
+        key = result_key(name, *args, **kwargs)
+        with self.lock:
+            if key not in self.results:
+                if key not in self.manifest['resultados']:
+                    raise ResultadoAusente(f"O pacote '{self.path}' não tem o resultado {key}")
+                self.results[key] = _decode(self.manifest['resultados'][key], self.path)
+            return self.results[key]
+
+
+def open_bundle(path=BUNDLE_DIR):
+    # FileNotFoundError se o diretório não tem pacote; ValueError se o formato é de outra versão
+    with open(os.path.join(path, MANIFEST_NAME), encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('versao') != BUNDLE_VERSION:
+        raise ValueError(f"O pacote '{path}' é da versão {manifest.get('versao')} do formato "
+                         f"(esperada: {BUNDLE_VERSION}); gere-o de novo com python -m olist.bundle")
+    return Bundle(path, manifest)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pré-calcula as análises do dashboard num pacote de resultados.")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="diretório do pacote (substituído se existir)")
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help="cache em disco dos dados carregados")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    dados = ingest.load_tables(args.cache_dir)
+    cubos = cube.load_cubes(dados, args.cache_dir)
+    manifest = build(dados, cubos, args.output)
+    tamanho = sum(os.path.getsize(os.path.join(args.output, f)) for f in os.listdir(args.output))
+    print(f"{len(manifest['resultados'])} resultados gravados em {args.output} "
+          f"({tamanho / 1e3:.0f} kB, {time.perf_counter() - inicio:.1f} s)")
+
+
+if __name__ == '__main__':
+    main()
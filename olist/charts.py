@@ -0,0 +1,79 @@
+# Figuras Plotly montadas a partir dos resumos de `olist.summaries`.
+import numpy as np
+import plotly.graph_objects as go
+from plotly.colors import qualitative
+from plotly.subplots import make_subplots
+
+TRENDLINE_COLOR = 'red'
+
+
+def _trendline(fit, x_range):
+    xs = np.array(x_range, dtype=np.float64)
+    return go.Scatter(x=xs, y=fit['intercept'] + fit['slope'] * xs, mode='lines',
+                      line=dict(color=TRENDLINE_COLOR), name='OLS',
+                      hovertemplate=f"y = {fit['slope']:.4f}x + {fit['intercept']:.2f}<extra>OLS</extra>")
+
+
+def density_scatter(counts, x_centers, y_centers, fit, title, labels):
+    # Grade 2D de contagens + reta de regressão (células vazias ficam transparentes)
+    z = np.where(counts.T > 0, counts.T, np.nan)
+    fig = go.Figure(go.Heatmap(x=x_centers, y=y_centers, z=z, colorscale='Blues',
+                               colorbar=dict(title='Pontos'), hoverongaps=False))
+    fig.add_trace(_trendline(fit, (x_centers[0], x_centers[-1])))
+    fig.update_layout(title=title, xaxis_title=labels[0], yaxis_title=labels[1], showlegend=False)
+    return fig
+
+
+def sample_scatter(x, y, fit, title, labels, x_range=None):
+    fig = go.Figure(go.Scattergl(x=x, y=y, mode='markers', marker=dict(size=4, opacity=0.5), name='Amostra'))
+    x_range = x_range or (float(np.min(x)), float(np.max(x)))
+    fig.add_trace(_trendline(fit, x_range))
+    fig.update_layout(title=title, xaxis_title=labels[0], yaxis_title=labels[1], showlegend=False)
+    return fig
+
+
+def box_from_stats(stats, title, labels, order=None, orientation='v', log_axis=False):
+    # Um box por grupo a partir dos quartis/cercas pré-calculados (`summaries.box_stats`),
+    # com os atípicos em um trace de pontos separado: o tamanho é O(grupos), não O(linhas)
+    order = list(order) if order is not None else list(stats.index)
+    colors = qualitative.Plotly
+    fig = go.Figure()
+    for i, group in enumerate(order):
+        row = stats.loc[group]
+        color = colors[i % len(colors)]
+        position = [str(group)]
+        box = dict(q1=[row['q1']], median=[row['median']], q3=[row['q3']], mean=[row['mean']],
+                   lowerfence=[row['lowerfence']], upperfence=[row['upperfence']],
+                   name=str(group), marker_color=color, boxpoints=False, orientation=orientation)
+        box['y' if orientation == 'h' else 'x'] = position
+        fig.add_trace(go.Box(**box))
+        if len(row['outliers']):
+            pos = position * len(row['outliers'])
+            xy = (row['outliers'], pos) if orientation == 'h' else (pos, row['outliers'])
+            fig.add_trace(go.Scatter(x=xy[0], y=xy[1], mode='markers', marker=dict(color=color, size=5),
+                                     name=str(group), hovertemplate='%{x}<extra></extra>' if orientation == 'h'
+                                     else '%{y}<extra></extra>'))
+    value_axis, category_axis = ('xaxis', 'yaxis') if orientation == 'h' else ('yaxis', 'xaxis')
+    fig.update_layout({
+        category_axis: dict(title=labels[0], categoryorder='array', categoryarray=[str(g) for g in order],
+                            autorange='reversed' if orientation == 'h' else True),
+        value_axis: dict(title=labels[1], type='log' if log_axis else '-'),
+    }, title=title, showlegend=False)
+    return fig
+
+
+def count_histogram(values, counts, box, title, label, color='#636EFA'):
+    # Histograma de uma variável discreta desenhado a partir do vetor de contagens, com o
+    # box marginal (quartis pré-calculados) acima, como o `marginal='box'` do Plotly Express
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.2, 0.8], vertical_spacing=0.03)
+    marginal = box_from_stats(box, title='', labels=('', label), orientation='h')
+    for trace in marginal.data:
+        trace.update(marker_color=color)
+        fig.add_trace(trace, row=1, col=1)
+    fig.add_trace(go.Bar(x=values, y=counts, marker_color=color, name=label,
+                         hovertemplate='%{x}: %{y}<extra></extra>'), row=2, col=1)
+    fig.update_yaxes(showticklabels=False, row=1, col=1)
+    fig.update_xaxes(title=label, row=2, col=1)
+    fig.update_yaxes(title='count', row=2, col=1)
+    fig.update_layout(title=title, showlegend=False, bargap=0.2)
+    return fig
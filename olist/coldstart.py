@@ -0,0 +1,92 @@
+# Relatório reproduzível de tempo de importação e de cold start por página.
+#
+# Para cada página da barra lateral, mede em um interpretador novo (`python -X importtime`)
+# o custo de importar a base do app e os módulos pesados da página (`olist.lazy`). Com
+# `--render`, também renderiza a página do zero com o AppTest do Streamlit (usando os CSVs
+# do diretório atual) e confere quais módulos pesados foram de fato carregados.
+#
+#   python -m olist.coldstart --repeat 5 --render --json coldstart.json
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from olist.lazy import PAGE_MODULES
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGE_SCRIPT = os.path.join(ROOT, 'pages', '3_Analise_de_Dados.py')
+BASE_MODULES = ['streamlit', 'olist.ingest']
+HEAVY_MODULES = ['plotly.express', 'plotly.graph_objects', 'scipy.stats', 'statsmodels.api']
+
+RENDER_SCRIPT = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+from olist.lazy import is_loaded
+at = AppTest.from_file({script!r}, default_timeout=600)
+at.session_state['pagina'] = {page!r}
+at.run()
+elapsed = time.perf_counter() - t0
+print(json.dumps({{'render_s': elapsed, 'exceptions': [e.value for e in at.exception],
+                  'loaded': [m for m in {heavy!r} if is_loaded(m)]}}))
+"""
+
+
+def import_time_ms(modules):
+    # Soma do tempo cumulativo das importações de primeiro nível, em milissegundos
+    code = 'import ' + ', '.join(modules) if modules else 'pass'
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                          capture_output=True, text=True, cwd=ROOT, check=True)
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if not name[1:].startswith(' '):  # só os módulos importados diretamente
+            total_us += int(cumulative)
+    return total_us / 1000
+
+
+def render_page(page):
+    code = RENDER_SCRIPT.format(root=ROOT, script=PAGE_SCRIPT, page=page, heavy=HEAVY_MODULES)
+    proc = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def build_report(repeat=3, render=False):
+    base_ms = statistics.median(import_time_ms(BASE_MODULES) for _ in range(repeat))
+    report = []
+    for page, modules in PAGE_MODULES.items():
+        total_ms = statistics.median(import_time_ms(BASE_MODULES + modules) for _ in range(repeat))
+        row = {'pagina': page, 'modulos': modules, 'import_base_ms': round(base_ms, 1),
+               'import_pagina_ms': round(max(total_ms - base_ms, 0.0), 1), 'import_total_ms': round(total_ms, 1)}
+        if render:
+            runs = [render_page(page) for _ in range(repeat)]
+            row['render_s'] = round(statistics.median(r['render_s'] for r in runs), 3)
+            row['modulos_carregados'] = runs[-1]['loaded']
+            row['excecoes'] = runs[-1]['exceptions']
+        report.append(row)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tempo de importação e cold start por página.")
+    parser.add_argument('--repeat', type=int, default=3, help="repetições por medida (usa a mediana)")
+    parser.add_argument('--render', action='store_true', help="renderiza cada página com o AppTest")
+    parser.add_argument('--json', help="grava o relatório neste arquivo JSON")
+    args = parser.parse_args(argv)
+
+    report = build_report(args.repeat, args.render)
+    for row in report:
+        extra = f"  render {row['render_s']:.2f}s  carregou {row['modulos_carregados']}" if args.render else ''
+        print(f"{row['pagina']:<40} {row['import_total_ms']:>8.1f} ms (+{row['import_pagina_ms']:.1f}){extra}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+# Tabelas de contingência por contagem de códigos categóricos e tratamento de células
+# esparsas para o teste qui-quadrado em resolução completa (todos os estados x todas as
+# categorias).
+import numpy as np
+import pandas as pd
+
+# Regra de Cochran: nenhuma contagem esperada abaixo de 1 e no máximo 20% abaixo de 5
+MIN_EXPECTED = 5
+MAX_SPARSE_SHARE = 0.2
+
+
+def contingency_table(rows, cols):
+    # Tabela linhas x colunas de duas Series categóricas com um único bincount sobre os
+    # códigos; linhas e colunas sem nenhuma observação são removidas
+    row_codes = rows.cat.codes.to_numpy().astype(np.int64)
+    col_codes = cols.cat.codes.to_numpy().astype(np.int64)
+    n_rows, n_cols = len(rows.cat.categories), len(cols.cat.categories)
+    valid = (row_codes >= 0) & (col_codes >= 0)
+    cells = row_codes[valid] * n_cols + col_codes[valid]
+    counts = np.bincount(cells, minlength=n_rows * n_cols).reshape(n_rows, n_cols)
+    table = pd.DataFrame(counts,
+                         index=pd.Index(np.asarray(rows.cat.categories), name=rows.name),
+                         columns=pd.Index(np.asarray(cols.cat.categories), name=cols.name))
+    return table.loc[table.sum(axis=1) > 0, table.sum(axis=0) > 0]
+
+
+def expected_counts(table):
+    values = np.asarray(table, dtype=np.float64)
+    return values.sum(axis=1, keepdims=True) * values.sum(axis=0, keepdims=True) / values.sum()
+
+
+def is_sparse(table):
+    expected = expected_counts(table)
+    return expected.min() < 1 or (expected < MIN_EXPECTED).mean() > MAX_SPARSE_SHARE
+
+
+def merge_sparse(table, row_label='Outros', col_label='outras'):
+    # Junta a linha ou coluna de menor participação num grupo "outros" até a tabela
+    # atender a regra de Cochran (ou restarem só 2 linhas/colunas)
+    table = table.copy()
+    while is_sparse(table) and (table.shape[0] > 2 or table.shape[1] > 2):
+        total = table.values.sum()
+        row_share = table.sum(axis=1).drop(row_label, errors='ignore') / total
+        col_share = table.sum(axis=0).drop(col_label, errors='ignore') / total
+        merge_row = table.shape[0] > 2 and len(row_share) and (
+            table.shape[1] <= 2 or not len(col_share) or row_share.min() <= col_share.min())
+        if merge_row:
+            smallest = row_share.idxmin()
+            merged = table.loc[smallest] + (table.loc[row_label] if row_label in table.index else 0)
+            table = table.drop(index=[smallest, row_label], errors='ignore')
+            table.loc[row_label] = merged
+        elif len(col_share) and table.shape[1] > 2:
+            smallest = col_share.idxmin()
+            merged = table[smallest] + (table[col_label] if col_label in table.columns else 0)
+            table = table.drop(columns=[smallest, col_label], errors='ignore')
+            table[col_label] = merged
+        else:
+            break
+    return table
+
+
+def table_codes(table):
+    # Códigos (linha, coluna) de cada observação de uma tabela de contagens, para os
+    # testes que trabalham no nível das observações (Monte Carlo)
+    counts = np.asarray(table, dtype=np.int64).ravel()
+    rows, cols = np.indices(np.shape(table))
+    return np.repeat(rows.ravel(), counts), np.repeat(cols.ravel(), counts)
@@ -0,0 +1,257 @@
+# Cubo OLAP pré-agregado para os filtros da barra lateral.
+#
+# Os fatos são agregados uma única vez por (estado x categoria x tipo de pagamento x
+# ano-mês x nota de avaliação), guardando em cada célula a contagem de linhas e, para a
+# medida numérica do fato, a contagem de valores presentes, a soma e a soma dos
+# quadrados. Filtrar é só selecionar células e somar: nenhuma página precisa varrer as
+# linhas de novo. Há um cubo por grão:
+#   - itens: uma linha por item vendido (medida `price`)
+#   - pedidos: uma linha por pedido, com o dia da semana como dimensão extra (medida
+#     `total_order_value`)
+#   - pagamentos: uma linha por pagamento (medida `payment_value`)
+# Um pedido pode ter itens de várias categorias e vários pagamentos, então nos cubos de
+# pedidos e de pagamentos a categoria é a do item mais caro do pedido, e nos cubos de
+# itens e de pedidos o tipo de pagamento é o conjunto de tipos usados no pedido (máscara
+# de bits; o filtro seleciona os pedidos que usaram algum dos tipos escolhidos).
+# Células com dimensão ausente usam o código -1: entram nos totais, mas saem quando a
+# dimensão é filtrada.
+#
+# Os cubos também ficam no cache em disco (`olist.persist`), marcados com a impressão
+# digital dos dados e do código deste módulo (`load_cubes`). Como as células só têm
+# contagens e somas, os cubos de lotes diferentes de pedidos se combinam com
+# `merge_cubes` (`olist.incremental`).
+import hashlib
+from dataclasses import dataclass, replace
+
+import numpy as np
+import pandas as pd
+
+from olist import persist
+from olist.persist import CACHE_DIR
+from olist.tables import lookup
+
+DIMENSIONS = ['customer_state', 'product_category_name_english', 'payment_type', 'year_month', 'review_score']
+SET_DIMENSION = 'payment_type'
+CUBE_NAME = 'olist_cube'
+CODE_MODULES = ['cube']
+
+
+@dataclass(frozen=True)
+class Cube:
+    cells: pd.DataFrame
+    labels: dict
+    measures: tuple = ()
+    set_dims: tuple = ()
+
+    def where(self, **filters):
+        # Mantém as células cujos rótulos estão nas listas dadas (lista vazia/None = tudo)
+        keep = np.ones(len(self.cells), dtype=bool)
+        for dim, values in filters.items():
+            if values is None or len(values) == 0:
+                continue
+            codes = self.labels[dim].get_indexer(pd.Index(values))
+            codes = codes[codes >= 0]
+            column = self.cells[dim].to_numpy()
+            if dim in self.set_dims:
+                keep &= (column & int(np.bitwise_or.reduce(1 << codes, initial=0))) != 0
+            else:
+                keep &= np.isin(column, codes)
+        return replace(self, cells=self.cells[keep])
+
+    @property
+    def empty(self):
+        return self.cells.empty
+
+    def total(self, by, column='count'):
+        # Soma de `column` por uma dimensão (Series) ou por duas (DataFrame linhas x
+        # colunas), com todos os rótulos, inclusive os de total zero
+        dims = [by] if isinstance(by, str) else list(by)
+        for dim in dims:
+            if dim in self.set_dims:
+                raise ValueError(f"A dimensão '{dim}' é um conjunto e não pode ser agrupada")
+        codes = [self.cells[dim].to_numpy() for dim in dims]
+        valid = np.logical_and.reduce([c >= 0 for c in codes])
+        shape = tuple(len(self.labels[dim]) for dim in dims)
+        key = np.ravel_multi_index([c[valid] for c in codes], shape)
+        weights = self.cells[column].to_numpy(dtype=np.float64)[valid]
+        sums = np.bincount(key, weights=weights, minlength=int(np.prod(shape))).reshape(shape)
+        if len(dims) == 1:
+            return pd.Series(sums, index=self.labels[dims[0]], name=column)
+        return pd.DataFrame(sums, index=self.labels[dims[0]], columns=self.labels[dims[1]])
+
+    def moments(self, by, dim):
+        # Contagem, soma e soma dos quadrados de uma dimensão numérica (ex.: nota) por grupo
+        table = self.total([by, dim])
+        values = self.labels[dim].to_numpy(dtype=np.float64)
+        return pd.DataFrame({'count': table.sum(axis=1), 'sum': table @ values,
+                             'sumsq': table @ (values * values)})
+
+
+@dataclass(frozen=True)
+class OlistCubes:
+    itens: Cube
+    pedidos: Cube
+    pagamentos: Cube
+    # Impressão digital dos dados de origem; os cubos filtrados não têm (`olist.aggregates`
+    # memoriza pela impressão digital, e os filtros já entram como parâmetro)
+    fingerprint: str = ''
+
+    def where(self, **filters):
+        return OlistCubes(*(cube.where(**{d: v for d, v in filters.items() if d in cube.labels})
+                            for cube in (self.itens, self.pedidos, self.pagamentos)))
+
+
+def _encode(values):
+    # Códigos 0..k-1 (-1 = ausente) e os rótulos de uma coluna categórica ou numérica
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.cat.remove_unused_categories()
+        return values.cat.codes.to_numpy().astype(np.int32), pd.Index(np.asarray(values.cat.categories))
+    labels, codes = np.unique(values.dropna().to_numpy(), return_inverse=True)
+    out = np.full(len(values), -1, dtype=np.int32)
+    out[values.notna().to_numpy()] = codes
+    return out, pd.Index(labels)
+
+
+def _take(codes, keys):
+    keys = np.asarray(keys)
+    return np.where(keys >= 0, codes[np.maximum(keys, 0)], -1)
+
+
+def _aggregate(dims, measure, values, labels, set_dims=()):
+    # Uma célula por combinação observada de códigos (o código -1 é deslocado para 0; a
+    # máscara de bits pode passar do número de rótulos, por isso o `max` dos códigos)
+    shape = tuple(int(max(codes.max(initial=-1), len(labels[name]) - 1)) + 2 for name, codes in dims.items())
+    key = np.ravel_multi_index([codes + 1 for codes in dims.values()], shape)
+    cell_keys, cell = np.unique(key, return_inverse=True)
+    present = ~np.isnan(values)
+    filled = np.where(present, values, 0.0)
+
+    cells = pd.DataFrame({name: (codes - 1).astype(np.int32)
+                          for name, codes in zip(dims, np.unravel_index(cell_keys, shape))})
+    cells['count'] = np.bincount(cell, minlength=len(cell_keys))
+    cells[f'{measure}_n'] = np.bincount(cell, weights=present, minlength=len(cell_keys))
+    cells[f'{measure}_sum'] = np.bincount(cell, weights=filled, minlength=len(cell_keys))
+    cells[f'{measure}_sumsq'] = np.bincount(cell, weights=filled * filled, minlength=len(cell_keys))
+    return Cube(cells=cells, labels={name: labels[name] for name in dims},
+                measures=(measure,), set_dims=tuple(d for d in set_dims if d in dims))
+
+
+def build_cubes(data):
+    pedidos, itens, pagamentos = data.pedidos, data.itens, data.pagamentos
+    labels = {}
+    state, labels['customer_state'] = _encode(pedidos['customer_state'])
+    year_month, labels['year_month'] = _encode(pedidos['year_month'].where(pedidos['year_month'] >= 0))
+    review, labels['review_score'] = _encode(pedidos['review_score'])
+    weekday = pedidos['weekday'].to_numpy().astype(np.int32)
+    labels['weekday'] = pd.Index(range(7))
+
+    order_key = itens['order_key'].to_numpy()
+    category, labels['product_category_name_english'] = _encode(
+        lookup(data.produtos, 'product_category_name_english', itens['product_key']))
+
+    # Categoria principal do pedido: a do item mais caro
+    price = itens['price'].to_numpy(dtype=np.float64)
+    order = np.lexsort((-np.nan_to_num(price, nan=-np.inf), order_key))
+    order = order[order_key[order] >= 0]
+    first = order[np.r_[True, order_key[order][1:] != order_key[order][:-1]]] if len(order) else order
+    main_category = np.full(len(pedidos), -1, dtype=np.int32)
+    main_category[order_key[first]] = category[first]
+
+    # Conjunto de tipos de pagamento usados em cada pedido, como máscara de bits
+    payment_type, labels['payment_type'] = _encode(pagamentos['payment_type'])
+    payment_order = pagamentos['order_key'].to_numpy()
+    payment_mask = np.zeros(len(pedidos), dtype=np.int32)
+    used = payment_type >= 0
+    np.bitwise_or.at(payment_mask, payment_order[used], 1 << payment_type[used])
+
+    order_dims = {'customer_state': state, 'product_category_name_english': main_category,
+                  'payment_type': payment_mask, 'year_month': year_month, 'review_score': review}
+    item_dims = {'customer_state': _take(state, order_key), 'product_category_name_english': category,
+                 'payment_type': _take(payment_mask, order_key), 'year_month': _take(year_month, order_key),
+                 'review_score': _take(review, order_key)}
+    payment_dims = {name: _take(codes, payment_order) for name, codes in order_dims.items()}
+    payment_dims['payment_type'] = payment_type
+
+    return OlistCubes(
+        itens=_aggregate(item_dims, 'price', price, labels, set_dims=[SET_DIMENSION]),
+        pedidos=_aggregate({**order_dims, 'weekday': weekday}, 'total_order_value',
+                           pedidos['total_order_value'].to_numpy(dtype=np.float64), labels,
+                           set_dims=[SET_DIMENSION]),
+        pagamentos=_aggregate(payment_dims, 'payment_value',
+                              pagamentos['payment_value'].to_numpy(dtype=np.float64), labels),
+        fingerprint=data.fingerprint,
+    )
+
+
+def _union_labels(a, b):
+    # Rótulos dos dois cubos, ordenados; no tipo do primeiro quando ele comporta todos
+    # (ex.: notas inteiras de um lote sem ausentes e notas float32 da base)
+    merged = a.union(b)
+    if len(a) and merged.dtype != a.dtype:
+        try:
+            cast = merged.astype(a.dtype)
+            if (cast == merged).all():
+                merged = cast
+        except (TypeError, ValueError):
+            pass
+    return merged
+
+
+def _recode(codes, mapping, is_set):
+    # Códigos (ou máscaras de bits, nas dimensões de conjunto) nos rótulos novos
+    if not is_set:
+        return np.where(codes >= 0, mapping[np.maximum(codes, 0)], -1).astype(np.int32)
+    out = np.zeros(len(codes), dtype=np.int32)
+    for old, new in enumerate(mapping):
+        out |= np.where(codes & (1 << old), 1 << int(new), 0).astype(np.int32)
+    return out
+
+
+def merge_cube(a, b):
+    # Cubo com as células dos dois: rótulos unidos, células de mesma combinação somadas
+    labels = {dim: _union_labels(a.labels[dim], b.labels[dim]) for dim in a.labels}
+    parts = []
+    for part in (a, b):
+        cells = part.cells.copy()
+        for dim in labels:
+            mapping = labels[dim].get_indexer(part.labels[dim])
+            cells[dim] = _recode(cells[dim].to_numpy(), mapping, dim in a.set_dims)
+        parts.append(cells)
+    dims = list(labels)
+    cells = pd.concat(parts, ignore_index=True).groupby(dims, sort=False).sum().reset_index()
+    return replace(a, cells=cells, labels=labels)
+
+
+def merge_cubes(a, b):
+    # Cubos de dois lotes de pedidos disjuntos (ex.: a base e um lote novo): como cada
+    # célula só guarda contagens e somas, o resultado é o mesmo de construir sobre tudo
+    return OlistCubes(*(merge_cube(getattr(a, name), getattr(b, name)) for name in ('itens', 'pedidos', 'pagamentos')))
+
+
+def to_frames(cubes):
+    frames, meta = {}, {}
+    for name in ('itens', 'pedidos', 'pagamentos'):
+        cube = getattr(cubes, name)
+        frames[name] = cube.cells
+        meta[name] = {'labels': {dim: labels.tolist() for dim, labels in cube.labels.items()},
+                      'dtypes': {dim: str(labels.dtype) for dim, labels in cube.labels.items()},
+                      'measures': list(cube.measures), 'set_dims': list(cube.set_dims)}
+    return frames, meta
+
+
+def from_frames(frames, meta):
+    return OlistCubes(*(Cube(cells=frames[name],
+                             labels={dim: pd.Index(values, dtype=meta[name]['dtypes'][dim])
+                                     for dim, values in meta[name]['labels'].items()},
+                             measures=tuple(meta[name]['measures']), set_dims=tuple(meta[name]['set_dims']))
+                        for name in ('itens', 'pedidos', 'pagamentos')))
+
+
+def load_cubes(data, cache_dir=CACHE_DIR):
+    # `build_cubes` com cache em disco; sem impressão digital nos dados (ex.: tabelas
+    # montadas à mão), só constrói
+    if not data.fingerprint:
+        return build_cubes(data)
+    key = hashlib.sha256((data.fingerprint + persist.code_version(tuple(CODE_MODULES))).encode()).hexdigest()[:32]
+    cubes = persist.cached(CUBE_NAME, key, lambda: build_cubes(data), to_frames, from_frames, cache_dir)
+    return replace(cubes, fingerprint=data.fingerprint)
@@ -0,0 +1,48 @@
+# Atributos de tempo derivados, calculados uma única vez no carregamento.
+#
+# Os pedidos ganham colunas inteiras de ano, mês, dia da semana e ano-mês (AAAAMM), e as
+# contagens de pedidos por dia e por mês ficam prontas em tabelas pequenas. As páginas
+# só leem essas tabelas, sem gerar nomes de mês/dia como texto para cada linha e sem
+# escrever colunas novas no dataset em cache.
+import numpy as np
+import pandas as pd
+
+MONTH_NAMES = ['January', 'February', 'March', 'April', 'May', 'June', 'July',
+               'August', 'September', 'October', 'November', 'December']
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+TIME_COLUMN = 'order_purchase_timestamp'
+
+
+def add_time_features(pedidos, column=TIME_COLUMN):
+    # Datas ausentes ficam com -1 em todas as colunas derivadas
+    ts = pedidos[column]
+    pedidos = pedidos.copy()
+    pedidos['year'] = ts.dt.year.fillna(-1).astype('int16')
+    pedidos['month'] = ts.dt.month.fillna(-1).astype('int8')
+    pedidos['weekday'] = ts.dt.weekday.fillna(-1).astype('int8')
+    year_month = pedidos['year'].astype('int32') * 100 + pedidos['month']
+    pedidos['year_month'] = year_month.where(ts.notna(), -1).astype('int32')
+    return pedidos
+
+
+def order_counts(pedidos, column=TIME_COLUMN):
+    # Séries de pedidos por dia e por mês (cada linha de `pedidos` é um pedido)
+    ts = pedidos[column].dropna()
+    days, counts = np.unique(ts.dt.normalize().to_numpy(), return_counts=True)
+    days = pd.DatetimeIndex(days)
+    vendas_diarias = pd.DataFrame({
+        'date': days,
+        'weekday': days.weekday.astype('int8'),
+        'pedidos': counts.astype('int32'),
+    })
+
+    year_month = pedidos.loc[pedidos['year_month'] >= 0, 'year_month'].to_numpy()
+    months, counts = np.unique(year_month, return_counts=True)
+    vendas_mensais = pd.DataFrame({
+        'year_month': months.astype('int32'),
+        'year': (months // 100).astype('int16'),
+        'month': (months % 100).astype('int8'),
+        'pedidos': counts.astype('int32'),
+    })
+    return vendas_diarias, vendas_mensais
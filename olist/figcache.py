@@ -0,0 +1,62 @@
+# Figuras Plotly prontas, guardadas por processo e divididas entre as sessões.
+#
+# Os números de cada página já vêm memorizados de `olist.aggregates`, mas a figura era
+# montada de novo a cada reexecução: o `plotly.express` valida e monta toda a árvore de
+# traços e layout, o que custa mais que a própria agregação. Aqui a figura terminada
+# (com `update_layout`/`update_traces` já aplicados) fica em memória com a chave
+# (impressão digital dos dados, página, nome da figura, parâmetros), e voltar a uma página
+# já vista só a entrega de novo ao `st.plotly_chart`.
+#
+# O cache é um LRU limitado pelo número de figuras (MAX_FIGURES, ou a variável de
+# ambiente OLIST_MAX_FIGURES): as menos usadas saem primeiro. Sem impressão digital a
+# figura só é construída. As figuras são compartilhadas: quem as recebe não deve alterá-las
+# (o `st.plotly_chart` trabalha sobre uma cópia do dicionário da figura).
+import os
+import threading
+from collections import OrderedDict
+
+from olist.aggregates import freeze
+
+MAX_FIGURES = int(os.environ.get('OLIST_MAX_FIGURES', 64))
+
+
+class FigureCache:
+    def __init__(self, max_figures=MAX_FIGURES):
+        self.max_figures = max_figures
+        self.figures = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build):
+        # Figura da chave, construída com `build()` na primeira vez
+        with self.lock:
+            if key in self.figures:
+                self.figures.move_to_end(key)
+                self.hits += 1
+                return self.figures[key]
+            self.misses += 1
+        fig = build()
+        with self.lock:
+            self.figures[key] = fig
+            while len(self.figures) > self.max_figures:
+                self.figures.popitem(last=False)
+        return fig
+
+    def clear(self):
+        with self.lock:
+            self.figures.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self.figures)
+
+
+FIGURES = FigureCache()
+
+
+def figure(fingerprint, page, name, build, **params):
+    # Figura `name` da página com os parâmetros dados, do cache do processo
+    if not fingerprint:
+        return build()
+    return FIGURES.get((fingerprint, page, name, freeze(params)), build)
@@ -0,0 +1,103 @@
+# Motor de estatísticas por grupo sobre códigos inteiros.
+#
+# Para qualquer agrupamento (códigos 0..k-1, -1 = ausente) calcula de uma vez: contagem,
+# soma, soma dos quadrados, média, variância, desvio padrão, erro padrão e, opcionalmente,
+# mediana, moda e intervalo de confiança t. As contagens e somas saem de `np.bincount`; a
+# mediana e a moda saem de uma única ordenação por (grupo, valor); os valores críticos da
+# distribuição t são calculados para todos os grupos numa chamada vetorizada.
+import numpy as np
+import pandas as pd
+
+
+def grouped_stats(codes, values, labels, confidence=None, order_stats=False):
+    codes = np.asarray(codes, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    valid = (codes >= 0) & ~np.isnan(values)
+    codes, values = codes[valid], values[valid]
+    k = len(labels)
+
+    count = np.bincount(codes, minlength=k)
+    total = np.bincount(codes, weights=values, minlength=k)
+    sumsq = np.bincount(codes, weights=values * values, minlength=k)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+        # Variância pelos desvios em relação à média do grupo (mais estável que sumsq - n*média²)
+        m2 = np.bincount(codes, weights=(values - mean[codes]) ** 2, minlength=k)
+        var = np.where(count > 1, m2 / (count - 1), np.nan)
+        std = np.sqrt(var)
+        sem = std / np.sqrt(count)
+
+    result = pd.DataFrame({'count': count, 'sum': total, 'sumsq': sumsq, 'mean': mean,
+                           'var': var, 'std': std, 'sem': sem}, index=pd.Index(labels))
+
+    if order_stats:
+        result['median'], result['mode'] = _median_and_mode(codes, values, count)
+
+    if confidence is not None:
+        _add_confidence_interval(result, confidence)
+
+    return result[result['count'] > 0]
+
+
+def stats_from_sums(count, total, sumsq, labels, confidence=None):
+    # Mesmas colunas de `grouped_stats` (sem mediana e moda) a partir de contagens e somas
+    # já agregadas, por exemplo as células de `olist.cube`
+    count = np.asarray(count, dtype=np.float64)
+    total = np.asarray(total, dtype=np.float64)
+    sumsq = np.asarray(sumsq, dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+        var = np.where(count > 1, np.maximum(sumsq - total * mean, 0.0) / (count - 1), np.nan)
+        std = np.sqrt(var)
+        sem = std / np.sqrt(count)
+
+    result = pd.DataFrame({'count': count.astype(np.int64), 'sum': total, 'sumsq': sumsq, 'mean': mean,
+                           'var': var, 'std': std, 'sem': sem}, index=pd.Index(labels))
+    if confidence is not None:
+        _add_confidence_interval(result, confidence)
+    return result[result['count'] > 0]
+
+
+def _add_confidence_interval(result, confidence):
+    # Margem do IC t para todos os grupos numa única chamada vetorizada
+    from scipy import stats
+    count = result['count'].to_numpy()
+    critical = np.zeros(len(result))
+    several = count > 1
+    critical[several] = stats.t.ppf((1 + confidence) / 2, count[several] - 1)
+    result['ci_margin'] = np.where(several, critical * result['sem'].to_numpy(), 0.0)
+    result['ci_low'] = result['mean'] - result['ci_margin']
+    result['ci_high'] = result['mean'] + result['ci_margin']
+
+
+def _median_and_mode(codes, values, count):
+    k = len(count)
+    order = np.lexsort((values, codes))
+    sorted_codes, sorted_values = codes[order], values[order]
+    starts = np.concatenate([[0], np.cumsum(count)[:-1]])
+
+    median = np.full(k, np.nan)
+    has = count > 0
+    low = starts[has] + (count[has] - 1) // 2
+    high = starts[has] + count[has] // 2
+    median[has] = (sorted_values[low] + sorted_values[high]) / 2
+
+    # Moda: maior sequência de valores iguais dentro de cada grupo (empate -> menor valor,
+    # como `Series.mode()[0]`)
+    mode = np.full(k, np.nan)
+    if len(sorted_codes):
+        change = np.r_[True, (sorted_codes[1:] != sorted_codes[:-1]) | (sorted_values[1:] != sorted_values[:-1])]
+        run_starts = np.flatnonzero(change)
+        run_lengths = np.diff(np.r_[run_starts, len(sorted_codes)])
+        run_codes, run_values = sorted_codes[run_starts], sorted_values[run_starts]
+        best = np.lexsort((run_values, -run_lengths, run_codes))
+        first = np.r_[True, run_codes[best][1:] != run_codes[best][:-1]]
+        mode[run_codes[best][first]] = run_values[best][first]
+    return median, mode
+
+
+def grouped_stats_by(groups, values, confidence=None, order_stats=False):
+    # Atalho para agrupar por uma Series categórica (usa os códigos e as categorias)
+    groups = groups.astype('category')
+    return grouped_stats(groups.cat.codes.to_numpy(), values, groups.cat.categories,
+                         confidence=confidence, order_stats=order_stats)
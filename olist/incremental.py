@@ -0,0 +1,328 @@
+# Atualização incremental: lotes novos de pedidos sem reprocessar o histórico.
+#
+# Os pedidos novos chegam em exportações mensais com o mesmo formato dos CSVs. Em vez de
+# substituir os CSVs (o que muda a impressão digital e faz `load_data()` e todas as
+# agregações recalcularem sobre tudo), o modo de acréscimo lê só o lote e atualiza
+# resumos mergeáveis, guardados em disco em `CACHE_DIR/olist_incremental`:
+#   - os cubos dos filtros (`olist.cube`): contagens, somas e somas dos quadrados por
+#     estado x categoria x pagamento x ano-mês x nota, que também dão as tabelas de
+#     contingência e os momentos (média/variância) das páginas filtradas;
+#   - momentos de preço e frete e as somas cruzadas dos dois (`olist.sketches`);
+#   - sketches de quantis de preço e frete (medianas, quartis e o quantil 0,99);
+#   - o conjunto de pedidos já vistos em cada período (ano-mês), um arquivo Parquet por
+#     período: linhas de um pedido que já entrou (ex.: exportações sobrepostas) são
+#     ignoradas, então cada pedido é contado uma única vez.
+# O lote vira um `OlistData` próprio (`ingest.compact_data`) e seus resumos são somados
+# aos anteriores: o custo depende do tamanho do lote e dos resumos, não do histórico. Só
+# os períodos presentes no lote têm o conjunto de pedidos lido e regravado.
+#
+# Na primeira vez (ou se os CSVs de base mudarem) os resumos são montados a partir das
+# tabelas completas. Cada lote aplicado gera uma chave nova (chave anterior + hash do
+# lote); o dashboard usa os resumos da chave atual quando ela corresponde aos CSVs de
+# base carregados. A correlação de preço e frete e os cortes no quantil 0,99 saem dos
+# resumos; as visões que precisam das linhas (reta e pontos da dispersão, fotos,
+# distribuições discretas, amostra) continuam vindo das tabelas carregadas.
+#
+#   python -m olist.incremental pedidos_2018_09.csv pagamentos_2018_09.csv
+import argparse
+import datetime
+import hashlib
+import os
+import shutil
+import time
+from dataclasses import asdict, dataclass, replace
+
+import numpy as np
+import pandas as pd
+
+from olist import aggregates, cube, ingest, persist, sketches, summaries
+from olist.persist import CACHE_DIR
+
+STATE_DIR_NAME = 'olist_incremental'
+STATE_NAME = 'estado.json'
+ORDERS_DIR_NAME = 'pedidos'
+# Incrementar sempre que o formato do estado mudar (o estado antigo é reconstruído)
+STATE_VERSION = 1
+NO_PERIOD = -1
+
+
+@dataclass(frozen=True)
+class Resumos:
+    cubes: cube.OlistCubes
+    preco: sketches.Moments
+    frete: sketches.Moments
+    preco_frete: sketches.PairMoments
+    quantis_preco: sketches.QuantileSketch
+    quantis_frete: sketches.QuantileSketch
+    # Chave dos resumos (CSVs de base + lotes aplicados), usada como impressão digital
+    fingerprint: str = ''
+
+    def merge(self, other):
+        return Resumos(cubes=cube.merge_cubes(self.cubes, other.cubes), preco=self.preco.merge(other.preco),
+                       frete=self.frete.merge(other.frete), preco_frete=self.preco_frete.merge(other.preco_frete),
+                       quantis_preco=self.quantis_preco.merge(other.quantis_preco),
+                       quantis_frete=self.quantis_frete.merge(other.quantis_frete))
+
+    def with_key(self, key):
+        return replace(self, cubes=replace(self.cubes, fingerprint=key), fingerprint=key)
+
+
+def build_summaries(data):
+    price, freight = data.itens['price'], data.itens['freight_value']
+    return Resumos(cubes=cube.build_cubes(data),
+                   preco=sketches.Moments.from_values(price), frete=sketches.Moments.from_values(freight),
+                   preco_frete=sketches.PairMoments.from_values(price, freight),
+                   quantis_preco=sketches.QuantileSketch.from_values(price),
+                   quantis_frete=sketches.QuantileSketch.from_values(freight))
+
+
+def _to_frames(resumos):
+    frames, cube_meta = cube.to_frames(resumos.cubes)
+    frames = {f'cubo_{name}': frame for name, frame in frames.items()}
+    frames['quantis_preco'] = resumos.quantis_preco.to_frame()
+    frames['quantis_frete'] = resumos.quantis_frete.to_frame()
+    meta = {'cubos': cube_meta,
+            'momentos': {name: asdict(getattr(resumos, name)) for name in ('preco', 'frete', 'preco_frete')},
+            'quantis': {name: {'zeros': getattr(resumos, name).zeros, 'alpha': getattr(resumos, name).alpha}
+                        for name in ('quantis_preco', 'quantis_frete')}}
+    return frames, meta
+
+
+def _from_frames(frames, meta):
+    cubes = cube.from_frames({name[len('cubo_'):]: frame for name, frame in frames.items() if name.startswith('cubo_')},
+                             meta['cubos'])
+    momentos = meta['momentos']
+    return Resumos(cubes=cubes, preco=sketches.Moments(**momentos['preco']),
+                   frete=sketches.Moments(**momentos['frete']),
+                   preco_frete=sketches.PairMoments(**momentos['preco_frete']),
+                   **{name: sketches.QuantileSketch.from_frame(frames[name], **meta['quantis'][name])
+                      for name in ('quantis_preco', 'quantis_frete')})
+
+
+# --- Estado em disco ---
+
+def _state_dir(cache_dir):
+    return os.path.join(cache_dir, STATE_DIR_NAME)
+
+
+def _summaries_name(key):
+    return f"resumos-{key[:16]}"
+
+
+def read_state(cache_dir=CACHE_DIR):
+    estado = persist.read_json(os.path.join(_state_dir(cache_dir), STATE_NAME))
+    if not estado or estado.get('versao') != STATE_VERSION:
+        return None
+    return estado
+
+
+def current_key(fingerprint, cache_dir=CACHE_DIR):
+    # Chave dos resumos atualizados sobre os CSVs de impressão digital `fingerprint`, ou
+    # None se nenhum lote foi aplicado a eles
+    estado = read_state(cache_dir)
+    if estado is None or estado['base'] != fingerprint or not estado['lotes']:
+        return None
+    return estado['chave']
+
+
+def load_summaries(key, cache_dir=CACHE_DIR):
+    # Resumos gravados com a chave `key` (None se não existem ou estão corrompidos)
+    entry = persist.read_entry(_summaries_name(key), key, _state_dir(cache_dir))
+    if entry is None:
+        return None
+    return _from_frames(*entry).with_key(key)
+
+
+def _periods(timestamps):
+    # Ano-mês (AAAAMM) de cada linha, como em `features.add_time_features`
+    ts = pd.to_datetime(timestamps)
+    return (ts.dt.year * 100 + ts.dt.month).fillna(NO_PERIOD).astype(np.int64).to_numpy()
+
+
+def _read_orders(state_dir, estado, period):
+    file_name = estado['periodos'].get(str(period))
+    if file_name is None:
+        return pd.Index([], dtype=object)
+    return pd.Index(pd.read_parquet(os.path.join(state_dir, ORDERS_DIR_NAME, file_name))['order_id'])
+
+
+def _commit(estado, resumos, novos_periodos, cache_dir):
+    # Grava os resumos e os conjuntos de pedidos com nomes da chave nova e só então troca
+    # o `estado.json`: uma atualização interrompida deixa o estado anterior intacto
+    state_dir = _state_dir(cache_dir)
+    key = estado['chave']
+    frames, meta = _to_frames(resumos)
+    persist.write_entry(_summaries_name(key), key, frames, meta, state_dir)
+    if persist.entry_files(_summaries_name(key), key, state_dir) is None:
+        raise OSError(f"Não foi possível gravar os resumos em {state_dir}")
+
+    orders_dir = os.path.join(state_dir, ORDERS_DIR_NAME)
+    os.makedirs(orders_dir, exist_ok=True)
+    anterior = persist.read_json(os.path.join(state_dir, STATE_NAME)) or {}
+    substituidos = []
+    for period, ids in novos_periodos.items():
+        file_name = f"{period}-{key[:16]}.parquet"
+        pd.DataFrame({'order_id': pd.Series(ids, dtype=object)}).to_parquet(os.path.join(orders_dir, file_name))
+        if str(period) in estado['periodos']:
+            substituidos.append(os.path.join(orders_dir, estado['periodos'][str(period)]))
+        estado['periodos'][str(period)] = file_name
+    persist.write_json(os.path.join(state_dir, STATE_NAME), estado)
+
+    # Arquivos da chave anterior que deixaram de ser usados
+    for path in substituidos:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    if anterior.get('chave') and anterior['chave'] != key:
+        shutil.rmtree(os.path.join(state_dir, _summaries_name(anterior['chave'])), ignore_errors=True)
+
+
+def _bootstrap(cache_dir):
+    # Resumos e conjuntos de pedidos a partir das tabelas completas (uma única vez por base)
+    data = ingest.load_tables(cache_dir)
+    if os.path.isdir(_state_dir(cache_dir)):
+        shutil.rmtree(_state_dir(cache_dir))
+    estado = {'versao': STATE_VERSION, 'base': data.fingerprint, 'chave': data.fingerprint,
+              'periodos': {}, 'lotes': []}
+    pedidos = data.pedidos.loc[data.pedidos['order_id'].notna(), ['order_id', 'year_month']]
+    periodos = {int(period): grupo.astype(str).to_numpy()
+                for period, grupo in pedidos.groupby('year_month', observed=True)['order_id']}
+    resumos = build_summaries(data)
+    _commit(estado, resumos, periodos, cache_dir)
+    return estado, resumos
+
+
+def batch_hash(analise_csv, pagamentos_csv, cache_dir=CACHE_DIR):
+    digests = [persist.file_hash(path, cache_dir) for path in (analise_csv, pagamentos_csv)]
+    return hashlib.sha256(''.join(digests).encode()).hexdigest()[:32]
+
+
+def append(analise_csv, pagamentos_csv, cache_dir=CACHE_DIR):
+    # Aplica um lote (CSV de análise e de pagamentos) aos resumos e devolve um relatório
+    if persist.pq is None:
+        raise ModuleNotFoundError("A atualização incremental exige o pacote pyarrow", name='pyarrow')
+    estado = read_state(cache_dir)
+    if estado is None or estado['base'] != ingest.data_fingerprint(cache_dir):
+        estado, resumos = _bootstrap(cache_dir)
+    else:
+        resumos = load_summaries(estado['chave'], cache_dir)
+        if resumos is None:
+            raise OSError(f"Resumos da chave {estado['chave']} não encontrados; apague "
+                          f"{_state_dir(cache_dir)} para reconstruí-los a partir dos CSVs de base")
+
+    lote = batch_hash(analise_csv, pagamentos_csv, cache_dir)
+    relatorio = {'lote': lote, 'arquivos': [os.path.basename(analise_csv), os.path.basename(pagamentos_csv)]}
+    if any(aplicado['hash'] == lote for aplicado in estado['lotes']):
+        return {**relatorio, 'aplicado': False, 'chave': estado['chave']}
+
+    # Linhas de pedidos que já entraram (no mesmo período) ficam de fora
+    df, df_payments = ingest.read_sources(analise_csv, pagamentos_csv)
+    period = _periods(df['order_purchase_timestamp'])
+    order_id = df['order_id'].astype(str)
+    repetido = np.zeros(len(df), dtype=bool)
+    periodos = {}
+    state_dir = _state_dir(cache_dir)
+    for p in np.unique(period):
+        no_periodo = period == p
+        vistos = _read_orders(state_dir, estado, int(p))
+        repetido |= no_periodo & order_id.isin(vistos).to_numpy()
+        novos = order_id[no_periodo & ~repetido].unique()
+        if len(novos):
+            periodos[int(p)] = np.concatenate([vistos.to_numpy(dtype=object), novos])
+    df = df[~repetido].reset_index(drop=True)
+
+    key = hashlib.sha256((estado['chave'] + lote).encode()).hexdigest()[:32]
+    if len(df):
+        resumos = resumos.merge(build_summaries(ingest.compact_data(df, df_payments)))
+    estado = {**estado, 'chave': key, 'periodos': dict(estado['periodos']),
+              'lotes': estado['lotes'] + [{'hash': lote, 'arquivos': relatorio['arquivos'],
+                                           'linhas': int(len(df)), 'linhas_repetidas': int(repetido.sum()),
+                                           'pedidos': int(df['order_id'].nunique()),
+                                           'em': datetime.datetime.now().isoformat(timespec='seconds')}]}
+    _commit(estado, resumos, periodos, cache_dir)
+    return {**relatorio, 'aplicado': True, 'chave': key, **estado['lotes'][-1]}
+
+
+# --- Resultados das páginas a partir dos resumos ---
+
+@aggregates.memoize(ignore=('data',))
+def descriptive_summary(resumos, data=None):
+    # Mesmo resultado de `aggregates.descriptive_summary`: as notas são exatas (contagem
+    # por nota no cubo de pedidos); no preço, contagem, média, desvio, mínimo e máximo são
+    # exatos e os quartis vêm do sketch (erro relativo de `sketches.SKETCH_ALPHA`)
+    notas = resumos.cubes.pedidos.total('review_score')
+    notas = notas[notas > 0]
+    valores = notas.index.to_numpy(dtype=np.float64)
+    contagens = notas.to_numpy().astype(np.int64)
+    box = summaries.box_stats_from_counts(valores, contagens, 'review_score')
+    n = contagens.sum()
+    media = (valores * contagens).sum() / n
+    desvio = np.sqrt(((valores - media) ** 2 * contagens).sum() / (n - 1)) if n > 1 else np.nan
+    resumo_nota = pd.Series({'count': n, 'mean': media, 'std': desvio, 'min': valores.min(),
+                             '25%': box['q1'].iloc[0], '50%': box['median'].iloc[0], '75%': box['q3'].iloc[0],
+                             'max': valores.max()}, name='review_score', dtype=np.float64)
+
+    preco, quantis = resumos.preco, resumos.quantis_preco
+    resumo_preco = pd.Series({'count': preco.n, 'mean': preco.mean, 'std': preco.std, 'min': preco.min,
+                              '25%': quantis.quantile(0.25), '50%': quantis.quantile(0.5),
+                              '75%': quantis.quantile(0.75), 'max': preco.max}, name='price', dtype=np.float64)
+    return aggregates.DescriptiveSummary(resumo_nota=resumo_nota, moda_nota=valores[np.argmax(contagens)],
+                                         resumo_preco=resumo_preco, valores_nota=valores, contagens_nota=contagens,
+                                         box_nota=box)
+
+
+def _price_freight_filtered(resumos, data, quantile_threshold):
+    # Itens das tabelas carregadas abaixo dos cortes no quantil, tirados dos sketches (base
+    # + lotes)
+    df = data.itens[['price', 'freight_value']].dropna()
+    return df[(df['price'] < resumos.quantis_preco.quantile(quantile_threshold)) &
+              (df['freight_value'] < resumos.quantis_frete.quantile(quantile_threshold))]
+
+
+@aggregates.memoize(ignore=('data',))
+def price_freight(resumos, data, quantile_threshold=0.99):
+    # Como `aggregates.price_freight`: a correlação vem das somas cruzadas de todos os
+    # itens (base + lotes); a reta OLS e a grade, das linhas carregadas abaixo dos cortes
+    df = _price_freight_filtered(resumos, data, quantile_threshold)
+    return aggregates.PriceFreight(correlacao=resumos.preco_frete.ols_fit()['r'],
+                                   fit=summaries.ols_fit(df['price'], df['freight_value']),
+                                   grade=summaries.density_grid(df['price'], df['freight_value']))
+
+
+@aggregates.memoize(ignore=('data',))
+def price_freight_sample(resumos, data, quantile_threshold=0.99, max_points=5000):
+    df = _price_freight_filtered(resumos, data, quantile_threshold)
+    return df.iloc[summaries.stratified_sample(df['price'], max_points=max_points)].reset_index(drop=True)
+
+
+# Análises das páginas que os resumos substituem (mesmos nomes de `olist.bundle.ANALYSES`).
+# Recebem os resumos e o dataset carregado (que não entra na chave da memória: a chave dos
+# resumos já identifica os CSVs de base)
+ANALYSES = {'descriptive_summary': descriptive_summary, 'price_freight': price_freight,
+            'price_freight_sample': price_freight_sample}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Acrescenta um lote de pedidos novos aos resumos do dashboard.")
+    parser.add_argument('analise', help=f"CSV do lote no formato de {ingest.ANALISE_CSV}")
+    parser.add_argument('pagamentos', help=f"CSV do lote no formato de {ingest.PAGAMENTOS_CSV}")
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help="cache em disco dos dados e dos resumos")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    relatorio = append(args.analise, args.pagamentos, args.cache_dir)
+    if not relatorio['aplicado']:
+        print(f"Lote {relatorio['lote']} já aplicado; nada a fazer.")
+        return
+    resumos = load_summaries(relatorio['chave'], args.cache_dir)
+    print(f"Lote {relatorio['lote']}: {relatorio['linhas']} linhas novas, {relatorio['pedidos']} pedidos novos, "
+          f"{relatorio['linhas_repetidas']} linhas de pedidos já vistos ignoradas "
+          f"({time.perf_counter() - inicio:.1f} s)")
+    print(f"Total: {int(resumos.cubes.pedidos.cells['count'].sum())} pedidos, {int(resumos.cubes.itens.cells['count'].sum())} itens")
+    for nome, quantis in (('Preço', resumos.quantis_preco), ('Frete', resumos.quantis_frete)):
+        print(f"{nome}: mediana R$ {quantis.quantile(0.5):.2f}, quantil 0,99 R$ {quantis.quantile(0.99):.2f}")
+
+
+if __name__ == '__main__':
+    main()
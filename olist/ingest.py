@@ -0,0 +1,73 @@
+# Leitura dos CSVs da Olist com snapshot colunar (Parquet) para acelerar o cold start.
+#
+# Na primeira execução os CSVs são lidos, tipados, compactados (`olist.schema`) e
+# separados nas tabelas do modelo estrela (`olist.tables`). As tabelas ficam no cache em
+# disco (`olist.persist`), uma por arquivo Parquet, lidas com memory map nas execuções
+# seguintes no lugar dos CSVs. A entrada do cache é marcada com a impressão digital dos
+# CSVs (conteúdo) e dos módulos que montam as tabelas: se um CSV ou esse código mudar, o
+# snapshot é reconstruído.
+from dataclasses import replace
+
+import pandas as pd
+
+from olist import persist
+from olist.persist import CACHE_DIR
+from olist.schema import compact_frame
+from olist.tables import OlistData, build_tables
+
+ANALISE_CSV = 'olist_analise_completa.csv'
+PAGAMENTOS_CSV = 'olist_order_payments_dataset.csv'
+SOURCE_FILES = [ANALISE_CSV, PAGAMENTOS_CSV]
+DATE_COLUMNS = ['order_purchase_timestamp', 'order_delivered_customer_date']
+
+SNAPSHOT_NAME = 'olist_tables'
+# Módulos cujo código entra na impressão digital do snapshot
+CODE_MODULES = ['ingest', 'schema', 'tables', 'features']
+
+
+def read_sources(analise_csv=ANALISE_CSV, pagamentos_csv=PAGAMENTOS_CSV):
+    # Carregando os datasets
+    df = pd.read_csv(analise_csv)
+    df_payments = pd.read_csv(pagamentos_csv)
+
+    # Convertendo colunas de data
+    for col in DATE_COLUMNS:
+        df[col] = pd.to_datetime(df[col])
+
+    return df, df_payments
+
+
+def build_data():
+    return compact_data(*read_sources())
+
+
+def compact_data(df, df_payments):
+    # Tabelas do modelo estrela a partir dos dataframes lidos dos CSVs (ou de um lote deles)
+    df, report_analise = compact_frame(df)
+    df_payments, report_payments = compact_frame(df_payments)
+    report_analise.insert(0, 'arquivo', ANALISE_CSV)
+    report_payments.insert(0, 'arquivo', PAGAMENTOS_CSV)
+    memory_report = pd.concat([report_analise, report_payments], ignore_index=True)
+    return build_tables(df, df_payments, memory_report)
+
+
+def _to_frames(data):
+    frames = {name: getattr(data, name) for name in OlistData.TABLES}
+    return frames, {'memory_report': data.memory_report.to_dict('records')}
+
+
+def _from_frames(frames, meta):
+    return OlistData(memory_report=pd.DataFrame(meta['memory_report']), **frames)
+
+
+def data_fingerprint(cache_dir=CACHE_DIR):
+    # Impressão digital dos CSVs (conteúdo) e do código que monta as tabelas
+    return persist.fingerprint(SOURCE_FILES, CODE_MODULES, cache_dir)
+
+
+def load_tables(cache_dir=CACHE_DIR):
+    # Retorna o `OlistData` com as tabelas do modelo estrela e o relatório de memória,
+    # lido do cache em disco quando ele é da mesma impressão digital
+    key = data_fingerprint(cache_dir)
+    data = persist.cached(SNAPSHOT_NAME, key, build_data, _to_frames, _from_frames, cache_dir)
+    return replace(data, fingerprint=key)
@@ -0,0 +1,51 @@
+# Importação preguiçosa dos módulos pesados das páginas de análise.
+#
+# `lazy_import` devolve um objeto que só importa o módulo de verdade no primeiro acesso a
+# um atributo (ex.: `px.bar`). Assim, abrir uma página que não usa scipy ou plotly não
+# paga o tempo de importação dessas bibliotecas. O objeto não é registrado em
+# `sys.modules` (diferente do `importlib.util.LazyLoader`), porque o observador de
+# arquivos do Streamlit percorre `sys.modules` e acabaria disparando as importações.
+import importlib
+import importlib.util
+import sys
+
+# Módulos pesados usados por cada página da barra lateral (usado pelo relatório de
+# cold start em `olist.coldstart`)
+PAGE_MODULES = {
+    "Conhecendo o Dataset": [],
+    "Análise Descritiva Geral": ['olist.charts'],
+    "Hábitos de Compra por Estado": ['plotly.express'],
+    "Padrões Sazonais de Vendas": ['plotly.express'],
+    "Avaliação por Categoria Popular": ['plotly.express', 'olist.charts'],
+    "Satisfação por Tipo de Pagamento": ['plotly.express', 'scipy.stats'],
+    "Análise de Fotos vs. Vendas": ['plotly.express', 'scipy.stats', 'olist.charts'],
+    "Qui-Quadrado (Categoria vs. Estado)": ['plotly.express', 'scipy.stats'],
+}
+
+
+class LazyModule:
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        state = 'carregado' if self._module is not None else 'não carregado'
+        return f"<LazyModule {self._name!r} ({state})>"
+
+
+def lazy_import(name):
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    if importlib.util.find_spec(name) is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    return LazyModule(name)
+
+
+def is_loaded(name):
+    return name in sys.modules
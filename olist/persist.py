@@ -0,0 +1,166 @@
+# Cache persistente em disco para os dados carregados e as tabelas derivadas.
+#
+# Cada entrada é um diretório dentro de `CACHE_DIR` com uma tabela Parquet por dataframe
+# e um manifesto JSON. O manifesto guarda a impressão digital (`fingerprint`) com que a
+# entrada foi gerada: o conteúdo dos CSVs de origem (tamanho e SHA-256) e a versão do
+# código que transforma os dados (hash dos módulos de `olist` envolvidos). Se o CSV ou o
+# código mudar, a impressão digital muda, a entrada antiga deixa de valer e é
+# reconstruída; um processo novo (restart, redeploy, outra réplica com o mesmo diretório)
+# encontra a entrada válida e já começa aquecido.
+#
+# Para não reler os CSVs inteiros a cada execução, o hash de cada arquivo fica memorizado
+# em `hashes.json` junto com o tamanho e o mtime e só é recalculado quando um dos dois
+# muda. Uma cópia com outro mtime mas o mesmo conteúdo (ex.: redeploy) gera o mesmo hash
+# e continua aproveitando o cache.
+import functools
+import hashlib
+import json
+import os
+import shutil
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # sem pyarrow o dashboard continua funcionando, só sem o cache em disco
+    pa = None
+    pq = None
+
+CACHE_DIR = os.environ.get('OLIST_CACHE_DIR', '.cache')
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+MANIFEST_NAME = 'manifest.json'
+HASHES_NAME = 'hashes.json'
+# Incrementar sempre que o formato das entradas mudar, para invalidar entradas antigas
+CACHE_VERSION = 5
+HASH_BLOCK = 1 << 20
+
+
+def read_json(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json(path, value):
+    # Grava em um arquivo temporário e troca no final (nunca deixa um JSON pela metade)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(value, f)
+    os.replace(tmp_path, path)
+
+
+def file_hash(path, cache_dir=CACHE_DIR):
+    # SHA-256 do conteúdo, reaproveitado de `hashes.json` se tamanho e mtime não mudaram
+    # (os.stat levanta FileNotFoundError, com o nome do arquivo, se ele não existir)
+    info = os.stat(path)
+    key = os.path.abspath(path)
+    memo_path = os.path.join(cache_dir, HASHES_NAME)
+    memo = read_json(memo_path) or {}
+    size, mtime, digest = memo.get(key, (None, None, None))
+    if (size, mtime) == (info.st_size, info.st_mtime_ns):
+        return digest
+
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b''):
+            sha.update(block)
+    digest = sha.hexdigest()
+    memo[key] = [info.st_size, info.st_mtime_ns, digest]
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        write_json(memo_path, memo)
+    except OSError:
+        pass  # diretório sem permissão de escrita: o hash é recalculado da próxima vez
+    return digest
+
+
+@functools.lru_cache(maxsize=None)
+def code_version(modules):
+    # Hash do código-fonte dos módulos de `olist` que produzem a entrada (o código não
+    # muda durante a vida do processo, então basta calcular uma vez)
+    sha = hashlib.sha256(str(CACHE_VERSION).encode())
+    for module in modules:
+        with open(os.path.join(PACKAGE_DIR, f"{module}.py"), 'rb') as f:
+            sha.update(f.read())
+    return sha.hexdigest()
+
+
+def fingerprint(paths, modules, cache_dir=CACHE_DIR):
+    # Impressão digital dos arquivos de origem (nome, tamanho e conteúdo) e do código
+    sources = [[os.path.basename(p), os.path.getsize(p), file_hash(p, cache_dir)] for p in paths]
+    payload = json.dumps({'sources': sources, 'code': code_version(tuple(modules))}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+def _valid_manifest(entry_dir, key):
+    manifest = read_json(os.path.join(entry_dir, MANIFEST_NAME))
+    if not manifest or manifest.get('fingerprint') != key:
+        return None
+    return manifest
+
+
+def entry_files(name, key, cache_dir=CACHE_DIR):
+    # Caminho do arquivo Parquet de cada tabela da entrada `name`, ou None se ela não
+    # existe ou é de outra impressão digital (para quem lê os arquivos direto, ex.: DuckDB)
+    entry_dir = os.path.join(cache_dir, name)
+    manifest = _valid_manifest(entry_dir, key)
+    if manifest is None:
+        return None
+    return {table_name: os.path.join(entry_dir, f"{table_name}.parquet") for table_name in manifest['tables']}
+
+
+def read_entry(name, key, cache_dir=CACHE_DIR):
+    # Dataframes e metadados da entrada `name`, ou None se ela não existe, é de outra
+    # impressão digital ou está corrompida
+    if pq is None:
+        return None
+    entry_dir = os.path.join(cache_dir, name)
+    manifest = _valid_manifest(entry_dir, key)
+    if manifest is None:
+        return None
+    try:
+        frames = {}
+        for table_name in manifest['tables']:
+            table = pq.read_table(os.path.join(entry_dir, f"{table_name}.parquet"), memory_map=True)
+            frames[table_name] = table.to_pandas(split_blocks=True, self_destruct=True)
+    except (OSError, pa.ArrowException):
+        return None  # entrada removida pela metade: reconstrói
+    return frames, manifest['meta']
+
+
+def write_entry(name, key, frames, meta=None, cache_dir=CACHE_DIR):
+    # Grava tudo em um diretório temporário e troca no final, para que uma leitura
+    # concorrente nunca encontre uma entrada pela metade. Falhar ao gravar (ex.: deploy
+    # read-only) nunca derruba quem chamou: só fica sem cache em disco
+    if pq is None:
+        return
+    entry_dir = os.path.join(cache_dir, name)
+    tmp_dir = f"{entry_dir}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(tmp_dir, exist_ok=True)
+        for table_name, frame in frames.items():
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            pq.write_table(table, os.path.join(tmp_dir, f"{table_name}.parquet"))
+        manifest = {'fingerprint': key, 'tables': list(frames), 'meta': meta or {}}
+        with open(os.path.join(tmp_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.replace(tmp_dir, entry_dir)
+    except OSError:
+        pass
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def cached(name, key, build, to_frames, from_frames, cache_dir=CACHE_DIR):
+    # Lê a entrada `name` do disco se ela for da impressão digital `key`; senão chama
+    # `build()` e grava o resultado. `to_frames(valor)` devolve (dataframes, metadados
+    # JSON) e `from_frames(dataframes, metadados)` reconstrói o valor
+    entry = read_entry(name, key, cache_dir)
+    if entry is not None:
+        return from_frames(*entry)
+    value = build()
+    frames, meta = to_frames(value)
+    write_entry(name, key, frames, meta, cache_dir)
+    return value
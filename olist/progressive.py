@@ -0,0 +1,166 @@
+# Resultados progressivos da página "Análise Descritiva Geral".
+#
+# Os resumos exatos da página (`describe()` da nota e do preço, moda, correlação de
+# Pearson, cortes no quantil 0,99, reta OLS e grade de densidade) varrem todas as linhas:
+# em datasets grandes nada aparece até o fim da conta. No modo progressivo:
+#   1. o cálculo exato é enviado para uma thread de fundo (`refine`), uma única vez por
+#      impressão digital dos dados e parâmetros; o resultado cai na memória de
+#      `olist.aggregates`, dividida entre as sessões;
+#   2. enquanto ele não termina, a página mostra estimativas de uma amostra uniforme de
+#      tamanho fixo (`SAMPLE_SIZE` linhas), com a meia-largura do intervalo de confiança
+#      de cada número. Contagem, mínimo e máximo são baratos e já saem exatos;
+#   3. quando a thread termina, a página reexecuta e troca as estimativas pelos valores
+#      exatos.
+# O custo da primeira pintura depende do tamanho da amostra, não do dataset.
+#
+# Intervalos (nível `CONFIDENCE`): média pelo t com correção de população finita; desvio
+# padrão pela aproximação normal; quantis (quartis, mediana e os cortes de 0,99) pelas
+# estatísticas de ordem da amostra, sem supor distribuição; correlação pela
+# transformação z de Fisher.
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from olist import aggregates, summaries
+
+SAMPLE_SIZE = 20_000
+CONFIDENCE = 0.95
+# A partir de quantas linhas de itens o modo progressivo começa ligado (variável de
+# ambiente OLIST_PROGRESSIVE_ROWS)
+MIN_ROWS = int(os.environ.get('OLIST_PROGRESSIVE_ROWS', 500_000))
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='olist-refino')
+_futures = OrderedDict()
+_lock = threading.Lock()
+
+
+def refine(fn, source, *args, **kwargs):
+    # Future com o resultado exato de `fn(source, ...)`, calculado numa thread de fundo;
+    # chamadas repetidas (reexecuções, outras sessões) recebem o mesmo future
+    if not getattr(source, 'fingerprint', ''):
+        future = Future()
+        future.set_result(fn(source, *args, **kwargs))
+        return future
+    key = (fn.__qualname__, source.fingerprint, aggregates.freeze(args), aggregates.freeze(kwargs))
+    with _lock:
+        if key in _futures:
+            _futures.move_to_end(key)
+            return _futures[key]
+        future = _futures[key] = _executor.submit(fn, source, *args, **kwargs)
+        while len(_futures) > aggregates.MEMO_SIZE:
+            _futures.popitem(last=False)
+    return future
+
+
+def _sample(n_total, sample_size, seed):
+    # Índices ordenados de uma amostra uniforme sem reposição
+    if n_total <= sample_size:
+        return np.arange(n_total)
+    return np.sort(np.random.default_rng(seed).choice(n_total, size=sample_size, replace=False))
+
+
+def _quantile_error(sorted_sample, q, z):
+    # Meia-largura do IC do quantil q pelas estatísticas de ordem (posto n*q ± z*sqrt(n*q*(1-q)))
+    n = len(sorted_sample)
+    spread = z * np.sqrt(n * q * (1 - q))
+    low = sorted_sample[max(int(np.floor(n * q - spread)), 0)]
+    high = sorted_sample[min(int(np.ceil(n * q + spread)), n - 1)]
+    return float(high - low) / 2
+
+
+def _describe(column, sample, n_population, confidence):
+    # Mesmo índice do `describe()`, com a meia-largura do IC de cada estimativa
+    from scipy import stats
+    values = column.to_numpy(dtype=np.float64)
+    sample = np.sort(sample[~np.isnan(sample)])
+    n = len(sample)
+    z = stats.norm.ppf((1 + confidence) / 2)
+    t = stats.t.ppf((1 + confidence) / 2, max(n - 1, 1))
+    std = sample.std(ddof=1) if n > 1 else np.nan
+    fpc = np.sqrt(max(1 - n / n_population, 0.0)) if n_population else 0.0
+    estimates = {'count': np.count_nonzero(~np.isnan(values)), 'mean': sample.mean(), 'std': std,
+                 'min': np.nanmin(values), '25%': np.quantile(sample, 0.25), '50%': np.quantile(sample, 0.5),
+                 '75%': np.quantile(sample, 0.75), 'max': np.nanmax(values)}
+    errors = {'count': 0.0, 'mean': t * std / np.sqrt(n) * fpc, 'std': z * std / np.sqrt(2 * (n - 1)) * fpc,
+              'min': 0.0, '25%': _quantile_error(sample, 0.25, z), '50%': _quantile_error(sample, 0.5, z),
+              '75%': _quantile_error(sample, 0.75, z), 'max': 0.0}
+    return (pd.Series(estimates, name=column.name, dtype=np.float64),
+            pd.Series(errors, name=column.name, dtype=np.float64))
+
+
+@dataclass(frozen=True)
+class ApproxDescriptive:
+    resumo: aggregates.DescriptiveSummary
+    erros_nota: pd.Series
+    erros_preco: pd.Series
+    amostra: int
+    total: int
+
+
+@aggregates.memoize
+def approximate_descriptive(data, sample_size=SAMPLE_SIZE, confidence=CONFIDENCE, seed=0):
+    # `aggregates.descriptive_summary` estimado de uma amostra uniforme das linhas
+    review = data.pedidos['review_score']
+    price = data.itens['price']
+    review_sample = review.to_numpy(dtype=np.float64)[_sample(len(review), sample_size, seed)]
+    price_sample = price.to_numpy(dtype=np.float64)[_sample(len(price), sample_size, seed + 1)]
+
+    resumo_nota, erros_nota = _describe(review, review_sample, len(review), confidence)
+    resumo_preco, erros_preco = _describe(price, price_sample, len(price), confidence)
+    # Contagens da amostra na escala do dataset (o histograma mostra totais estimados)
+    valores, contagens = summaries.discrete_counts(review_sample)
+    escala = resumo_nota['count'] / max(contagens.sum(), 1)
+    resumo = aggregates.DescriptiveSummary(
+        resumo_nota=resumo_nota, moda_nota=valores[np.argmax(contagens)] if len(valores) else np.nan,
+        resumo_preco=resumo_preco, valores_nota=valores, contagens_nota=np.round(contagens * escala).astype(np.int64),
+        box_nota=summaries.box_stats_from_counts(valores, contagens, 'review_score'),
+    )
+    return ApproxDescriptive(resumo=resumo, erros_nota=erros_nota, erros_preco=erros_preco,
+                             amostra=len(price_sample), total=len(price))
+
+
+@dataclass(frozen=True)
+class ApproxPriceFreight:
+    resumo: aggregates.PriceFreight
+    erro_correlacao: float
+    limites: dict
+    erros_limites: dict
+    pontos: pd.DataFrame
+    amostra: int
+    total: int
+
+
+@aggregates.memoize
+def approximate_price_freight(data, quantile_threshold=0.99, max_points=5000, sample_size=SAMPLE_SIZE,
+                              confidence=CONFIDENCE, seed=0):
+    # `aggregates.price_freight` (e os pontos do gráfico) estimado de uma amostra uniforme
+    from scipy import stats
+    itens = data.itens
+    df = itens[['price', 'freight_value']].iloc[_sample(len(itens), sample_size, seed + 2)].dropna()
+    z = stats.norm.ppf((1 + confidence) / 2)
+
+    r = summaries.ols_fit(df['price'], df['freight_value'])['r']
+    fisher = z / np.sqrt(max(len(df) - 3, 1))
+    erro_correlacao = (np.tanh(np.arctanh(r) + fisher) - np.tanh(np.arctanh(r) - fisher)) / 2
+
+    limites, erros_limites = {}, {}
+    for column in ('price', 'freight_value'):
+        ordenados = np.sort(df[column].to_numpy(dtype=np.float64))
+        limites[column] = float(np.quantile(ordenados, quantile_threshold))
+        erros_limites[column] = _quantile_error(ordenados, quantile_threshold, z)
+    filtrados = df[(df['price'] < limites['price']) & (df['freight_value'] < limites['freight_value'])]
+
+    # Reta e grade da amostra filtrada; a grade e o `n` da reta na escala do dataset
+    escala = len(itens) / max(len(df), 1)
+    fit = summaries.ols_fit(filtrados['price'], filtrados['freight_value'])
+    fit['n'] = int(round(fit['n'] * escala))
+    contagens, x, y = summaries.density_grid(filtrados['price'], filtrados['freight_value'])
+    resumo = aggregates.PriceFreight(correlacao=r, fit=fit, grade=(contagens * escala, x, y))
+    return ApproxPriceFreight(resumo=resumo, erro_correlacao=float(erro_correlacao), limites=limites,
+                              erros_limites=erros_limites, pontos=filtrados.head(max_points).reset_index(drop=True),
+                              amostra=len(df), total=len(itens))
@@ -0,0 +1,139 @@
+# Reamostragem (bootstrap, permutação e Monte Carlo) em lotes NumPy paralelizados.
+#
+# O número de reamostras é dividido em lotes; cada lote recebe um filho próprio de
+# `np.random.SeedSequence(seed)`, então o resultado depende só da semente e do número de
+# reamostras, não do número de processos. Com `workers > 1` os lotes são divididos em
+# `workers` grupos que rodam num `ProcessPoolExecutor` único do processo (criado na
+# primeira vez e reaproveitado); os arrays de entrada vão uma vez para cada grupo, não a
+# cada lote. Os processos nascem de um servidor de fork limpo (`forkserver`, ou `spawn`
+# onde ele não existe): um fork direto do servidor do Streamlit, que tem várias threads
+# rodando (aquecimento, refino, DuckDB), pode travar.
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+DEFAULT_RESAMPLES = 2000
+# Limite de elementos por lote (reamostras x tamanho da amostra), para conter a memória
+MAX_BATCH_ELEMENTS = 4_000_000
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    # Pool de processos do módulo, com um processo por CPU (cada chamada usa só `workers`)
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1, mp_context=multiprocessing.get_context(method))
+        return _pool
+
+
+def _run(kind, arrays, n_resamples, seed, workers, sample_size):
+    batch = max(1, min(n_resamples, MAX_BATCH_ELEMENTS // max(sample_size, 1)))
+    sizes = [batch] * (n_resamples // batch)
+    if n_resamples % batch:
+        sizes.append(n_resamples % batch)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = list(zip(sizes, seeds))
+
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers <= 1:
+        return _batches(kind, arrays, tasks)
+    pool = _get_pool()
+    futures = [pool.submit(_batches, kind, arrays, tasks[i::workers]) for i in range(workers)]
+    # A ordem das reamostras muda com `workers`, mas quantis e valores-p não dependem dela
+    return np.concatenate([f.result() for f in futures])
+
+
+def _batches(kind, arrays, tasks):
+    return np.concatenate([_BATCHES[kind](np.random.default_rng(seed), size, **arrays) for size, seed in tasks])
+
+
+def _bootstrap_means(rng, size, values):
+    idx = rng.integers(0, len(values), size=(size, len(values)))
+    return values[idx].mean(axis=1)
+
+
+def _welch_t(a_sum, a_sumsq, n_a, b_sum, b_sumsq, n_b):
+    mean_a, mean_b = a_sum / n_a, b_sum / n_b
+    var_a = (a_sumsq - n_a * mean_a ** 2) / (n_a - 1)
+    var_b = (b_sumsq - n_b * mean_b ** 2) / (n_b - 1)
+    return (mean_a - mean_b) / np.sqrt(var_a / n_a + var_b / n_b)
+
+
+def _permuted_welch(rng, size, pooled, n_a):
+    # Cada linha é uma permutação dos dados juntos; os n_a primeiros formam o grupo A
+    perms = rng.permuted(np.broadcast_to(pooled, (size, len(pooled))), axis=1)
+    a, b = perms[:, :n_a], perms[:, n_a:]
+    return _welch_t(a.sum(axis=1), (a * a).sum(axis=1), n_a, b.sum(axis=1), (b * b).sum(axis=1), len(pooled) - n_a)
+
+
+def chi2_statistic(tables):
+    # Estatística qui-quadrado de uma tabela (ou de um lote de tabelas na 1ª dimensão)
+    tables = np.asarray(tables, dtype=np.float64)
+    rows = tables.sum(axis=-1, keepdims=True)
+    cols = tables.sum(axis=-2, keepdims=True)
+    total = tables.sum(axis=(-2, -1), keepdims=True)
+    expected = rows * cols / total
+    with np.errstate(invalid='ignore', divide='ignore'):
+        terms = np.where(expected > 0, (tables - expected) ** 2 / expected, 0.0)
+    return terms.sum(axis=(-2, -1))
+
+
+def _permuted_chi2(rng, size, row_codes, col_codes, shape):
+    # Permutar os rótulos de coluna mantém as margens da tabela fixas (hipótese nula de
+    # independência); todas as tabelas do lote saem de um único bincount
+    n_rows, n_cols = shape
+    cells = row_codes * n_cols + rng.permuted(np.broadcast_to(col_codes, (size, len(col_codes))), axis=1)
+    cells += (np.arange(size) * n_rows * n_cols)[:, None]
+    tables = np.bincount(cells.ravel(), minlength=size * n_rows * n_cols).reshape(size, n_rows, n_cols)
+    return chi2_statistic(tables)
+
+
+_BATCHES = {
+    'bootstrap_means': _bootstrap_means,
+    'permuted_welch': _permuted_welch,
+    'permuted_chi2': _permuted_chi2,
+}
+
+
+def bootstrap_mean_ci(values, n_resamples=DEFAULT_RESAMPLES, confidence=0.95, seed=0, workers=1):
+    # Intervalo de confiança percentil da média
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    means = _run('bootstrap_means', {'values': values}, n_resamples, seed, workers, len(values))
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(means, [alpha, 1 - alpha])
+    return low, high
+
+
+def permutation_welch_test(a, b, n_resamples=DEFAULT_RESAMPLES, seed=0, workers=1):
+    # Valor-p bicaudal da estatística t de Welch sob permutação dos rótulos dos grupos
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    a, b = a[~np.isnan(a)], b[~np.isnan(b)]
+    observed = _welch_t(a.sum(), (a * a).sum(), len(a), b.sum(), (b * b).sum(), len(b))
+    pooled = np.concatenate([a, b])
+    t = _run('permuted_welch', {'pooled': pooled, 'n_a': len(a)}, n_resamples, seed, workers, len(pooled))
+    p_value = (1 + np.sum(np.abs(t) >= abs(observed))) / (n_resamples + 1)
+    return observed, p_value
+
+
+def monte_carlo_chi2_test(row_codes, col_codes, n_resamples=DEFAULT_RESAMPLES, seed=0, workers=1):
+    # Valor-p Monte Carlo do qui-quadrado de independência a partir dos códigos das linhas
+    row_codes = np.asarray(row_codes, dtype=np.int64)
+    col_codes = np.asarray(col_codes, dtype=np.int64)
+    valid = (row_codes >= 0) & (col_codes >= 0)
+    row_codes, col_codes = row_codes[valid], col_codes[valid]
+    shape = (int(row_codes.max()) + 1, int(col_codes.max()) + 1)
+    observed_table = np.bincount(row_codes * shape[1] + col_codes, minlength=shape[0] * shape[1]).reshape(shape)
+    observed = chi2_statistic(observed_table)
+    arrays = {'row_codes': row_codes, 'col_codes': col_codes, 'shape': shape}
+    chi2 = _run('permuted_chi2', arrays, n_resamples, seed, workers, len(row_codes))
+    p_value = (1 + np.sum(chi2 >= observed)) / (n_resamples + 1)
+    return observed, p_value
@@ -0,0 +1,68 @@
+# Esquema de tipos compactos do dataset unido da Olist.
+#
+# Cada coluna conhecida recebe um "tipo lógico" que define como ela é compactada:
+#   - 'category': texto de baixa cardinalidade (estado, categoria, tipo de pagamento...)
+#   - 'id': identificadores hexadecimais de 32 caracteres, internados como categóricos
+#     (cada valor distinto vira um código inteiro; o texto fica guardado uma única vez)
+#   - 'count': inteiros pequenos que podem ter valores ausentes (notas, parcelas, fotos)
+#   - 'float': valores contínuos (preço, frete...), reduzidos para float32
+# Colunas fora do esquema (ex.: datas) são mantidas como estão.
+import pandas as pd
+
+COLUMN_TYPES = {
+    'customer_state': 'category',
+    'seller_state': 'category',
+    'product_category_name_english': 'category',
+    'payment_type': 'category',
+    'order_status': 'category',
+    'order_id': 'id',
+    'product_id': 'id',
+    'customer_unique_id': 'id',
+    'seller_id': 'id',
+    'review_id': 'id',
+    'review_score': 'count',
+    'payment_sequential': 'count',
+    'payment_installments': 'count',
+    'product_photos_qty': 'count',
+    'product_weight_g': 'float',
+    'price': 'float',
+    'freight_value': 'float',
+    'total_order_value': 'float',
+    'payment_value': 'float',
+}
+
+
+def compact_column(s, kind):
+    if kind in ('category', 'id'):
+        return s.astype('category')
+    if kind == 'count':
+        # Sem ausentes vira o menor inteiro possível; com ausentes, float32 (exato para
+        # inteiros pequenos e ainda aceita NaN)
+        if s.isna().any():
+            return pd.to_numeric(s, downcast='float')
+        return pd.to_numeric(s, downcast='integer')
+    if kind == 'float':
+        return pd.to_numeric(s, downcast='float')
+    raise ValueError(f"Tipo lógico desconhecido: {kind!r}")
+
+
+def compact_frame(df, column_types=COLUMN_TYPES):
+    # Retorna o dataframe compactado e um relatório de memória por coluna (em bytes)
+    compacted = {}
+    report = []
+    for col in df.columns:
+        before = df[col]
+        kind = column_types.get(col)
+        after = compact_column(before, kind) if kind else before
+        compacted[col] = after
+        bytes_before = before.memory_usage(index=False, deep=True)
+        bytes_after = after.memory_usage(index=False, deep=True)
+        report.append({
+            'coluna': col,
+            'tipo_original': str(before.dtype),
+            'tipo_compacto': str(after.dtype),
+            'bytes_original': bytes_before,
+            'bytes_compacto': bytes_after,
+            'bytes_economizados': bytes_before - bytes_after,
+        })
+    return pd.DataFrame(compacted, index=df.index), pd.DataFrame(report)
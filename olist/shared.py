@@ -0,0 +1,46 @@
+# Dataset compartilhado, somente leitura, entre sessões e reexecuções do dashboard.
+#
+# O `st.cache_data` devolve a cada chamada uma cópia desserializada do valor em cache:
+# toda reexecução da página (cada clique na barra lateral, em cada sessão) copiava as
+# tabelas inteiras. Com `st.cache_resource` o mesmo objeto é entregue a todos, então ele
+# precisa ser imutável. `SharedData` embrulha o `OlistData` do processo:
+#   - atribuir atributos é proibido (`SomenteLeitura`);
+#   - cada acesso a uma tabela devolve uma visão rasa (`copy(deep=False)`), que divide os
+#     arrays com a tabela original sem copiar nada. Com o copy-on-write do pandas, escrever
+#     na visão (nova coluna, `.loc[...] = ...`) só altera a visão, nunca a tabela
+#     compartilhada, e os arrays expostos por `.to_numpy()`/`.values` são somente leitura.
+#     O copy-on-write é sempre ligado a partir do pandas 3; no pandas 2 ele é ligado aqui,
+#     ao importar o módulo (sem ele, a escrita na visão alcançaria os arrays divididos
+#     entre as sessões). No pandas 3 a opção está obsoleta e não é tocada.
+import pandas as pd
+
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
+
+class SomenteLeitura(AttributeError):
+    pass
+
+
+class SharedData:
+    def __init__(self, data):
+        object.__setattr__(self, '_data', data)
+
+    def __getattr__(self, name):
+        value = getattr(self._data, name)
+        if isinstance(value, pd.DataFrame):
+            return value.copy(deep=False)
+        return value
+
+    def __setattr__(self, name, value):
+        raise SomenteLeitura(f"O dataset compartilhado é somente leitura (atributo '{name}')")
+
+    def __delattr__(self, name):
+        raise SomenteLeitura(f"O dataset compartilhado é somente leitura (atributo '{name}')")
+
+    def __repr__(self):
+        return f"<SharedData {self._data.fingerprint or 'sem impressão digital'}>"
+
+
+def share(data):
+    return data if isinstance(data, SharedData) else SharedData(data)
@@ -0,0 +1,141 @@
+# Resumos mergeáveis: acumuladores calculados por partes (um lote de dados de cada vez)
+# e depois combinados, com o mesmo resultado de calcular sobre tudo de uma vez.
+#   - Moments: contagem, soma, soma dos quadrados, mínimo e máximo de uma coluna (média,
+#     variância e desvio padrão);
+#   - PairMoments: somas cruzadas de duas colunas (correlação de Pearson e reta OLS, como
+#     `summaries.ols_fit`);
+#   - QuantileSketch: histograma de buckets logarítmicos (o esquema do DDSketch). Cada
+#     valor positivo cai no bucket ceil(log_γ(x)), com γ = (1 + α) / (1 - α), e qualquer
+#     quantil sai com erro relativo de no máximo α. O número de buckets cresce com o log
+#     da faixa de valores, não com o número de linhas, e combinar dois sketches é somar
+#     as contagens dos buckets. Serve para valores não negativos (preço, frete): zeros
+#     ficam numa contagem à parte.
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# Erro relativo dos quantis (0,5%: R$ 0,50 numa mediana de R$ 100)
+SKETCH_ALPHA = 0.005
+
+
+def _finite(values):
+    values = np.asarray(values, dtype=np.float64)
+    return values[np.isfinite(values)]
+
+
+@dataclass(frozen=True)
+class Moments:
+    n: int = 0
+    sum: float = 0.0
+    sumsq: float = 0.0
+    min: float = np.inf
+    max: float = -np.inf
+
+    @classmethod
+    def from_values(cls, values):
+        values = _finite(values)
+        if not len(values):
+            return cls()
+        return cls(n=len(values), sum=float(values.sum()), sumsq=float(values @ values),
+                   min=float(values.min()), max=float(values.max()))
+
+    def merge(self, other):
+        return Moments(n=self.n + other.n, sum=self.sum + other.sum, sumsq=self.sumsq + other.sumsq,
+                       min=min(self.min, other.min), max=max(self.max, other.max))
+
+    @property
+    def mean(self):
+        return self.sum / self.n if self.n else np.nan
+
+    @property
+    def std(self):
+        # Desvio padrão amostral (ddof=1, como o `describe` do pandas)
+        if self.n < 2:
+            return np.nan
+        return float(np.sqrt(max(self.sumsq - self.sum * self.mean, 0.0) / (self.n - 1)))
+
+
+@dataclass(frozen=True)
+class PairMoments:
+    n: int = 0
+    sx: float = 0.0
+    sy: float = 0.0
+    sxx: float = 0.0
+    syy: float = 0.0
+    sxy: float = 0.0
+
+    @classmethod
+    def from_values(cls, x, y):
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        mask = np.isfinite(x) & np.isfinite(y)
+        x, y = x[mask], y[mask]
+        return cls(n=len(x), sx=float(x.sum()), sy=float(y.sum()),
+                   sxx=float(x @ x), syy=float(y @ y), sxy=float(x @ y))
+
+    def merge(self, other):
+        return PairMoments(*(getattr(self, f) + getattr(other, f) for f in ('n', 'sx', 'sy', 'sxx', 'syy', 'sxy')))
+
+    def ols_fit(self):
+        # Mesmo dicionário de `summaries.ols_fit`
+        with np.errstate(invalid='ignore', divide='ignore'):
+            sxx = self.sxx - self.sx * self.sx / self.n
+            syy = self.syy - self.sy * self.sy / self.n
+            sxy = self.sxy - self.sx * self.sy / self.n
+            slope = sxy / sxx
+            return {'slope': slope, 'intercept': (self.sy - slope * self.sx) / self.n,
+                    'r': sxy / np.sqrt(sxx * syy), 'n': self.n}
+
+
+@dataclass(frozen=True)
+class QuantileSketch:
+    keys: np.ndarray
+    counts: np.ndarray
+    zeros: int = 0
+    alpha: float = SKETCH_ALPHA
+
+    @property
+    def gamma(self):
+        return (1 + self.alpha) / (1 - self.alpha)
+
+    @property
+    def n(self):
+        return int(self.counts.sum()) + self.zeros
+
+    @classmethod
+    def from_values(cls, values, alpha=SKETCH_ALPHA):
+        values = _finite(values)
+        positive = values[values > 0]
+        gamma = (1 + alpha) / (1 - alpha)
+        keys, counts = np.unique(np.ceil(np.log(positive) / np.log(gamma)).astype(np.int32), return_counts=True)
+        return cls(keys=keys, counts=counts.astype(np.int64), zeros=int(len(values) - len(positive)), alpha=alpha)
+
+    def merge(self, other):
+        if other.alpha != self.alpha:
+            raise ValueError(f"Sketches com erros relativos diferentes: {self.alpha} e {other.alpha}")
+        keys, inverse = np.unique(np.concatenate([self.keys, other.keys]), return_inverse=True)
+        counts = np.bincount(inverse, weights=np.concatenate([self.counts, other.counts]), minlength=len(keys))
+        return QuantileSketch(keys=keys, counts=counts.astype(np.int64), zeros=self.zeros + other.zeros,
+                              alpha=self.alpha)
+
+    def quantile(self, q):
+        # Como `Series.quantile` (interpolação linear entre as posições vizinhas), com o
+        # valor representativo de cada bucket no lugar do valor exato
+        n = self.n
+        if not n:
+            return np.nan
+        values = np.r_[0.0, 2 * self.gamma ** self.keys.astype(np.float64) / (self.gamma + 1)]
+        cumulative = np.cumsum(np.r_[self.zeros, self.counts])
+        position = q * (n - 1)
+        low = values[np.searchsorted(cumulative, np.floor(position), side='right')]
+        high = values[np.searchsorted(cumulative, np.ceil(position), side='right')]
+        return float(low + (high - low) * (position - np.floor(position)))
+
+    def to_frame(self):
+        return pd.DataFrame({'key': self.keys, 'count': self.counts})
+
+    @classmethod
+    def from_frame(cls, frame, zeros, alpha):
+        return cls(keys=frame['key'].to_numpy(dtype=np.int32), counts=frame['count'].to_numpy(dtype=np.int64),
+                   zeros=int(zeros), alpha=float(alpha))
@@ -0,0 +1,222 @@
+# Backend alternativo para as agregações das páginas: SQL num DuckDB embutido no processo.
+#
+# `connect(data)` abre um banco DuckDB em memória e registra nele as tabelas do modelo
+# estrela. Se o snapshot Parquet (`olist.ingest`) existir, o DuckDB lê os arquivos
+# diretamente; senão, varre os próprios dataframes, sem copiá-los. Sobre essas tabelas
+# ficam três views de fatos com as mesmas dimensões e regras dos cubos de `olist.cube`:
+#   - a categoria de um pedido é a do item mais caro;
+#   - o filtro de tipo de pagamento seleciona os pedidos que usaram algum dos tipos;
+#   - dimensões ausentes entram nos totais e saem quando a dimensão é filtrada.
+# `SqlCube` tem a mesma interface de `cube.Cube` (`where`, `total`, `moments`, `labels`,
+# `empty`), então as páginas não mudam. Cada chamada vira um SELECT ... GROUP BY
+# executado pelo DuckDB, e só o resultado (uma linha por grupo) volta para o Python.
+#
+# O backend é escolhido pela variável de ambiente OLIST_BACKEND (`cubo`, o padrão, ou
+# `duckdb`, que exige o pacote `duckdb`). Para comparar os dois:
+#   python -m olist.benchmark --scales 1 --backend duckdb
+import os
+import threading
+from dataclasses import dataclass, replace
+
+import numpy as np
+import pandas as pd
+
+from olist import cube, ingest, persist
+from olist.persist import CACHE_DIR
+
+BACKENDS = ['cubo', 'duckdb']
+BACKEND = os.environ.get('OLIST_BACKEND', 'cubo')
+SOURCE_TABLES = ['pedidos', 'produtos', 'itens', 'pagamentos']
+
+VIEWS = """
+CREATE VIEW pedidos_base AS
+SELECT file_row_number AS order_key, CAST(customer_state AS VARCHAR) AS customer_state,
+       CASE WHEN year_month >= 0 THEN year_month END AS year_month, review_score, weekday,
+       CAST(total_order_value AS DOUBLE) AS total_order_value
+FROM {pedidos};
+
+CREATE VIEW produtos_base AS
+SELECT file_row_number AS product_key,
+       CAST(product_category_name_english AS VARCHAR) AS product_category_name_english
+FROM {produtos};
+
+CREATE VIEW itens_base AS
+SELECT file_row_number AS item_row, order_key, product_key, CAST(price AS DOUBLE) AS price
+FROM {itens};
+
+CREATE VIEW pagamentos_base AS
+SELECT order_key, CAST(payment_type AS VARCHAR) AS payment_type,
+       CAST(payment_value AS DOUBLE) AS payment_value
+FROM {pagamentos};
+
+-- Categoria principal do pedido: a do item mais caro (empate: o primeiro item)
+CREATE VIEW categoria_principal AS
+SELECT i.order_key,
+       first(pr.product_category_name_english ORDER BY i.price DESC NULLS LAST, i.item_row)
+           AS product_category_name_english
+FROM itens_base i LEFT JOIN produtos_base pr USING (product_key)
+WHERE i.order_key >= 0
+GROUP BY i.order_key;
+
+CREATE VIEW fato_itens AS
+SELECT i.order_key, p.customer_state, pr.product_category_name_english, p.year_month,
+       p.review_score, i.price
+FROM itens_base i
+LEFT JOIN pedidos_base p USING (order_key)
+LEFT JOIN produtos_base pr USING (product_key);
+
+CREATE VIEW fato_pedidos AS
+SELECT p.order_key, p.customer_state, c.product_category_name_english, p.year_month,
+       p.review_score, p.weekday, p.total_order_value
+FROM pedidos_base p LEFT JOIN categoria_principal c USING (order_key);
+
+CREATE VIEW fato_pagamentos AS
+SELECT g.order_key, p.customer_state, c.product_category_name_english, g.payment_type,
+       p.year_month, p.review_score, g.payment_value
+FROM pagamentos_base g
+LEFT JOIN pedidos_base p USING (order_key)
+LEFT JOIN categoria_principal c USING (order_key);
+"""
+
+# Rótulos de cada dimensão, na mesma ordem dos cubos (ordenados, sem ausentes)
+LABEL_QUERIES = {
+    'customer_state': "SELECT DISTINCT customer_state FROM pedidos_base",
+    'year_month': "SELECT DISTINCT year_month FROM pedidos_base",
+    'review_score': "SELECT DISTINCT review_score FROM pedidos_base",
+    'product_category_name_english': "SELECT DISTINCT product_category_name_english FROM fato_itens",
+    'payment_type': "SELECT DISTINCT payment_type FROM pagamentos_base",
+}
+# Pedidos que usaram algum dos tipos de pagamento do parâmetro
+SET_FILTER = "order_key IN (SELECT order_key FROM pagamentos_base WHERE list_contains(?, payment_type))"
+
+
+class Database:
+    # A conexão é dividida entre as sessões (threads) do Streamlit e não pode ser usada por
+    # duas ao mesmo tempo. Um cursor por thread não serve: os dataframes registrados só
+    # existem na conexão original. Cada consulta já usa todos os núcleos dentro do DuckDB
+    def __init__(self, connection):
+        self.connection = connection
+        self.lock = threading.Lock()
+
+    def query(self, sql, params=()):
+        with self.lock:
+            return self.connection.execute(sql, list(params)).df()
+
+
+@dataclass(frozen=True)
+class SqlCube:
+    db: Database
+    fact: str
+    labels: dict
+    measures: tuple = ()
+    set_dims: tuple = ()
+    filters: tuple = ()
+
+    def where(self, **filters):
+        # Como em `Cube.where`: lista vazia/None = sem filtro; filtros repetidos se somam
+        added = tuple((dim, pd.Index(values).tolist()) for dim, values in filters.items()
+                      if values is not None and len(values) > 0)
+        return replace(self, filters=self.filters + added)
+
+    def _where(self, conditions=()):
+        clauses, params = list(conditions), []
+        for dim, values in self.filters:
+            clauses.append(SET_FILTER if dim in self.set_dims else f"list_contains(?, {dim})")
+            params.append(values)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def _aggregate(self, column):
+        if column == 'count':
+            return "count(*)"
+        for measure in self.measures:
+            if column == f'{measure}_n':
+                return f"count({measure})"
+            if column == f'{measure}_sum':
+                return f"coalesce(sum({measure}), 0)"
+            if column == f'{measure}_sumsq':
+                return f"coalesce(sum({measure} * {measure}), 0)"
+        raise ValueError(f"Coluna desconhecida no cubo '{self.fact}': '{column}'")
+
+    @property
+    def empty(self):
+        where, params = self._where()
+        return self.db.query(f"SELECT 1 FROM {self.fact}{where} LIMIT 1", params).empty
+
+    def total(self, by, column='count'):
+        # Mesmo formato de `Cube.total`: Series por uma dimensão, DataFrame por duas, com
+        # todos os rótulos (inclusive os de total zero)
+        dims = [by] if isinstance(by, str) else list(by)
+        for dim in dims:
+            if dim in self.set_dims:
+                raise ValueError(f"A dimensão '{dim}' é um conjunto e não pode ser agrupada")
+        where, params = self._where(f"{dim} IS NOT NULL" for dim in dims)
+        result = self.db.query(f"SELECT {', '.join(dims)}, {self._aggregate(column)} AS valor "
+                               f"FROM {self.fact}{where} GROUP BY ALL", params)
+        shape = tuple(len(self.labels[dim]) for dim in dims)
+        sums = np.zeros(shape, dtype=np.float64)
+        sums[tuple(self.labels[dim].get_indexer(result[dim]) for dim in dims)] = result['valor'].to_numpy(dtype=np.float64)
+        if len(dims) == 1:
+            return pd.Series(sums, index=self.labels[dims[0]], name=column)
+        return pd.DataFrame(sums, index=self.labels[dims[0]], columns=self.labels[dims[1]])
+
+    def moments(self, by, dim):
+        # Contagem, soma e soma dos quadrados de uma dimensão numérica (ex.: nota) por grupo
+        where, params = self._where([f"{by} IS NOT NULL"])
+        result = self.db.query(f"SELECT {by}, count({dim}) AS count, "
+                               f"coalesce(sum(CAST({dim} AS DOUBLE)), 0) AS sum, "
+                               f"coalesce(sum(CAST({dim} AS DOUBLE) ** 2), 0) AS sumsq "
+                               f"FROM {self.fact}{where} GROUP BY ALL", params)
+        result = result.set_index(by).astype(np.float64).reindex(self.labels[by], fill_value=0.0)
+        return result[['count', 'sum', 'sumsq']]
+
+
+def _sources(connection, data, cache_dir):
+    # Expressão SQL de cada tabela: os arquivos do snapshot, ou os dataframes registrados
+    # (com a posição da linha em `file_row_number`, como o `read_parquet` devolve)
+    files = persist.entry_files(ingest.SNAPSHOT_NAME, data.fingerprint, cache_dir) if data.fingerprint else None
+    sources = {}
+    for name in SOURCE_TABLES:
+        if files and name in files:
+            path = files[name].replace("'", "''")
+            sources[name] = f"read_parquet('{path}', file_row_number = true)"
+        else:
+            frame = getattr(data, name)
+            connection.register(f'{name}_df', frame.assign(file_row_number=np.arange(len(frame))))
+            sources[name] = f'{name}_df'
+    return sources
+
+
+def connect(data, cache_dir=CACHE_DIR):
+    # Banco DuckDB em memória com as views dos fatos e os três cubos SQL. O duckdb só é
+    # importado aqui: com o backend `cubo`, o padrão, ele não entra no processo
+    try:
+        import duckdb
+    except ImportError as exc:
+        raise ModuleNotFoundError("O backend 'duckdb' exige o pacote duckdb (pip install duckdb)",
+                                  name='duckdb') from exc
+    connection = duckdb.connect(':memory:')
+    connection.execute(VIEWS.format(**_sources(connection, data, cache_dir)))
+    db = Database(connection)
+    labels = {dim: pd.Index(db.query(f"{sql} WHERE {dim} IS NOT NULL ORDER BY 1")[dim])
+              for dim, sql in LABEL_QUERIES.items()}
+    labels['weekday'] = pd.Index(range(7))
+
+    def make(fact, measure, dims, set_dims=()):
+        return SqlCube(db=db, fact=fact, labels={dim: labels[dim] for dim in dims},
+                       measures=(measure,), set_dims=tuple(set_dims))
+
+    return cube.OlistCubes(
+        itens=make('fato_itens', 'price', cube.DIMENSIONS, [cube.SET_DIMENSION]),
+        pedidos=make('fato_pedidos', 'total_order_value', cube.DIMENSIONS + ['weekday'], [cube.SET_DIMENSION]),
+        pagamentos=make('fato_pagamentos', 'payment_value', cube.DIMENSIONS),
+        fingerprint=data.fingerprint,
+    )
+
+
+def open_cubes(data, backend=BACKEND, cache_dir=CACHE_DIR):
+    # Cubos dos filtros pelo backend escolhido (mesma interface nos dois)
+    if backend == 'cubo':
+        return cube.load_cubes(data, cache_dir)
+    if backend == 'duckdb':
+        return connect(data, cache_dir)
+    raise ValueError(f"Backend desconhecido: '{backend}' (opções: {', '.join(BACKENDS)})")
@@ -0,0 +1,349 @@
+# Ingestão em blocos (streaming) com agregados online, para exports maiores que a RAM.
+#
+# Os CSVs são lidos em blocos de `chunksize` linhas e cada bloco só atualiza acumuladores
+# pequenos: contagens, somas e momentos (n, média, M2) mescláveis por grupo, a tabela de
+# contingência estado x categoria e as contagens de pedidos por mês e dia da semana. O
+# dataframe completo nunca é montado.
+#
+# A única estrutura que cresce com o volume de dados é o conjunto de pedidos já vistos
+# (`KeyTable`): 8 bytes de hash + 4 bytes de nota por pedido distinto. Ele é necessário
+# para contar pedidos distintos quando os itens de um pedido caem em blocos diferentes e
+# para ligar cada pagamento à nota do seu pedido. Fora isso, a memória de pico é limitada
+# pelo tamanho do bloco.
+#
+# Fonte de dados do dashboard (OLIST_STREAMING=1): os cubos dos filtros (`olist.cube`)
+# montados sem carregar o dataset. Os dois CSVs são repartidos em blocos pelo hash do
+# `order_id` em `n` partições em disco (todas as linhas e pagamentos de um pedido caem na
+# mesma partição); cada partição, do tamanho de `PARTITION_BYTES`, vira um `OlistData`
+# pequeno, seus cubos são montados e somados aos anteriores (`cube.merge_cubes`). O
+# resultado é o mesmo dos cubos do dataset completo e fica no cache em disco. As páginas
+# de Estado, Sazonal, Categoria, Pagamento e Qui-Quadrado saem só dos cubos; as que
+# precisam das linhas (descritiva, fotos, amostra) ficam indisponíveis nesse modo.
+#
+# Uso pela linha de comando (grava os agregados em CSV no diretório de saída; com
+# --cubos, também monta os cubos do dashboard no cache):
+#   python -m olist.streaming --chunksize 200000 --out .cache/streaming
+#   python -m olist.streaming --cubos
+import argparse
+import hashlib
+import math
+import os
+import tempfile
+from dataclasses import replace
+
+import numpy as np
+import pandas as pd
+
+from olist import cube, ingest, persist
+from olist.features import DAY_NAMES
+from olist.ingest import ANALISE_CSV, PAGAMENTOS_CSV
+from olist.persist import CACHE_DIR
+
+ANALISE_COLUMNS = [
+    'order_id', 'customer_state', 'order_purchase_timestamp', 'product_category_name_english',
+    'review_score', 'total_order_value', 'price', 'freight_value',
+]
+PAGAMENTOS_COLUMNS = ['order_id', 'payment_type']
+DEFAULT_CHUNKSIZE = 100_000
+
+STREAMING = os.environ.get('OLIST_STREAMING', '').lower() in ('1', 'true', 'sim')
+# Tamanho aproximado de cada partição do CSV de análise (o que precisa caber na memória)
+PARTITION_BYTES = int(os.environ.get('OLIST_PARTITION_BYTES', 256 * 2 ** 20))
+CUBE_NAME = 'olist_cube_streaming'
+CODE_MODULES = ['cube', 'streaming']
+
+
+def hash_keys(values):
+    # Hash estável de 64 bits dos IDs (colisões desprezíveis para bilhões de pedidos)
+    return pd.util.hash_array(np.asarray(values, dtype=object))
+
+
+class Vocabulary:
+    # Códigos inteiros estáveis para rótulos que vão aparecendo ao longo dos blocos
+
+    def __init__(self):
+        self.labels = []
+        self._index = {}
+
+    def __len__(self):
+        return len(self.labels)
+
+    def encode(self, values):
+        codes, uniques = pd.factorize(pd.Series(values), use_na_sentinel=True)
+        mapping = np.empty(len(uniques), dtype=np.int64)
+        for i, label in enumerate(uniques):
+            if label not in self._index:
+                self._index[label] = len(self.labels)
+                self.labels.append(label)
+            mapping[i] = self._index[label]
+        return np.where(codes >= 0, mapping[codes] if len(mapping) else -1, -1)
+
+
+class GroupMoments:
+    # Contagem, média e M2 por grupo, mescláveis entre blocos (algoritmo de Chan et al.)
+
+    def __init__(self, size=0):
+        self.n = np.zeros(size)
+        self.mean = np.zeros(size)
+        self.m2 = np.zeros(size)
+
+    def _grow(self, size):
+        if size > len(self.n):
+            pad = size - len(self.n)
+            self.n = np.pad(self.n, (0, pad))
+            self.mean = np.pad(self.mean, (0, pad))
+            self.m2 = np.pad(self.m2, (0, pad))
+
+    def update(self, codes, values, size=None):
+        values = np.asarray(values, dtype=np.float64)
+        valid = (codes >= 0) & ~np.isnan(values)
+        codes, values = codes[valid], values[valid]
+        size = max(size or 0, len(self.n), int(codes.max()) + 1 if len(codes) else 0)
+        n_b = np.bincount(codes, minlength=size).astype(np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_b = np.bincount(codes, weights=values, minlength=size) / n_b
+        mean_b = np.nan_to_num(mean_b)
+        m2_b = np.bincount(codes, weights=(values - mean_b[codes]) ** 2, minlength=size)
+        other = GroupMoments()
+        other.n, other.mean, other.m2 = n_b, mean_b, m2_b
+        self.merge(other)
+
+    def merge(self, other):
+        size = max(len(self.n), len(other.n))
+        self._grow(size)
+        other._grow(size)
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ratio = np.where(n > 0, other.n / n, 0.0)
+        self.mean = self.mean + delta * ratio
+        self.m2 = self.m2 + other.m2 + delta ** 2 * self.n * ratio
+        self.n = n
+
+    def frame(self, labels):
+        self._grow(len(labels))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            var = np.where(self.n > 1, self.m2 / (self.n - 1), np.nan)
+        df = pd.DataFrame({'count': self.n.astype(np.int64), 'mean': self.mean, 'var': var,
+                           'std': np.sqrt(var)}, index=pd.Index(labels))
+        return df[df['count'] > 0]
+
+
+class KeyTable:
+    # Conjunto de chaves uint64 com um valor por chave, guardado em níveis ordenados que
+    # são mesclados quando ficam de tamanho parecido (busca O(log n) por nível)
+
+    def __init__(self, value_dtype=np.float32):
+        self.value_dtype = value_dtype
+        self._levels = []
+
+    def __len__(self):
+        return sum(len(keys) for keys, _ in self._levels)
+
+    def lookup(self, keys):
+        found = np.zeros(len(keys), dtype=bool)
+        values = np.full(len(keys), np.nan, dtype=self.value_dtype)
+        for level_keys, level_values in self._levels:
+            pos = np.searchsorted(level_keys, keys)
+            pos = np.minimum(pos, len(level_keys) - 1)
+            hit = ~found & (level_keys[pos] == keys)
+            values[hit] = level_values[pos[hit]]
+            found |= hit
+        return found, values
+
+    def add(self, keys, values):
+        # `keys` devem ser novas e sem repetição
+        if not len(keys):
+            return
+        order = np.argsort(keys, kind='stable')
+        self._levels.append((keys[order], np.asarray(values, dtype=self.value_dtype)[order]))
+        while len(self._levels) > 1 and len(self._levels[-2][0]) <= 2 * len(self._levels[-1][0]):
+            (k2, v2), (k1, v1) = self._levels.pop(), self._levels.pop()
+            keys = np.concatenate([k1, k2])
+            order = np.argsort(keys, kind='stable')
+            self._levels.append((keys[order], np.concatenate([v1, v2])[order]))
+
+
+class StreamAggregates:
+    # Todos os acumuladores que as páginas precisam, atualizados bloco a bloco
+
+    def __init__(self):
+        self.states = Vocabulary()
+        self.categories = Vocabulary()
+        self.payment_types = Vocabulary()
+        self.orders = KeyTable()
+        self.n_rows = 0
+        self.category_counts = np.zeros(0, dtype=np.int64)
+        self.contingency = np.zeros((0, 0), dtype=np.int64)
+        self.weekday_orders = np.zeros(7, dtype=np.int64)
+        self.monthly_orders = pd.Series(dtype=np.int64)
+        self.review_counts = np.zeros(6, dtype=np.int64)
+        self.state_order_value = GroupMoments()
+        self.category_review = GroupMoments()
+        self.payment_review = GroupMoments()
+        self.price = GroupMoments(1)
+        self.freight = GroupMoments(1)
+        self.review = GroupMoments(1)
+
+    def update_analise(self, chunk):
+        self.n_rows += len(chunk)
+        state = self.states.encode(chunk['customer_state'])
+        category = self.categories.encode(chunk['product_category_name_english'])
+        n_states, n_categories = len(self.states), len(self.categories)
+        review = chunk['review_score'].to_numpy(dtype=np.float64)
+
+        # Agregados no grão de itens
+        self.category_counts = np.pad(self.category_counts, (0, n_categories - len(self.category_counts)))
+        self.category_counts += np.bincount(category[category >= 0], minlength=n_categories)
+        self.contingency = np.pad(self.contingency, ((0, n_states - self.contingency.shape[0]),
+                                                     (0, n_categories - self.contingency.shape[1])))
+        both = (state >= 0) & (category >= 0)
+        cells = state[both] * n_categories + category[both]
+        self.contingency += np.bincount(cells, minlength=n_states * n_categories).reshape(n_states, n_categories)
+        self.category_review.update(category, review, n_categories)
+        zeros = np.zeros(len(chunk), dtype=np.int64)
+        self.price.update(zeros, chunk['price'].to_numpy(dtype=np.float64))
+        self.freight.update(zeros, chunk['freight_value'].to_numpy(dtype=np.float64))
+
+        # Agregados no grão de pedidos: só a primeira linha de cada pedido nunca visto antes
+        keys = hash_keys(chunk['order_id'])
+        keys, first = np.unique(keys, return_index=True)
+        seen, _ = self.orders.lookup(keys)
+        keys, first = keys[~seen], first[~seen]
+        if not len(keys):
+            return
+        orders = chunk.iloc[first]
+        order_review = review[first]
+        self.orders.add(keys, order_review)
+        self.review.update(np.zeros(len(first), dtype=np.int64), order_review)
+        valid_review = order_review[~np.isnan(order_review)].astype(np.int64)
+        self.review_counts += np.bincount(valid_review, minlength=6)[:6]
+        self.state_order_value.update(state[first], orders['total_order_value'].to_numpy(dtype=np.float64), n_states)
+
+        ts = pd.to_datetime(orders['order_purchase_timestamp']).dropna()
+        self.weekday_orders += np.bincount(ts.dt.weekday, minlength=7)
+        months, counts = np.unique((ts.dt.year * 100 + ts.dt.month).to_numpy(), return_counts=True)
+        self.monthly_orders = self.monthly_orders.add(pd.Series(counts, index=months), fill_value=0).astype(np.int64)
+
+    def update_pagamentos(self, chunk):
+        found, review = self.orders.lookup(hash_keys(chunk['order_id']))
+        payment = self.payment_types.encode(chunk['payment_type'])
+        payment = np.where(found, payment, -1)
+        self.payment_review.update(payment, review, len(self.payment_types))
+
+    # --- Resultados no formato usado pelas páginas ---
+
+    def state_means(self):
+        df = self.state_order_value.frame(self.states.labels)
+        return df['mean'].rename('total_order_value').rename_axis('customer_state').sort_values(ascending=False)
+
+    def top_categories(self, n=15):
+        counts = pd.Series(self.category_counts, index=self.categories.labels, name='count')
+        return counts.nlargest(n).rename_axis('product_category_name_english')
+
+    def vendas_mensais(self):
+        months = self.monthly_orders.index.to_numpy()
+        return pd.DataFrame({'year_month': months, 'year': months // 100, 'month': months % 100,
+                             'pedidos': self.monthly_orders.to_numpy()})
+
+    def vendas_por_dia_semana(self):
+        return pd.DataFrame({'day_of_week': DAY_NAMES, 'order_id': self.weekday_orders})
+
+    def contingency_table(self):
+        return pd.DataFrame(self.contingency, index=pd.Index(self.states.labels, name='customer_state'),
+                            columns=pd.Index(self.categories.labels, name='product_category_name_english'))
+
+    def descriptive(self):
+        rows = {'review_score': self.review, 'price': self.price, 'freight_value': self.freight}
+        return pd.concat({name: m.frame(['total']) for name, m in rows.items()}).droplevel(1)
+
+
+def aggregate_csvs(analise_path=ANALISE_CSV, payments_path=PAGAMENTOS_CSV, chunksize=DEFAULT_CHUNKSIZE):
+    agg = StreamAggregates()
+    for chunk in pd.read_csv(analise_path, usecols=ANALISE_COLUMNS, chunksize=chunksize):
+        agg.update_analise(chunk)
+    # Os pagamentos só podem ser processados depois que todos os pedidos foram vistos
+    for chunk in pd.read_csv(payments_path, usecols=PAGAMENTOS_COLUMNS, chunksize=chunksize):
+        agg.update_pagamentos(chunk)
+    return agg
+
+
+# --- Cubos do dashboard sem montar o dataset ---
+
+def partition_csv(path, out_dir, prefix, n_partitions, chunksize=DEFAULT_CHUNKSIZE):
+    # Reparte o CSV em `n_partitions` arquivos pelo hash do `order_id`, bloco a bloco. O
+    # texto de cada campo passa sem conversão (`dtype=str`), então as partições são lidas
+    # depois com as mesmas regras do CSV completo
+    paths = [os.path.join(out_dir, f"{prefix}_{i:04d}.csv") for i in range(n_partitions)]
+    for i, chunk in enumerate(pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunksize)):
+        if i == 0:
+            for p in paths:
+                chunk.iloc[:0].to_csv(p, index=False)
+        partition = hash_keys(chunk['order_id']) % np.uint64(n_partitions)
+        for part, rows in chunk.groupby(partition, sort=False):
+            rows.to_csv(paths[int(part)], mode='a', header=False, index=False)
+    return paths
+
+
+def build_cubes(analise_path=ANALISE_CSV, payments_path=PAGAMENTOS_CSV, chunksize=DEFAULT_CHUNKSIZE,
+                partition_bytes=PARTITION_BYTES, cache_dir=CACHE_DIR):
+    # Mesmos cubos de `cube.build_cubes(ingest.build_data())`, uma partição de pedidos por vez
+    n_partitions = max(1, math.ceil(os.path.getsize(analise_path) / partition_bytes))
+    os.makedirs(cache_dir, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=cache_dir, prefix='particoes_') as tmp_dir:
+        analise = partition_csv(analise_path, tmp_dir, 'analise', n_partitions, chunksize)
+        pagamentos = partition_csv(payments_path, tmp_dir, 'pagamentos', n_partitions, chunksize)
+        cubes = None
+        for analise_part, pagamentos_part in zip(analise, pagamentos):
+            data = ingest.compact_data(*ingest.read_sources(analise_part, pagamentos_part))
+            if data.pedidos.empty:
+                continue
+            part_cubes = cube.build_cubes(data)
+            cubes = part_cubes if cubes is None else cube.merge_cubes(cubes, part_cubes)
+    return cubes
+
+
+def load_cubes(cache_dir=CACHE_DIR):
+    # `build_cubes` dos CSVs de `olist.ingest`, com cache em disco pela impressão digital
+    # dos CSVs (a mesma do dataset: as memórias de `olist.aggregates` valem para os dois)
+    fingerprint = ingest.data_fingerprint(cache_dir)
+    key = hashlib.sha256((fingerprint + persist.code_version(tuple(CODE_MODULES))).encode()).hexdigest()[:32]
+    cubes = persist.cached(CUBE_NAME, key, lambda: build_cubes(cache_dir=cache_dir),
+                           cube.to_frames, cube.from_frames, cache_dir)
+    return replace(cubes, fingerprint=fingerprint)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Agregados da Olist calculados em streaming.")
+    parser.add_argument('--analise', default=ANALISE_CSV)
+    parser.add_argument('--pagamentos', default=PAGAMENTOS_CSV)
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument('--out', default=os.path.join('.cache', 'streaming'))
+    parser.add_argument('--cubos', action='store_true',
+                        help="monta também os cubos do dashboard (OLIST_STREAMING=1) no cache em disco")
+    args = parser.parse_args(argv)
+
+    if args.cubos:
+        cubes = load_cubes()
+        print(f"Cubos: {int(cubes.pedidos.cells['count'].sum())} pedidos, "
+              f"{int(cubes.itens.cells['count'].sum())} itens")
+
+    agg = aggregate_csvs(args.analise, args.pagamentos, args.chunksize)
+    os.makedirs(args.out, exist_ok=True)
+    results = {
+        'state_means': agg.state_means().reset_index(),
+        'top_categories': agg.top_categories().reset_index(),
+        'vendas_mensais': agg.vendas_mensais(),
+        'vendas_por_dia_semana': agg.vendas_por_dia_semana(),
+        'category_review': agg.category_review.frame(agg.categories.labels).rename_axis('categoria').reset_index(),
+        'payment_review': agg.payment_review.frame(agg.payment_types.labels).rename_axis('payment_type').reset_index(),
+        'contingency': agg.contingency_table().reset_index(),
+        'descriptive': agg.descriptive().rename_axis('coluna').reset_index(),
+    }
+    for name, df in results.items():
+        df.to_csv(os.path.join(args.out, f"{name}.csv"), index=False)
+    print(f"{agg.n_rows} linhas, {len(agg.orders)} pedidos distintos -> {args.out}")
+
+
+if __name__ == '__main__':
+    main()
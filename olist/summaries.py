@@ -0,0 +1,118 @@
+# Resumos numéricos calculados no servidor para os gráficos das páginas.
+#
+# Em vez de mandar todas as linhas para o navegador e deixar o Plotly (ou o statsmodels)
+# calcular, as páginas enviam só estes resumos: o tamanho do gráfico fica constante
+# quando o dataset cresce.
+import numpy as np
+import pandas as pd
+
+
+def _finite_pairs(x, y):
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    mask = np.isfinite(x) & np.isfinite(y)
+    return x[mask], y[mask]
+
+
+def ols_fit(x, y):
+    # Regressão linear simples e correlação de Pearson em forma fechada (uma passada)
+    x, y = _finite_pairs(x, y)
+    dx = x - x.mean()
+    dy = y - y.mean()
+    sxx, syy, sxy = dx @ dx, dy @ dy, dx @ dy
+    slope = sxy / sxx
+    return {
+        'slope': slope,
+        'intercept': y.mean() - slope * x.mean(),
+        'r': sxy / np.sqrt(sxx * syy),
+        'n': len(x),
+    }
+
+
+def density_grid(x, y, bins=60):
+    # Contagem de pontos em uma grade 2D (bins x bins), com o centro de cada célula
+    x, y = _finite_pairs(x, y)
+    counts, x_edges, y_edges = np.histogram2d(x, y, bins=bins)
+    return counts, (x_edges[:-1] + x_edges[1:]) / 2, (y_edges[:-1] + y_edges[1:]) / 2
+
+
+def stratified_sample(strata_values, max_points, n_strata=20, seed=0):
+    # Índices de uma amostra de no máximo `max_points` linhas, estratificada pelos quantis
+    # de `strata_values`, para que as caudas continuem representadas no gráfico
+    values = np.asarray(strata_values, dtype=np.float64)
+    if len(values) <= max_points:
+        return np.arange(len(values))
+    edges = np.quantile(values, np.linspace(0, 1, n_strata + 1)[1:-1])
+    strata = np.searchsorted(edges, values, side='right')
+    per_stratum = max(max_points // n_strata, 1)
+    rng = np.random.default_rng(seed)
+    # Embaralha uma vez e fica com as primeiras linhas de cada estrato
+    order = rng.permutation(len(values))
+    order = order[np.argsort(strata[order], kind='stable')]
+    starts = np.searchsorted(strata[order], np.arange(n_strata + 1))
+    chosen = [order[starts[s]:min(starts[s] + per_stratum, starts[s + 1])] for s in range(n_strata)]
+    return np.sort(np.concatenate(chosen))
+
+
+def box_stats(values, groups, max_outliers=50):
+    # Quartis, cercas de Tukey (1,5 x IQR, como no Plotly) e até `max_outliers` valores
+    # atípicos distintos por grupo. Com valores discretos (notas, contagens) os atípicos
+    # distintos já são poucos; acima do limite, ficam os extremos e pontos espaçados.
+    df = pd.DataFrame({'group': groups, 'value': np.asarray(values, dtype=np.float64)}).dropna()
+    grouped = df.groupby('group', observed=True)['value']
+    stats = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+    stats.columns = ['q1', 'median', 'q3']
+    stats['n'] = grouped.size()
+    stats['mean'] = grouped.mean()
+    iqr = stats['q3'] - stats['q1']
+    low = (stats['q1'] - 1.5 * iqr).reindex(df['group']).to_numpy()
+    high = (stats['q3'] + 1.5 * iqr).reindex(df['group']).to_numpy()
+    inside = (df['value'].to_numpy() >= low) & (df['value'].to_numpy() <= high)
+    stats['lowerfence'] = df[inside].groupby('group', observed=True)['value'].min()
+    stats['upperfence'] = df[inside].groupby('group', observed=True)['value'].max()
+
+    outliers = {}
+    for group, group_values in df[~inside].groupby('group', observed=True)['value']:
+        unique = np.unique(group_values.to_numpy())
+        if len(unique) > max_outliers:
+            unique = unique[np.linspace(0, len(unique) - 1, max_outliers).round().astype(int)]
+        outliers[group] = unique
+    stats['n_outliers'] = df[~inside].groupby('group', observed=True).size().reindex(stats.index, fill_value=0)
+    stats['outliers'] = [outliers.get(g, np.empty(0)) for g in stats.index]
+    return stats
+
+
+def discrete_counts(values):
+    # Vetor de contagens de uma variável discreta: (valores distintos, contagens)
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    as_int = values.astype(np.int64)
+    if len(values) and (as_int == values).all() and as_int.min() >= 0:
+        counts = np.bincount(as_int)
+        present = np.flatnonzero(counts)
+        return present.astype(np.float64), counts[present]
+    return np.unique(values, return_counts=True)
+
+
+def _quantile_from_counts(values, cumulative, q):
+    # Mesmo resultado de np.quantile(..., method='linear') sobre os dados expandidos
+    position = q * (cumulative[-1] - 1)
+    low = values[np.searchsorted(cumulative, np.floor(position), side='right')]
+    high = values[np.searchsorted(cumulative, np.ceil(position), side='right')]
+    return low + (high - low) * (position - np.floor(position))
+
+
+def box_stats_from_counts(values, counts, name):
+    # Mesmo formato de `box_stats`, mas a partir do vetor de contagens (uma linha)
+    values = np.asarray(values, dtype=np.float64)
+    counts = np.asarray(counts)
+    cumulative = np.cumsum(counts)
+    q1, median, q3 = (_quantile_from_counts(values, cumulative, q) for q in (0.25, 0.5, 0.75))
+    iqr = q3 - q1
+    inside = (values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)
+    return pd.DataFrame({
+        'q1': [q1], 'median': [median], 'q3': [q3], 'n': [cumulative[-1]],
+        'mean': [(values * counts).sum() / cumulative[-1]],
+        'lowerfence': [values[inside].min()], 'upperfence': [values[inside].max()],
+        'n_outliers': [counts[~inside].sum()], 'outliers': [values[~inside]],
+    }, index=pd.Index([name], name='group'))
@@ -0,0 +1,178 @@
+# Gerador determinístico de dados sintéticos no formato dos CSVs da Olist.
+#
+# Gera `olist_analise_completa.csv` e `olist_order_payments_dataset.csv` com as mesmas
+# colunas e proporções aproximadas do dataset do Kaggle (itens e pagamentos por pedido,
+# estados, categorias, tipos de pagamento, notas, preços e sazonalidade). `scale=1`
+# corresponde ao tamanho do Kaggle (~99 mil pedidos); `scale=100`, a ~10 milhões.
+#
+# Os pedidos são gerados e gravados em blocos, cada um com um gerador aleatório próprio
+# derivado de (semente, índice do bloco): com o tamanho de bloco padrão a saída só depende
+# da semente e da escala, e a memória não cresce com a escala. Os IDs hexadecimais de 32
+# caracteres são uma função bijetora do índice da entidade, então não é preciso guardar
+# tabelas de IDs.
+#
+#   python -m olist.synthetic --scale 10 --out .cache/bench/escala_10
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from olist.ingest import ANALISE_CSV, PAGAMENTOS_CSV
+
+KAGGLE_ORDERS = 99_441
+CUSTOMERS_PER_ORDER = 96_096 / KAGGLE_ORDERS
+PRODUCTS_PER_ORDER = 32_951 / KAGGLE_ORDERS
+SELLERS = 3_095
+CHUNK_ORDERS = 250_000
+
+STATES = ['SP', 'RJ', 'MG', 'RS', 'PR', 'SC', 'BA', 'DF', 'ES', 'GO', 'PE', 'CE', 'PA', 'MT',
+          'MA', 'MS', 'PB', 'PI', 'RN', 'AL', 'SE', 'TO', 'RO', 'AM', 'AC', 'AP', 'RR']
+STATE_WEIGHTS = [42, 13, 11.7, 5.5, 5, 3.6, 3.4, 2.1, 2, 2, 1.7, 1.3, 1, 0.9,
+                 0.75, 0.72, 0.54, 0.5, 0.49, 0.4, 0.34, 0.28, 0.25, 0.15, 0.08, 0.07, 0.05]
+N_CATEGORIES = 71
+ITEMS_PER_ORDER = [0.901, 0.076, 0.013, 0.005, 0.005]
+PAYMENTS_PER_ORDER = [0.97, 0.015, 0.01, 0.005]
+PAYMENT_TYPES = ['credit_card', 'boleto', 'voucher', 'debit_card']
+PAYMENT_WEIGHTS = [0.739, 0.19, 0.056, 0.015]
+REVIEW_WEIGHTS = [0.115, 0.032, 0.083, 0.193, 0.577]
+ORDER_STATUS = ['delivered', 'shipped', 'canceled', 'invoiced', 'processing']
+STATUS_WEIGHTS = [0.97, 0.011, 0.006, 0.007, 0.006]
+FIRST_DAY = pd.Timestamp('2016-09-04')
+N_DAYS = 725
+BLACK_FRIDAY = pd.Timestamp('2017-11-24')
+
+# Constantes ímpares da multiplicação módulo 2^64 que embaralha os índices nos IDs
+_ID_MULTIPLIERS = {'order': 0x9E3779B97F4A7C15, 'customer': 0xBF58476D1CE4E5B9, 'product': 0x94D049BB133111EB,
+                   'seller': 0xD6E8FEB86659FD93, 'review': 0xA0761D6478BD642F}
+
+
+def _normalize(weights):
+    weights = np.asarray(weights, dtype=np.float64)
+    return weights / weights.sum()
+
+
+def hex_ids(kind, index):
+    # IDs únicos de 32 caracteres hexadecimais para os índices dados (só os distintos são
+    # formatados)
+    unique, inverse = np.unique(np.asarray(index, dtype=np.uint64), return_inverse=True)
+    with np.errstate(over='ignore'):
+        high = (unique + np.uint64(1)) * np.uint64(_ID_MULTIPLIERS[kind])
+        low = (high ^ (high >> np.uint64(31))) * np.uint64(0xFF51AFD7ED558CCD)
+    formatted = np.array([f'{h:016x}{l:016x}' for h, l in zip(high.tolist(), low.tolist())], dtype=object)
+    return formatted[inverse]
+
+
+def _dimensions(n_orders, seed):
+    # Atributos fixos de produtos e clientes (arrays numéricos, um valor por entidade)
+    rng = np.random.default_rng([seed, 0])
+    n_products = max(1, round(n_orders * PRODUCTS_PER_ORDER))
+    n_customers = max(1, round(n_orders * CUSTOMERS_PER_ORDER))
+    category_weights = _normalize(1 / np.arange(1, N_CATEGORIES + 1) ** 0.8)
+    category = rng.choice(N_CATEGORIES, n_products, p=category_weights).astype(np.float64)
+    category[rng.random(n_products) < 0.014] = np.nan
+    return {
+        'product_weights': _normalize(rng.pareto(1.2, n_products) + 1),
+        'product_category': category,
+        'product_photos': np.minimum(rng.geometric(0.45, n_products), 20).astype(np.float64),
+        'product_weight_g': np.round(rng.lognormal(7, 1.2, n_products)),
+        'customer_state': rng.choice(len(STATES), n_customers, p=_normalize(STATE_WEIGHTS)),
+    }
+
+
+def _day_weights():
+    # Crescimento ao longo do período, menos vendas no fim de semana e pico na Black Friday
+    days = FIRST_DAY + pd.to_timedelta(np.arange(N_DAYS), unit='D')
+    weights = np.linspace(0.15, 1.0, N_DAYS) * np.where(days.weekday >= 5, 0.75, 1.0)
+    weights[days == BLACK_FRIDAY] *= 8
+    return _normalize(weights)
+
+
+def _chunk(start, n_orders, dims, seed, chunk_index):
+    rng = np.random.default_rng([seed, 1, chunk_index])
+    orders = np.arange(start, start + n_orders)
+    n_customers, n_products = len(dims['customer_state']), len(dims['product_weights'])
+
+    # Quase todo pedido é de um cliente novo, como no Kaggle (~96 mil clientes em ~99 mil pedidos)
+    customer = np.minimum((orders * CUSTOMERS_PER_ORDER).astype(np.int64), n_customers - 1)
+    purchase = (FIRST_DAY + pd.to_timedelta(rng.choice(N_DAYS, n_orders, p=_day_weights()), unit='D')
+                + pd.to_timedelta(rng.integers(0, 86_400, n_orders), unit='s'))
+    status = rng.choice(len(ORDER_STATUS), n_orders, p=_normalize(STATUS_WEIGHTS))
+    delivered = (purchase + pd.to_timedelta(rng.gamma(2.5, 5, n_orders), unit='D')).floor('s')
+    delivered = delivered.where(status == 0)
+    review = rng.choice(5, n_orders, p=REVIEW_WEIGHTS) + 1.0
+    review[rng.random(n_orders) < 0.008] = np.nan
+
+    n_items = rng.choice(len(ITEMS_PER_ORDER), n_orders, p=_normalize(ITEMS_PER_ORDER)) + 1
+    item_order = np.repeat(np.arange(n_orders), n_items)
+    product = rng.choice(n_products, len(item_order), p=dims['product_weights'])
+    price = np.round(rng.lognormal(4.3, 0.9, len(item_order)), 2)
+    freight = np.round(0.08 * price + rng.gamma(2, 7, len(item_order)), 2)
+    order_total = np.bincount(item_order, weights=price + freight, minlength=n_orders)
+
+    category = dims['product_category'][product]
+    analise = pd.DataFrame({
+        'order_id': hex_ids('order', orders[item_order]),
+        'customer_unique_id': hex_ids('customer', customer[item_order]),
+        'customer_state': np.array(STATES)[dims['customer_state'][customer[item_order]]],
+        'order_status': np.array(ORDER_STATUS)[status[item_order]],
+        'order_purchase_timestamp': purchase[item_order],
+        'order_delivered_customer_date': delivered[item_order],
+        'product_id': hex_ids('product', product),
+        'product_category_name_english': pd.Series(category).map(lambda c: f'categoria_{int(c):02d}', na_action='ignore'),
+        'product_photos_qty': dims['product_photos'][product],
+        'product_weight_g': dims['product_weight_g'][product],
+        'seller_id': hex_ids('seller', rng.integers(0, SELLERS, len(item_order))),
+        'price': price,
+        'freight_value': freight,
+        'review_id': hex_ids('review', orders[item_order]),
+        'review_score': review[item_order],
+        'total_order_value': np.round(order_total[item_order], 2),
+    })
+
+    # Pagamentos: o valor total do pedido dividido entre os pagamentos do pedido
+    n_payments = rng.choice(len(PAYMENTS_PER_ORDER), n_orders, p=_normalize(PAYMENTS_PER_ORDER)) + 1
+    payment_order = np.repeat(np.arange(n_orders), n_payments)
+    share = rng.random(len(payment_order)) + 0.1
+    share /= np.bincount(payment_order, weights=share)[payment_order]
+    payment_type = rng.choice(len(PAYMENT_TYPES), len(payment_order), p=_normalize(PAYMENT_WEIGHTS))
+    installments = np.where(payment_type == 0, np.minimum(rng.geometric(0.35, len(payment_order)), 24), 1)
+    first = np.r_[0, np.cumsum(n_payments)[:-1]]
+    pagamentos = pd.DataFrame({
+        'order_id': hex_ids('order', orders[payment_order]),
+        'payment_sequential': np.arange(len(payment_order)) - np.repeat(first, n_payments) + 1,
+        'payment_type': np.array(PAYMENT_TYPES)[payment_type],
+        'payment_installments': installments,
+        'payment_value': np.round(order_total[payment_order] * share, 2),
+    })
+    return analise, pagamentos
+
+
+def generate(scale=1.0, out_dir='.', seed=0, chunk_orders=CHUNK_ORDERS):
+    # Grava os dois CSVs em `out_dir` e devolve o número de linhas de cada um
+    n_orders = max(1, round(KAGGLE_ORDERS * scale))
+    dims = _dimensions(n_orders, seed)
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {'itens': os.path.join(out_dir, ANALISE_CSV), 'pagamentos': os.path.join(out_dir, PAGAMENTOS_CSV)}
+    rows = {'pedidos': n_orders, 'itens': 0, 'pagamentos': 0}
+    for chunk_index, start in enumerate(range(0, n_orders, chunk_orders)):
+        frames = _chunk(start, min(chunk_orders, n_orders - start), dims, seed, chunk_index)
+        for (name, path), frame in zip(paths.items(), frames):
+            frame.to_csv(path, mode='w' if chunk_index == 0 else 'a', header=chunk_index == 0, index=False)
+            rows[name] += len(frame)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera CSVs sintéticos no formato da Olist.")
+    parser.add_argument('--scale', type=float, default=1.0, help="1 = tamanho do dataset do Kaggle")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='.')
+    args = parser.parse_args(argv)
+
+    rows = generate(args.scale, args.out, args.seed)
+    print(f"{rows['pedidos']} pedidos, {rows['itens']} itens, {rows['pagamentos']} pagamentos -> {args.out}")
+
+
+if __name__ == '__main__':
+    main()
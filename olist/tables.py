@@ -0,0 +1,128 @@
+# Modelo estrela do dataset da Olist.
+#
+# Em vez de unir os pagamentos às linhas de análise (o que duplica os pedidos com mais de
+# um pagamento), os dados ficam separados em tabelas ligadas por chaves inteiras:
+#   - itens: fato no grão do CSV de análise (uma linha por item vendido)
+#   - pedidos: fato no grão do pedido (uma linha por order_id)
+#   - pagamentos: uma linha por pagamento, ligada ao pedido por `order_key`
+#   - produtos: dimensão de produtos, já com o total de vendas de cada um
+#   - clientes: dimensão de clientes
+#   - vendas_diarias / vendas_mensais: contagens de pedidos por dia e por mês
+#     (`olist.features`)
+# As chaves (`order_key`, `product_key`, `customer_key`) são os códigos dos IDs internados
+# em `olist.schema` e também a posição da linha na tabela de dimensão, de modo que buscar
+# um atributo é só indexar um array (sem merge nem hash).
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from olist.features import add_time_features, order_counts
+
+ORDER_COLUMNS = [
+    'order_id', 'customer_state', 'order_status', 'order_purchase_timestamp',
+    'order_delivered_customer_date', 'review_id', 'review_score', 'total_order_value',
+]
+PRODUCT_COLUMNS = ['product_id', 'product_category_name_english', 'product_photos_qty', 'product_weight_g']
+CUSTOMER_COLUMNS = ['customer_unique_id']
+KEY_COLUMNS = {
+    'order_id': 'order_key',
+    'product_id': 'product_key',
+    'customer_unique_id': 'customer_key',
+}
+
+
+@dataclass(frozen=True)
+class OlistData:
+    itens: pd.DataFrame
+    pedidos: pd.DataFrame
+    pagamentos: pd.DataFrame
+    produtos: pd.DataFrame
+    clientes: pd.DataFrame
+    vendas_diarias: pd.DataFrame
+    vendas_mensais: pd.DataFrame
+    memory_report: pd.DataFrame
+    # Impressão digital dos CSVs e do código que gerou as tabelas (`olist.persist`)
+    fingerprint: str = ''
+
+    TABLES = ('itens', 'pedidos', 'pagamentos', 'produtos', 'clientes', 'vendas_diarias', 'vendas_mensais')
+
+
+def _key(ids):
+    # Chave inteira de um ID internado (-1 quando ausente)
+    return pd.Series(ids.cat.codes.to_numpy(), index=ids.index, dtype=ids.cat.codes.dtype)
+
+
+def _dimension(df, key_col, id_col, columns):
+    # Uma linha por chave, na posição da própria chave (ausentes descartados)
+    present = [c for c in columns if c in df.columns and c != id_col]
+    dim = df.loc[df[key_col] >= 0, [key_col] + present].drop_duplicates(subset=key_col)
+    dim = dim.set_index(key_col).reindex(np.arange(len(df[id_col].cat.categories)))
+    dim.insert(0, id_col, pd.Categorical.from_codes(dim.index, dtype=df[id_col].dtype))
+    dim.index.name = key_col
+    return dim.reset_index(drop=True)
+
+
+def build_tables(df_analise, df_payments, memory_report):
+    # `df_analise` e `df_payments` já chegam compactados (IDs como categóricos)
+    df = df_analise.copy()
+    for id_col, key_col in KEY_COLUMNS.items():
+        if id_col in df.columns:
+            df[key_col] = _key(df[id_col])
+
+    pedidos = _dimension(df, 'order_key', 'order_id', ORDER_COLUMNS + ['customer_key'])
+    pedidos = add_time_features(pedidos)
+    vendas_diarias, vendas_mensais = order_counts(pedidos)
+    produtos = _dimension(df, 'product_key', 'product_id', PRODUCT_COLUMNS)
+    clientes = _dimension(df, 'customer_key', 'customer_unique_id', CUSTOMER_COLUMNS)
+
+    # Total de vendas (pedidos distintos) por produto, calculado uma única vez aqui
+    pares = df.loc[df['product_key'] >= 0, ['order_key', 'product_key']].drop_duplicates()
+    produtos['total_vendas'] = np.bincount(pares['product_key'], minlength=len(produtos)).astype('int32')
+
+    # Itens ficam só com as chaves e as colunas que não pertencem a nenhuma dimensão
+    dimension_cols = set(ORDER_COLUMNS) | set(PRODUCT_COLUMNS) | set(CUSTOMER_COLUMNS) | {'customer_key'}
+    itens = df[[c for c in df.columns if c not in dimension_cols]].reset_index(drop=True)
+
+    # Pagamentos de pedidos que não estão no CSV de análise são descartados, como no left join
+    payment_order = pd.Categorical(df_payments['order_id'], dtype=pedidos['order_id'].dtype)
+    pagamentos = df_payments.drop(columns='order_id')
+    pagamentos.insert(0, 'order_key', payment_order.codes)
+    pagamentos = pagamentos[pagamentos['order_key'] >= 0].reset_index(drop=True)
+
+    return OlistData(itens=itens, pedidos=pedidos, pagamentos=pagamentos, produtos=produtos,
+                     clientes=clientes, vendas_diarias=vendas_diarias, vendas_mensais=vendas_mensais,
+                     memory_report=memory_report)
+
+
+def lookup(table, column, keys):
+    # Atributo `column` da tabela de dimensão para cada chave (chaves -1 viram ausentes)
+    keys = np.asarray(keys)
+    values = table[column].array.take(keys, allow_fill=True)
+    return pd.Series(values, name=column)
+
+
+def item_columns(data, columns, itens=None):
+    # Monta um dataframe no grão de itens com colunas vindas de pedidos/produtos
+    # (`itens` permite passar só parte das linhas de `data.itens`)
+    itens = data.itens if itens is None else itens
+    out = {}
+    for col in columns:
+        if col in itens.columns:
+            out[col] = itens[col].reset_index(drop=True)
+        elif col in data.pedidos.columns:
+            out[col] = lookup(data.pedidos, col, itens['order_key'])
+        elif col in data.produtos.columns:
+            out[col] = lookup(data.produtos, col, itens['product_key'])
+        else:
+            customer_key = lookup(data.pedidos, 'customer_key', itens['order_key'])
+            out[col] = lookup(data.clientes, col, customer_key)
+    return pd.DataFrame(out)
+
+
+def sample_rows(data, n=5):
+    # Primeiras linhas no formato "desnormalizado" original, só para exibição
+    head = data.itens.head(n)
+    columns = ORDER_COLUMNS[:1] + ['customer_unique_id'] + ORDER_COLUMNS[1:] + PRODUCT_COLUMNS
+    columns += [c for c in head.columns if not c.endswith('_key')]
+    return item_columns(data, columns, itens=head)
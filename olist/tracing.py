@@ -0,0 +1,124 @@
+# Instrumentação opcional do dashboard: spans nomeados por etapa de cada renderização.
+#
+# Cada renderização da página cria um `Tracer`. As etapas quentes (consulta ao cache do
+# `load_data()`, agregações do pandas, testes do scipy, construção das figuras do Plotly e
+# serialização dos elementos para o navegador) ficam dentro de `tracer.span(nome,
+# categoria)`. Desligado (o padrão), `span` não mede nada. Ligado (variável de ambiente
+# `OLIST_TRACE=1` ou a opção "Diagnóstico de desempenho" da barra lateral), os spans
+# aparecem num painel recolhível ao fim da página e são acrescentados a um arquivo JSON
+# lines (`OLIST_TRACE_FILE`, padrão `.cache/traces.jsonl`), uma linha por span.
+#
+# Resumo dos spans gravados, somando todas as sessões:
+#   python -m olist.tracing --file .cache/traces.jsonl
+import argparse
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+
+import pandas as pd
+
+from olist.ingest import CACHE_DIR
+
+TRACE_FILE = os.environ.get('OLIST_TRACE_FILE', os.path.join(CACHE_DIR, 'traces.jsonl'))
+CATEGORIES = {'cache': 'Cache', 'pandas': 'Pandas', 'scipy': 'SciPy', 'figura': 'Figuras', 'serializacao': 'Serialização'}
+
+
+def new_id():
+    return uuid.uuid4().hex[:12]
+
+
+def enabled_by_default():
+    return os.environ.get('OLIST_TRACE', '').lower() in ('1', 'true', 'sim')
+
+
+class Tracer:
+    def __init__(self, enabled=False, session=None):
+        self.enabled = enabled
+        self.session = session
+        self.render = new_id()
+        self.spans = []
+        self._start = time.perf_counter()
+        self._depth = 0
+
+    @contextmanager
+    def span(self, name, category):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            end = time.perf_counter()
+            self.spans.append({'span': name, 'categoria': category, 'nivel': self._depth,
+                               'inicio_ms': (start - self._start) * 1000, 'duracao_ms': (end - start) * 1000})
+
+    def records(self, page):
+        # Spans da renderização, mais um registro 'render' com o tempo total até aqui
+        total_ms = (time.perf_counter() - self._start) * 1000
+        base = {'timestamp': time.time(), 'sessao': self.session, 'render': self.render, 'pagina': page}
+        spans = [{**base, **span} for span in self.spans]
+        spans.append({**base, 'span': 'render', 'categoria': 'render', 'nivel': 0,
+                      'inicio_ms': 0.0, 'duracao_ms': total_ms})
+        return spans
+
+
+def report(records):
+    # Tabela para o painel: duração de cada span e a fração do tempo total da renderização
+    df = pd.DataFrame(records)
+    total = df.loc[df['span'] == 'render', 'duracao_ms'].iloc[0]
+    df = df[df['span'] != 'render'].sort_values('inicio_ms')
+    df['fracao'] = df['duracao_ms'] / total
+    return df[['span', 'categoria', 'nivel', 'inicio_ms', 'duracao_ms', 'fracao']].reset_index(drop=True)
+
+
+def by_category(records):
+    # Tempo por categoria, só com os spans de primeiro nível (sem contar aninhados duas vezes)
+    df = pd.DataFrame(records)
+    df = df[(df['span'] != 'render') & (df['nivel'] == 0)]
+    return df.groupby('categoria')['duracao_ms'].sum().reindex(list(CATEGORIES), fill_value=0.0)
+
+
+def append_records(records, path=TRACE_FILE):
+    # Gravar o rastro nunca pode derrubar a página (disco cheio, diretório sem permissão...)
+    try:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    except OSError:
+        pass
+
+
+def read_records(path=TRACE_FILE):
+    with open(path, encoding='utf-8') as f:
+        return pd.DataFrame([json.loads(line) for line in f if line.strip()])
+
+
+def summarize(df):
+    # Mediana, p95 e contagem da duração de cada span por página, em todas as sessões
+    grouped = df.groupby(['pagina', 'span', 'categoria'])['duracao_ms']
+    summary = grouped.agg(n='count', mediana_ms='median', p95_ms=lambda s: s.quantile(0.95), total_ms='sum')
+    return summary.reset_index().sort_values(['pagina', 'total_ms'], ascending=[True, False])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resumo dos spans gravados pelo dashboard.")
+    parser.add_argument('--file', default=TRACE_FILE)
+    parser.add_argument('--csv', help="grava o resumo neste arquivo CSV")
+    args = parser.parse_args(argv)
+
+    df = read_records(args.file)
+    summary = summarize(df)
+    print(f"{df['render'].nunique()} renderizações, {df['sessao'].nunique()} sessões")
+    print(summary.to_string(index=False, float_format=lambda v: f"{v:.1f}"))
+    if args.csv:
+        summary.to_csv(args.csv, index=False)
+
+
+if __name__ == '__main__':
+    main()
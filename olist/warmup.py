@@ -0,0 +1,105 @@
+# Aquecimento das páginas de análise em segundo plano.
+#
+# A primeira visita a cada página de `pages/3_Analise_de_Dados.py` paga todas as contas
+# dela (agregações e testes) com o usuário esperando. Assim que os dados e os cubos estão
+# carregados, a página agenda aqui as análises das outras páginas: uma thread de fundo as
+# calcula, com os filtros atuais da sessão, e os resultados caem na memória de
+# `olist.aggregates`, dividida entre as sessões. Trocar de aba passa a encontrar o
+# resultado pronto; se a conta ainda estiver rodando, a página espera por ela em vez de
+# repeti-la. A página na tela nunca espera o aquecimento: ela é calculada pela própria
+# execução e fica fora da fila.
+#
+# As páginas entram na fila pela popularidade: cada vez que uma sessão abre uma página,
+# a contagem dela em `.cache/popularidade.json` (somando sessões e reinícios do app)
+# aumenta, e as mais visitadas são aquecidas primeiro. Dentro de cada página, primeiro as
+# chamadas com as opções padrão dos controles, depois as outras opções.
+#
+# Uma thread só (os cálculos são do pandas/numpy/scipy e dividem a memória do processo;
+# processos separados não enxergariam o cache), com no máximo um aquecimento pendente por
+# sessão: mudar os filtros troca o aquecimento que ainda não começou pelo novo.
+# OLIST_WARMUP=0 desliga o aquecimento.
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from olist import bundle, persist
+from olist.persist import CACHE_DIR
+
+ENABLED = os.environ.get('OLIST_WARMUP', '1').lower() not in ('0', 'false', 'nao', 'não')
+POPULARITY_FILE = os.path.join(CACHE_DIR, 'popularidade.json')
+
+# Análises memorizadas de cada página (nomes de `olist.bundle.ANALYSES`), na ordem em que a
+# página as pede ("Conhecendo o Dataset" só lê 5 linhas e o relatório de memória pronto)
+PAGE_ANALYSES = {
+    "Análise Descritiva Geral": ['descriptive_summary', 'price_freight', 'price_freight_sample', 'discrete_distribution'],
+    "Hábitos de Compra por Estado": ['state_summary'],
+    "Padrões Sazonais de Vendas": ['seasonal_summary'],
+    "Avaliação por Categoria Popular": ['category_summary'],
+    "Satisfação por Tipo de Pagamento": ['payment_summary'],
+    "Análise de Fotos vs. Vendas": ['photo_summary'],
+    "Qui-Quadrado (Categoria vs. Estado)": ['contingency_summary', 'chi_square'],
+}
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='olist-aquecimento')
+_pending = {}
+_lock = threading.Lock()
+
+
+# --- Popularidade das páginas ---
+
+def popularity(path=POPULARITY_FILE):
+    # Visitas por página (vazio se o arquivo não existe)
+    return persist.read_json(path) or {}
+
+
+def record_visit(page, path=POPULARITY_FILE):
+    # Mais uma visita à página (a leitura e a gravação não são atômicas entre processos:
+    # uma visita pode se perder, o que não muda a ordem de forma relevante). Gravar a
+    # contagem nunca pode derrubar a página (disco só de leitura, diretório sem permissão...)
+    with _lock:
+        counts = popularity(path)
+        counts[page] = counts.get(page, 0) + 1
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            persist.write_json(path, counts)
+        except OSError:
+            pass
+
+
+def page_order(pages, current=None, path=POPULARITY_FILE):
+    # Páginas da mais para a menos visitada (empates na ordem da barra lateral), sem a atual
+    counts = popularity(path)
+    return sorted((p for p in pages if p != current), key=lambda p: -counts.get(p, 0))
+
+
+# --- Fila de aquecimento ---
+
+def page_calls(page, filters):
+    # Chamadas de `olist.bundle.page_calls` da página, com os filtros da sessão
+    names = PAGE_ANALYSES.get(page, [])
+    calls = [(name, {**kwargs, 'filters': filters} if 'filters' in kwargs else kwargs)
+             for name, kwargs in bundle.page_calls() if name in names]
+    return sorted(calls, key=lambda call: names.index(call[0]))
+
+
+def _run(compute, calls):
+    for name, kwargs in calls:
+        try:
+            compute(name, **kwargs)
+        except Exception:
+            pass  # a página mostra o erro quando (e se) for aberta
+
+
+def schedule(session, compute, pages, filters):
+    # Agenda as análises das páginas (na ordem dada) para `compute(nome, **kwargs)`, que
+    # deve ser memorizado. Devolve o future do aquecimento
+    calls = [call for page in pages for call in page_calls(page, filters)]
+    with _lock:
+        previous = _pending.get(session)
+        if previous is not None:
+            previous.cancel()  # sem efeito se já começou
+        future = _pending[session] = _executor.submit(_run, compute, calls)
+        for key in [k for k, f in _pending.items() if f.done()]:
+            del _pending[key]
+    return future
+
@@ -1,11 +1,15 @@
+import os
+
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import numpy as np
-import scipy.stats as stats
 
-import plotly.express as px
+from olist import aggregates, bundle, figcache, incremental, ingest, progressive, resampling, shared, sqlcube, streaming, tracing, warmup
+from olist.lazy import lazy_import
+
+# Bibliotecas pesadas só são importadas quando uma página realmente as usa
+px = lazy_import('plotly.express')
+charts = lazy_import('olist.charts')
 
 # --- CONFIGURAÇÃO INICIAL E CARREGAMENTO DE DADOS ---
 
@@ -83,30 +87,136 @@ st.markdown("""
 
 
 # Função para carregar e preparar os dados
-@st.cache_data
-def load_data():
+# (o snapshot Parquet em `olist.ingest` evita reler os CSVs a cada cold start; os dados
+# vêm separados em tabelas de itens, pedidos, pagamentos, produtos e clientes, ligadas
+# por chaves inteiras, sem a duplicação de linhas do merge com os pagamentos).
+# A impressão digital dos CSVs entra na chave do cache: se um CSV mudar com o app no ar,
+# a próxima execução recarrega os dados sem precisar reiniciar o processo.
+# `cache_resource` guarda um único objeto por processo, dividido por todas as sessões sem
+# cópia; por isso o dataset é embrulhado em `shared.SharedData` (somente leitura)
+@st.cache_resource
+def load_data(fingerprint):
     try:
-        # Carregando os datasets
-        df = pd.read_csv('olist_analise_completa.csv')
-        df_payments = pd.read_csv('olist_order_payments_dataset.csv')
-        
-        # Unindo os dataframes
-        df_merged = pd.merge(df, df_payments, on='order_id', how='left')
-        
-        # Convertendo colunas de data
-        df_merged['order_purchase_timestamp'] = pd.to_datetime(df_merged['order_purchase_timestamp'])
-        df_merged['order_delivered_customer_date'] = pd.to_datetime(df_merged['order_delivered_customer_date'])
-        
-        return df_merged
+        return shared.share(ingest.load_tables())
     except FileNotFoundError as e:
         st.error(f"Erro ao carregar os dados: O arquivo '{e.filename}' não foi encontrado. Certifique-se de que todos os arquivos CSV estão na mesma pasta.")
         return None
 
-# Carrega os dados
-df_final = load_data()
 
-if df_final is None:
-    st.stop()
+def impressao_digital():
+    try:
+        return ingest.data_fingerprint()
+    except FileNotFoundError:
+        return None  # `load_data` mostra o erro com o nome do arquivo
+
+# Cubo pré-agregado (`olist.cube`) que responde às páginas filtradas sem varrer as linhas,
+# também guardado no cache em disco e dividido entre as sessões (os filtros criam cubos
+# novos, nunca alteram este); o argumento com "_" não entra no hash do cache (a
+# impressão digital dos dados já identifica o conteúdo). Com OLIST_BACKEND=duckdb, as
+# mesmas consultas viram SQL num DuckDB embutido (`olist.sqlcube`)
+@st.cache_resource
+def load_cube(_dados, fingerprint, backend):
+    return sqlcube.open_cubes(_dados, backend)
+
+
+# Resumos atualizados com os lotes de pedidos aplicados por `python -m olist.incremental`
+# (a chave muda a cada lote)
+@st.cache_resource
+def load_summaries(chave):
+    return incremental.load_summaries(chave)
+
+
+# Modo streaming (variável OLIST_STREAMING): só os cubos dos filtros, montados a partir dos
+# CSVs repartidos por pedido, sem nunca carregar o dataset inteiro (`olist.streaming`)
+@st.cache_resource
+def load_stream_cubes(fingerprint):
+    try:
+        return streaming.load_cubes()
+    except FileNotFoundError as e:
+        st.error(f"Erro ao carregar os dados: O arquivo '{e.filename}' não foi encontrado. Certifique-se de que todos os arquivos CSV estão na mesma pasta.")
+        return None
+
+
+# Modo pacote (variável OLIST_BUNDLE): os resultados de todas as páginas vêm do pacote
+# gerado por `python -m olist.bundle`, sem carregar os CSVs nem montar os cubos
+@st.cache_resource
+def load_bundle(caminho):
+    try:
+        return bundle.open_bundle(caminho)
+    except (FileNotFoundError, ValueError) as e:
+        st.error(f"Erro ao abrir o pacote de resultados: {e}")
+        return None
+
+# Instrumentação opcional (`olist.tracing`): ligada pela variável de ambiente OLIST_TRACE
+# ou pela opção "Diagnóstico de desempenho" da barra lateral
+trace = tracing.Tracer(enabled=tracing.enabled_by_default() or st.session_state.get('diagnostico', False),
+                       session=st.session_state.setdefault('sessao', tracing.new_id()))
+
+
+# Elementos enviados ao navegador: a serialização (Plotly -> JSON, dataframe -> Arrow)
+# acontece dentro da chamada do Streamlit
+def mostrar_grafico(fig):
+    with trace.span('plotly_chart', 'serializacao'):
+        st.plotly_chart(fig, use_container_width=True)
+
+
+# Resultado de uma análise (`olist.bundle.ANALYSES`): lido do pacote ou calculado agora a
+# partir do dataset/cubos (memorizado em `olist.aggregates`)
+def resultado(nome, *args, **kwargs):
+    if pacote is not None:
+        return pacote.result(nome, *args, **kwargs)
+    if resumos is not None and nome in incremental.ANALYSES:
+        return incremental.ANALYSES[nome](resumos, dados, *args, **kwargs)
+    return bundle.compute(nome, dados, cubos, *args, **kwargs)
+
+
+# Figuras prontas do cache do processo (`olist.figcache`), pela impressão digital dos
+# dados, página e parâmetros: `construir` só roda na primeira vez
+def figura(nome, construir, **params):
+    return figcache.figure(fonte.fingerprint, pagina_selecionada, nome, construir, **params)
+
+
+def mostrar_tabela(df):
+    with trace.span('dataframe', 'serializacao'):
+        st.dataframe(df)
+
+
+# Enquanto os cálculos exatos rodam em segundo plano (`olist.progressive`), confere a cada
+# segundo se já terminaram e, quando terminam, reexecuta a página com os valores exatos
+@st.fragment(run_every=1.0)
+def aguardar_exatos(pendentes):
+    if all(f.done() for f in pendentes):
+        st.rerun()
+    st.caption("⏳ Calculando os valores exatos em segundo plano...")
+
+
+# Carrega os dados (ou só o pacote de resultados)
+dados = cubos = pacote = resumos = None
+if bundle.BUNDLE_DIR:
+    with trace.span('load_bundle', 'cache'):
+        pacote = load_bundle(bundle.BUNDLE_DIR)
+    if pacote is None:
+        st.stop()
+elif streaming.STREAMING:
+    with trace.span('load_cube', 'cache'):
+        cubos = load_stream_cubes(impressao_digital())
+    if cubos is None:
+        st.stop()
+else:
+    with trace.span('load_data', 'cache'):
+        dados = load_data(impressao_digital())
+
+    if dados is None:
+        st.stop()
+
+    # Com lotes novos aplicados, os cubos (e o resumo descritivo) vêm dos resumos
+    # atualizados; senão, do backend escolhido
+    with trace.span('load_cube', 'cache'):
+        chave_resumos = incremental.current_key(dados.fingerprint)
+        resumos = load_summaries(chave_resumos) if chave_resumos else None
+        cubos = resumos.cubes if resumos is not None else load_cube(dados, dados.fingerprint, sqlcube.BACKEND)
+# Origem dos resultados, cuja impressão digital identifica as figuras e os testes memorizados
+fonte = pacote or resumos or dados or cubos
 
 st.title('Dashboard de Análise de Vendas e Clientes Olist 📊')
 
@@ -122,7 +232,72 @@ lista_de_paginas = [
     "Análise de Fotos vs. Vendas", # <-- NOVA ABA
     "Qui-Quadrado (Categoria vs. Estado)"
 ]
-pagina_selecionada = st.sidebar.radio("Selecione uma análise:", lista_de_paginas)
+if pacote is None and dados is None:
+    # Modo streaming: sem as linhas do dataset, ficam só as páginas que saem dos cubos
+    lista_de_paginas = [p for p in lista_de_paginas if p not in ("Análise Descritiva Geral", "Análise de Fotos vs. Vendas")]
+pagina_selecionada = st.sidebar.radio("Selecione uma análise:", lista_de_paginas, key="pagina")
+
+
+# Filtros da barra lateral, aplicados ao cubo (lista vazia = sem filtro)
+def filtros_barra_lateral(cubos):
+    rotulos = cubos.pedidos.labels
+    meses = [int(m) for m in rotulos['year_month']]
+    with st.sidebar.expander("Filtros"):
+        if meses:
+            inicio, fim = st.select_slider("Período", options=meses, value=(meses[0], meses[-1]),
+                                           format_func=lambda m: f"{m // 100}-{m % 100:02d}", key="filtro_periodo")
+        else:
+            inicio, fim = None, None
+        estados = st.multiselect("Estados", list(rotulos['customer_state']), key="filtro_estados")
+        categorias = st.multiselect("Categorias", list(rotulos['product_category_name_english']), key="filtro_categorias")
+        pagamentos = st.multiselect("Tipos de pagamento", list(rotulos['payment_type']), key="filtro_pagamentos")
+        st.caption("Valem para as páginas de Estado, Sazonal, Categoria, Pagamento e Qui-Quadrado. "
+                   "Nos totais por pedido, a categoria é a do item mais caro e o pagamento é qualquer tipo usado no pedido.")
+    periodo = None
+    if meses and (inicio, fim) != (meses[0], meses[-1]):
+        periodo = [m for m in meses if inicio <= m <= fim]
+    return {'year_month': periodo, 'customer_state': estados,
+            'product_category_name_english': categorias, 'payment_type': pagamentos}
+
+
+paginas_com_filtro = [
+    "Hábitos de Compra por Estado",
+    "Padrões Sazonais de Vendas",
+    "Avaliação por Categoria Popular",
+    "Satisfação por Tipo de Pagamento",
+    "Qui-Quadrado (Categoria vs. Estado)"
+]
+if pacote is None:
+    filtros = filtros_barra_lateral(cubos)
+    if resumos is not None:
+        st.sidebar.caption("Inclui os lotes de pedidos acrescentados depois dos CSVs. A reta e os pontos da "
+                           "dispersão de preço e frete, as distribuições discretas, as fotos e a amostra mostram "
+                           "só os CSVs de base.")
+else:
+    # O pacote só tem os resultados sem filtro
+    filtros = bundle.NO_FILTERS
+    st.sidebar.caption(f"Resultados pré-calculados em {pacote.created}: os filtros ficam desativados.")
+st.sidebar.checkbox("Diagnóstico de desempenho", key="diagnostico", value=tracing.enabled_by_default(),
+                    help="Mede o tempo de cada etapa da página e grava os tempos em " + tracing.TRACE_FILE)
+if pacote is None and pagina_selecionada in paginas_com_filtro and cubos.where(**filtros).pedidos.empty:
+    st.warning("Nenhum pedido corresponde aos filtros selecionados.")
+    st.stop()
+
+
+# Opções da reamostragem (bootstrap/permutação), usadas pelas páginas de teste de hipótese
+def opcoes_reamostragem():
+    with st.expander("Reamostragem (bootstrap, permutação e Monte Carlo)"):
+        ativa = st.checkbox("Calcular também por reamostragem", key="reamostragem_ativa")
+        c1, c2, c3 = st.columns(3)
+        n_resamples = c1.number_input("Nº de reamostras", min_value=100, max_value=100_000,
+                                      value=resampling.DEFAULT_RESAMPLES, step=500, key="reamostragem_n")
+        seed = c2.number_input("Semente", min_value=0, value=42, key="reamostragem_seed")
+        max_workers = os.cpu_count() or 1
+        workers = c3.number_input("Processos", min_value=1, max_value=max_workers, value=1,
+                                  key="reamostragem_workers")
+    if not ativa:
+        return None
+    return {'n_resamples': int(n_resamples), 'seed': int(seed), 'workers': int(workers)}
 
 # --- EXIBIÇÃO CONDICIONAL DAS PÁGINAS ---
 
@@ -198,8 +373,19 @@ if pagina_selecionada == "Conhecendo o Dataset":
         - `order_purchase_timestamp`, `order_delivered_customer_date`: Pontos específicos em uma linha do tempo contínua.
         """)
     
-    with st.expander("Ver amostra dos dados"):
-        st.dataframe(df_final.head())
+    if pacote is None and dados is None:
+        st.info("Modo streaming: o dataset não é carregado na memória; as análises vêm dos cubos pré-agregados.")
+    else:
+        with st.expander("Ver amostra dos dados"):
+            mostrar_tabela(resultado('sample_rows'))
+
+        with st.expander("Ver uso de memória por coluna"):
+            memory_report = resultado('memory_report')
+            total_original = memory_report['bytes_original'].sum()
+            total_compacto = memory_report['bytes_compacto'].sum()
+            st.metric("Memória do Dataset", f"{total_compacto / 1e6:.1f} MB",
+                      delta=f"-{(total_original - total_compacto) / 1e6:.1f} MB", delta_color="inverse")
+            mostrar_tabela(memory_report.sort_values('bytes_economizados', ascending=False))
 
 # --- Página 1: Análise Descritiva Geral ---
 # --- Página 1: Análise Descritiva Geral (VERSÃO COM ANÁLISE DETALHADA) ---
@@ -207,22 +393,66 @@ if pagina_selecionada == "Análise Descritiva Geral":
     st.header('Análise Descritiva dos Dados')
     st.markdown("Qual é o perfil geral das transações da Olist em termos de preço, frete e satisfação do cliente?")
 
+    quantile_threshold = 0.99
+
+    # Modo progressivo (`olist.progressive`, só com os CSVs carregados): os resumos exatos
+    # vão para uma thread de fundo e, até ficarem prontos, a página mostra estimativas de
+    # uma amostra uniforme com a meia-largura do intervalo de confiança de 95%
+    aproximado = False
+    if pacote is None and resumos is None:
+        progressivo = st.toggle("Resultados progressivos", key="progressivo",
+                                value=len(dados.itens) >= progressive.MIN_ROWS,
+                                help="Mostra primeiro estimativas de uma amostra e troca pelos valores exatos quando o cálculo termina")
+        if progressivo:
+            pendentes = [progressive.refine(aggregates.descriptive_summary, dados),
+                         progressive.refine(aggregates.price_freight, dados, quantile_threshold=quantile_threshold)]
+            aproximado = not all(f.done() for f in pendentes)
+
+    # Resumos memorizados por impressão digital dos dados (`olist.aggregates`)
+    if aproximado:
+        with trace.span('amostra_progressiva', 'pandas'):
+            aprox = progressive.approximate_descriptive(dados)
+            aprox_preco_frete = progressive.approximate_price_freight(dados, quantile_threshold=quantile_threshold)
+        descritiva, preco_frete = aprox.resumo, aprox_preco_frete.resumo
+        st.info(f"Estimativas de uma amostra uniforme de {aprox.amostra} de {aprox.total} linhas "
+                "(± = meia-largura do intervalo de confiança de 95%; contagem, mínimo e máximo são exatos). "
+                "Os valores exatos substituem as estimativas assim que o cálculo terminar.")
+        aguardar_exatos(pendentes)
+    else:
+        with trace.span('resumo_descritivo', 'pandas'):
+            descritiva = resultado('descriptive_summary')
+
+    # Valor (com o "± erro" quando é uma estimativa) e tabela do `describe()`
+    def valor(resumo, erros, chave, prefixo=""):
+        texto = f"{prefixo}{resumo[chave]:.2f}"
+        return f"{texto} ± {erros[chave]:.2f}" if aproximado else texto
+
+    def tabela_resumo(resumo, erros):
+        if aproximado:
+            mostrar_tabela(pd.DataFrame({'estimativa': resumo, '± IC 95%': erros}))
+        else:
+            mostrar_tabela(resumo)
+
     col1, col2 = st.columns(2)
 
     with col1:
         st.subheader("Nota de Avaliação (`review_score`)")
         m1, m2, m3 = st.columns(3)
-        m1.metric(label="Média", value=f"{df_final['review_score'].mean():.2f}")
-        m2.metric(label="Mediana", value=f"{df_final['review_score'].median():.2f}")
-        m3.metric(label="Moda", value=f"{df_final['review_score'].mode()[0]:.2f}")
-        st.dataframe(df_final['review_score'].describe())
+        resumo_nota = descritiva.resumo_nota
+        erros_nota = aprox.erros_nota if aproximado else None
+        m1.metric(label="Média", value=valor(resumo_nota, erros_nota, 'mean'))
+        m2.metric(label="Mediana", value=valor(resumo_nota, erros_nota, '50%'))
+        m3.metric(label="Moda", value=f"{descritiva.moda_nota:.2f}")
+        tabela_resumo(resumo_nota, erros_nota)
 
     with col2:
         st.subheader("Preço do Produto (`price`)")
         p1, p2 = st.columns(2)
-        p1.metric(label="Preço Médio", value=f"R$ {df_final['price'].mean():.2f}")
-        p2.metric(label="Preço Mediano", value=f"R$ {df_final['price'].median():.2f}")
-        st.dataframe(df_final['price'].describe())
+        resumo_preco = descritiva.resumo_preco
+        erros_preco = aprox.erros_preco if aproximado else None
+        p1.metric(label="Preço Médio", value=valor(resumo_preco, erros_preco, 'mean', "R$ "))
+        p2.metric(label="Preço Mediano", value=valor(resumo_preco, erros_preco, '50%', "R$ "))
+        tabela_resumo(resumo_preco, erros_preco)
     
     # --- ANÁLISE DETALHADA DAS TABELAS ---
     with st.expander("Clique aqui para uma análise detalhada das tabelas acima"):
@@ -243,57 +473,96 @@ if pagina_selecionada == "Análise Descritiva Geral":
     col_dist, col_corr = st.columns(2)
     with col_dist:
         st.subheader('Distribuição Visual da Nota de Avaliação')
-        fig = px.histogram(df_final.dropna(subset=['review_score']), x='review_score', 
-                           title='Distribuição da Nota de Avaliação',
-                           marginal='box',
-                           color_discrete_sequence=['#636EFA'])
-        fig.update_layout(bargap=0.2)
-        st.plotly_chart(fig, use_container_width=True)
+        # O gráfico recebe só o vetor de contagens (5 barras) e os quartis do box marginal
+        with trace.span('histograma_nota', 'figura'):
+            fig = figura('histograma_nota', lambda: charts.count_histogram(
+                descritiva.valores_nota, descritiva.contagens_nota, descritiva.box_nota,
+                title='Distribuição da Nota de Avaliação', label='review_score'), aproximado=aproximado)
+        mostrar_grafico(fig)
         st.markdown("O histograma confirma a análise da tabela: uma concentração massiva de notas 5, uma boa quantidade de notas 4, mas uma cauda preocupante de notas 1.")
 
     with col_corr:
         st.subheader('Correlação entre Preço e Frete')
-        quantile_threshold = 0.99
-        correlation = df_final['price'].corr(df_final['freight_value'])
-        st.metric(label="Correlação (Pearson)", value=f"{correlation:.2f}")
-        df_filtered_corr = df_final.dropna(subset=['price', 'freight_value'])
-        df_filtered_corr = df_filtered_corr[(df_filtered_corr['price'] < df_filtered_corr['price'].quantile(quantile_threshold)) & 
-                                            (df_filtered_corr['freight_value'] < df_filtered_corr['freight_value'].quantile(quantile_threshold))]
-        
-        fig = px.scatter(df_filtered_corr, x='price', y='freight_value', 
-                         title='Correlação entre Preço e Frete',
-                         trendline="ols",
-                         trendline_color_override="red",
-                         labels={'price': 'Preço do Produto (R$)', 'freight_value': 'Valor do Frete (R$)'})
-        st.plotly_chart(fig, use_container_width=True)
+        # A reta OLS é ajustada sobre todos os pontos abaixo do quantil de corte, mas o
+        # navegador só recebe uma grade de densidade ou uma amostra estratificada de tamanho fixo
+        if not aproximado:
+            with trace.span('correlacao', 'pandas'):
+                preco_frete = resultado('price_freight', quantile_threshold=quantile_threshold)
+        fit = preco_frete.fit
+        if aproximado:
+            st.metric(label="Correlação (Pearson)",
+                      value=f"{preco_frete.correlacao:.2f} ± {aprox_preco_frete.erro_correlacao:.2f}")
+            limites, erros_limites = aprox_preco_frete.limites, aprox_preco_frete.erros_limites
+            st.caption(f"Cortes estimados no quantil {quantile_threshold}: preço < R$ {limites['price']:.2f} "
+                       f"± {erros_limites['price']:.2f} e frete < R$ {limites['freight_value']:.2f} "
+                       f"± {erros_limites['freight_value']:.2f}; a grade mostra contagens estimadas.")
+        else:
+            st.metric(label="Correlação (Pearson)", value=f"{preco_frete.correlacao:.2f}")
+        labels = ('Preço do Produto (R$)', 'Valor do Frete (R$)')
+        modo_dispersao = st.radio("Visualização", ["Densidade", "Amostra"], horizontal=True)
+        if modo_dispersao == "Densidade":
+            with trace.span('dispersao', 'figura'):
+                fig = figura('densidade', lambda: charts.density_scatter(*preco_frete.grade, fit, 'Correlação entre Preço e Frete', labels),
+                             quantile_threshold=quantile_threshold, aproximado=aproximado)
+        else:
+            with trace.span('amostra_estratificada', 'pandas'):
+                if aproximado:
+                    df_amostra = aprox_preco_frete.pontos
+                else:
+                    df_amostra = resultado('price_freight_sample', quantile_threshold=quantile_threshold, max_points=5000)
+            with trace.span('dispersao', 'figura'):
+                fig = figura('amostra', lambda: charts.sample_scatter(
+                    df_amostra['price'], df_amostra['freight_value'], fit,
+                    f'Correlação entre Preço e Frete (amostra de {len(df_amostra)} de {fit["n"]} pontos)', labels),
+                             quantile_threshold=quantile_threshold, max_points=5000, aproximado=aproximado)
+        mostrar_grafico(fig)
         st.markdown("O coeficiente de **+0.42** indica uma correlação positiva moderada: produtos mais caros tendem a ter um frete mais caro, como esperado.")
 
+    with st.expander("Outras distribuições discretas"):
+        variaveis_discretas = {
+            'payment_installments': 'Número de Parcelas',
+            'product_photos_qty': 'Quantidade de Fotos no Anúncio',
+        }
+        variavel = st.selectbox("Variável", list(variaveis_discretas))
+        titulo = variaveis_discretas[variavel]
+        with trace.span('contagens_discretas', 'pandas'):
+            valores, contagens, box_variavel = resultado('discrete_distribution', variavel)
+        with trace.span('histograma_discreto', 'figura'):
+            fig = figura('histograma_discreto', lambda: charts.count_histogram(
+                valores, contagens, box_variavel, title=f'Distribuição: {titulo}', label=variavel), variavel=variavel)
+        mostrar_grafico(fig)
+
 # --- Página 2: Hábitos de Compra por Estado ---
 elif pagina_selecionada == "Hábitos de Compra por Estado":
     st.markdown("O comportamento de compra e as preferências de produtos variam entre os diferentes estados do Brasil?")
-    df_state_value = df_final.groupby('customer_state')['total_order_value'].mean().sort_values(ascending=False).reset_index()
-    top_categories_geral = df_final['product_category_name_english'].value_counts().nlargest(15).reset_index()
-    top_categories_geral.columns = ['Categoria', 'Número de Pedidos']
+    # Médias e contagens saem das somas do cubo filtrado
+    with trace.span('agregacao_estado', 'pandas'):
+        resumo_estado = resultado('state_summary', filtros, top_n=15)
+    df_state_value, top_categories_geral = resumo_estado.valor_medio, resumo_estado.top_categorias
     
     col1, col2 = st.columns(2)
     with col1:
         st.subheader("Valor Médio do Pedido por Estado (Top 15)")
-        fig = px.bar(df_state_value.head(15), 
-                      y='customer_state', x='total_order_value',
-                      orientation='h', title='Valor Médio do Pedido por Estado (Top 15)',
-                      color='customer_state',
-                      labels={'customer_state': 'Estado', 'total_order_value': 'Valor Médio do Pedido (R$)'})
-        fig.update_layout(yaxis={'categoryorder':'total ascending'}, showlegend=False)
-        st.plotly_chart(fig, use_container_width=True)
+        with trace.span('barras_valor_estado', 'figura'):
+            fig = figura('barras_valor_estado', lambda: px.bar(
+                df_state_value.head(15),
+                y='customer_state', x='total_order_value',
+                orientation='h', title='Valor Médio do Pedido por Estado (Top 15)',
+                color='customer_state',
+                labels={'customer_state': 'Estado', 'total_order_value': 'Valor Médio do Pedido (R$)'},
+            ).update_layout(yaxis={'categoryorder':'total ascending'}, showlegend=False), filtros=filtros)
+        mostrar_grafico(fig)
     with col2:
         st.subheader("Top 15 Categorias Mais Populares (Geral)")
-        fig = px.bar(top_categories_geral, 
-                      y='Categoria', x='Número de Pedidos',
-                      orientation='h', title='Top 15 Categorias Mais Populares (Geral)',
-                      color='Categoria',
-                      color_discrete_sequence=px.colors.qualitative.Vivid)
-        fig.update_layout(yaxis={'categoryorder':'total ascending'}, showlegend=False)
-        st.plotly_chart(fig, use_container_width=True)
+        with trace.span('barras_categorias', 'figura'):
+            fig = figura('barras_categorias', lambda: px.bar(
+                top_categories_geral,
+                y='Categoria', x='Número de Pedidos',
+                orientation='h', title='Top 15 Categorias Mais Populares (Geral)',
+                color='Categoria',
+                color_discrete_sequence=px.colors.qualitative.Vivid,
+            ).update_layout(yaxis={'categoryorder':'total ascending'}, showlegend=False), filtros=filtros)
+        mostrar_grafico(fig)
 
     st.markdown("""
         O gráfico de 'Valor Médio do Pedido por Estado' evidencia uma clara distinção econômica entre as regiões. Estados como Paraíba (PB), Rondônia (RO) e Piauí (PI) lideram com os tickets médios mais altos. Surpreendentemente, os estados com maior volume de vendas, como São Paulo (SP) e Rio de Janeiro (RJ), não estão no topo desta lista. O valor do frete para essas regiões é geralmente mais elevado, inflando o **total_order_value** (valor total do pedido).
@@ -307,30 +576,27 @@ elif pagina_selecionada == "Padrões Sazonais de Vendas":
     col1, col2 = st.columns(2)
     with col1:
         st.subheader("Vendas Médias por Mês (Padrão Sazonal)")
-        df_final['year'] = df_final['order_purchase_timestamp'].dt.year
-        df_final['month_name'] = df_final['order_purchase_timestamp'].dt.month_name()
-        monthly_sales_raw = df_final.groupby(['year', 'month_name'])['order_id'].nunique().reset_index()
-        average_monthly_sales = monthly_sales_raw.groupby('month_name')['order_id'].mean().reset_index()
-        months_order = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October', 'November', 'December']
-        average_monthly_sales['month_name'] = pd.Categorical(average_monthly_sales['month_name'], categories=months_order, ordered=True)
-        average_monthly_sales = average_monthly_sales.sort_values('month_name')
-        fig = px.line(average_monthly_sales, x='month_name', y='order_id', markers=True,
-                      title='Média de Pedidos por Mês (Padrão Sazonal Agregado)',
-                      labels={'month_name': 'Mês', 'order_id': 'Média de Pedidos Únicos'})
-        fig.update_traces(line_color='#EF553B')
-        st.plotly_chart(fig, use_container_width=True)
+        # Contagens mensais e por dia da semana de pedidos direto do cubo filtrado
+        with trace.span('vendas_sazonais', 'pandas'):
+            resumo_sazonal = resultado('seasonal_summary', filtros)
+        with trace.span('linha_mensal', 'figura'):
+            fig = figura('linha_mensal', lambda: px.line(
+                resumo_sazonal.media_mensal, x='month_name', y='order_id', markers=True,
+                title='Média de Pedidos por Mês (Padrão Sazonal Agregado)',
+                labels={'month_name': 'Mês', 'order_id': 'Média de Pedidos Únicos'},
+            ).update_traces(line_color='#EF553B'), filtros=filtros)
+        mostrar_grafico(fig)
     with col2:
         st.subheader("Vendas por Dia da Semana")
-        df_final['day_of_week'] = df_final['order_purchase_timestamp'].dt.day_name()
-        days_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        df_daily_sales = df_final.groupby('day_of_week')['order_id'].nunique().reindex(days_order).reset_index()
-        fig = px.bar(df_daily_sales, x='day_of_week', y='order_id',
-                      title='Número de Pedidos por Dia da Semana',
-                      color='day_of_week',
-                      color_discrete_sequence=px.colors.qualitative.Bold,
-                      labels={'day_of_week': 'Dia da Semana', 'order_id': 'Número de Pedidos'})
-        fig.update_layout(showlegend=False)
-        st.plotly_chart(fig, use_container_width=True)
+        with trace.span('barras_dia_semana', 'figura'):
+            fig = figura('barras_dia_semana', lambda: px.bar(
+                resumo_sazonal.por_dia_semana, x='day_of_week', y='order_id',
+                title='Número de Pedidos por Dia da Semana',
+                color='day_of_week',
+                color_discrete_sequence=px.colors.qualitative.Bold,
+                labels={'day_of_week': 'Dia da Semana', 'order_id': 'Número de Pedidos'},
+            ).update_layout(showlegend=False), filtros=filtros)
+        mostrar_grafico(fig)
 
     st.markdown("""
         
@@ -345,32 +611,23 @@ elif pagina_selecionada == "Avaliação por Categoria Popular":
     st.markdown('Qual é o nível de satisfação dos clientes com as categorias de produtos mais vendidas na plataforma?')
     
     # 1. Preparar os dados
-    df_categoria = df_final[['product_category_name_english', 'review_score']].copy().dropna()
-    num_categories = 10
-    top_10_popular_cats = df_categoria['product_category_name_english'].value_counts().nlargest(num_categories).index
-    df_plot = df_categoria[df_categoria['product_category_name_english'].isin(top_10_popular_cats)]
+    # Contagem de itens por categoria e nota, direto do cubo filtrado: resumo do box e
+    # estatísticas das 10 categorias mais populares
+    with trace.span('notas_por_categoria', 'pandas'):
+        resumo_categoria = resultado('category_summary', filtros, top_n=10)
     
-    # (Opcional, mas recomendado) Ordenar o gráfico pela mediana para melhor visualização
-    median_order = df_plot.groupby('product_category_name_english')['review_score'].median().sort_values(ascending=False).index
-    
-    # 2. Visualização com Boxplot
-    fig = px.box(df_plot, x='review_score', y='product_category_name_english',
-                 orientation='h',
-                 color='product_category_name_english',
-                 category_orders={'product_category_name_english': median_order},
-                 title='Distribuição das Avaliações para as 10 Categorias Mais Populares',
-                 labels={'review_score': 'Nota de Avaliação', 'product_category_name_english': 'Categoria do Produto'},
-                 points='outliers')
-    fig.update_layout(showlegend=False)
-    st.plotly_chart(fig, use_container_width=True)
+    # 2. Visualização com Boxplot (ordenado pela mediana)
+    with trace.span('box_categorias', 'figura'):
+        fig = figura('box_categorias', lambda: charts.box_from_stats(
+            resumo_categoria.box, orientation='h', order=resumo_categoria.ordem_mediana,
+            title='Distribuição das Avaliações para as 10 Categorias Mais Populares',
+            labels=('Categoria do Produto', 'Nota de Avaliação')), filtros=filtros)
+    mostrar_grafico(fig)
     
     # 3. Tabela Descritiva
     st.markdown("---")
     st.subheader("Estatísticas Descritivas por Categoria")
-    descriptive_stats = df_plot.groupby('product_category_name_english')['review_score'].agg(['mean', 'std', 'var']).reset_index()
-    descriptive_stats.columns = ['Categoria', 'Média', 'Desvio Padrão', 'Variância']
-    descriptive_stats_sorted = descriptive_stats.sort_values(by="Média", ascending=False)
-    st.dataframe(descriptive_stats_sorted)
+    mostrar_tabela(resumo_categoria.estatisticas)
 
     # 4. Análise e Discussão dos Resultados
     st.markdown("---")
@@ -386,43 +643,36 @@ elif pagina_selecionada == "Satisfação por Tipo de Pagamento":
     st.markdown("O método de pagamento escolhido pelo cliente tem alguma relação com a sua avaliação final da compra?")
     st.markdown("Análise da avaliação média e do intervalo de confiança de 95% para os principais métodos de pagamento.")
     
-    # 1. Preparação dos dados
-    df_payment_reviews = df_final[['review_score', 'payment_type']].copy().dropna()
+    # 1. Preparação dos dados e cálculos
+    # Contagem, soma e soma dos quadrados das notas por tipo de pagamento, do cubo filtrado,
+    # e o IC t de 95% de todos os tipos numa única passada
     main_payment_types = ['credit_card', 'boleto', 'voucher', 'debit_card']
-    df_payment_reviews = df_payment_reviews[df_payment_reviews['payment_type'].isin(main_payment_types)]
-    
-    # 2. Cálculos
-    agg_stats_payment = df_payment_reviews.groupby('payment_type')['review_score'].agg(['mean', 'count', 'sem']).reset_index()
-    agg_stats_payment['confidence_margin'] = agg_stats_payment.apply(
-        lambda row: stats.t.ppf(0.975, row['count'] - 1) * row['sem'] if row['count'] > 1 else 0,
-        axis=1
-    )
+    with trace.span('intervalo_confianca_t', 'scipy'):
+        agg_stats_payment = resultado('payment_summary', filtros, payment_types=main_payment_types, confidence=0.95)
     
     # 3. Visualização
-    fig = px.bar(agg_stats_payment, 
-                 y='payment_type', x='mean',
-                 error_x='confidence_margin',
-                 orientation='h',
-                 color='payment_type',
-                 title='Avaliação Média e IC (95%) por Tipo de Pagamento',
-                 labels={'payment_type': 'Tipo de Pagamento', 'mean': 'Média da Nota de Avaliação'})
-    fig.update_layout(yaxis={'categoryorder':'total ascending'}, showlegend=False)
-    st.plotly_chart(fig, use_container_width=True)
+    with trace.span('barras_pagamento', 'figura'):
+        fig = figura('barras_pagamento', lambda: px.bar(
+            agg_stats_payment,
+            y='payment_type', x='mean',
+            error_x='confidence_margin',
+            orientation='h',
+            color='payment_type',
+            title='Avaliação Média e IC (95%) por Tipo de Pagamento',
+            labels={'payment_type': 'Tipo de Pagamento', 'mean': 'Média da Nota de Avaliação'},
+        ).update_layout(yaxis={'categoryorder':'total ascending'}, showlegend=False), filtros=filtros)
+    mostrar_grafico(fig)
 
     # 4. Tabela de Dados (NOVO)
     st.markdown("---")
     st.subheader("Tabela de Dados do Gráfico")
 
-    # Calcular os limites do IC a partir da margem de erro
-    agg_stats_payment['IC Inferior'] = agg_stats_payment['mean'] - agg_stats_payment['confidence_margin']
-    agg_stats_payment['IC Superior'] = agg_stats_payment['mean'] + agg_stats_payment['confidence_margin']
-
     # Selecionar e renomear as colunas para exibição
     table_to_show = agg_stats_payment[[
         'payment_type',
         'mean',
-        'IC Inferior',
-        'IC Superior',
+        'ci_low',
+        'ci_high',
         'count'
     ]].copy()
 
@@ -437,7 +687,7 @@ elif pagina_selecionada == "Satisfação por Tipo de Pagamento":
     # Ordenar pela média
     table_to_show = table_to_show.sort_values(by="Média da Avaliação", ascending=False)
 
-    st.dataframe(table_to_show)
+    mostrar_tabela(table_to_show)
     st.write("""
 
 Esta análise investiga se o método de pagamento escolhido pelo cliente tem um impacto estatisticamente significativo na sua avaliação final. Os resultados, validados pelo teste ANOVA, mostram que **sim, a forma de pagamento influencia a satisfação**.
@@ -455,23 +705,13 @@ elif pagina_selecionada == "Análise de Fotos vs. Vendas":
     - **Hipótese Alternativa ($H_1$)**: O volume médio de vendas é **diferente**.
     """)
 
-    # 1. Preparação dos dados
-    df_analysis_base = df_final.dropna(subset=['product_id', 'product_photos_qty'])
-    
-    # Contar vendas por produto
-    df_sales = df_analysis_base.groupby('product_id')['order_id'].nunique().reset_index()
-    df_sales.columns = ['product_id', 'total_vendas']
-    
-    # Obter o número de fotos para cada produto
-    df_photos = df_analysis_base[['product_id', 'product_photos_qty']].drop_duplicates(subset=['product_id'])
-    
-    # Juntar as informações
-    df_analysis = pd.merge(df_sales, df_photos, on='product_id')
-    df_analysis.dropna(inplace=True)
-
-    # Criar os dois grupos
-    df_few_photos = df_analysis[df_analysis['product_photos_qty'] == 1]
-    df_many_photos = df_analysis[df_analysis['product_photos_qty'] > 3]
+    # 1. Preparação dos dados e teste
+    # Grupo de fotos de cada produto (1 foto, 2-3 fotos, mais de 3 fotos), as estatísticas
+    # de vendas de cada grupo numa única passada e o teste de Welch entre os extremos
+    with trace.span('vendas_por_grupo_de_fotos', 'pandas'):
+        resumo_fotos = resultado('photo_summary', few=1, many=3)
+    grupos_fotos, stats_fotos = resumo_fotos.grupos, resumo_fotos.estatisticas
+    few_photos, many_photos = stats_fotos.loc[grupos_fotos[0]], stats_fotos.loc[grupos_fotos[2]]
 
 
     st.markdown("""### Justificativa da Análise
@@ -482,14 +722,13 @@ Esta análise investiga uma das hipóteses mais importantes para o sucesso em e-
     st.markdown("---")
     st.subheader("Resultados do Teste T")
     
-    if len(df_few_photos) < 2 or len(df_many_photos) < 2:
+    if np.isnan(resumo_fotos.p_value):
         st.warning("Não há dados suficientes para realizar a comparação.")
     else:
-        t_stat, p_value = stats.ttest_ind(df_few_photos['total_vendas'], df_many_photos['total_vendas'], equal_var=False)
-        
+        p_value = resumo_fotos.p_value
         col1, col2, col3 = st.columns(3)
-        col1.metric("Média de Vendas (1 Foto)", f"{df_few_photos['total_vendas'].mean():.2f}")
-        col2.metric("Média de Vendas (>3 Fotos)", f"{df_many_photos['total_vendas'].mean():.2f}")
+        col1.metric("Média de Vendas (1 Foto)", f"{few_photos['mean']:.2f}")
+        col2.metric("Média de Vendas (>3 Fotos)", f"{many_photos['mean']:.2f}")
         col3.metric("Valor-p", f"{p_value:.4f}")
 
         if p_value < 0.05:
@@ -497,43 +736,42 @@ Esta análise investiga uma das hipóteses mais importantes para o sucesso em e-
         else:
             st.warning("**Conclusão:** Não Rejeitamos a Hipótese Nula. Não há evidências de que o número de fotos influencie o volume de vendas.")
 
+        # As vendas por produto são muito assimétricas: bootstrap e permutação não dependem
+        # da aproximação normal do teste t
+        config_reamostragem = opcoes_reamostragem()
+        if config_reamostragem:
+            # Memorizado pela impressão digital dos dados, grupos, reamostras e semente
+            with trace.span('reamostragem', 'scipy'):
+                with st.spinner("Reamostrando..."):
+                    reamostragem = aggregates.photo_resampling(fonte, resumo_fotos,
+                                                               few=1, many=3, **config_reamostragem)
+            ic_few, ic_many, p_perm = reamostragem.ic_poucas, reamostragem.ic_muitas, reamostragem.p_permutacao
+            col1, col2, col3 = st.columns(3)
+            col1.metric("IC Bootstrap 95% (1 Foto)", f"{ic_few[0]:.2f} – {ic_few[1]:.2f}")
+            col2.metric("IC Bootstrap 95% (>3 Fotos)", f"{ic_many[0]:.2f} – {ic_many[1]:.2f}")
+            col3.metric("Valor-p (Permutação)", f"{p_perm:.4f}")
+
     # 3. Visualização com Boxplot
     st.markdown("---")
     st.subheader("Distribuição do Volume de Vendas por Quantidade de Fotos")
     
-    # Adicionar uma coluna para facilitar a plotagem
-    df_analysis['grupo_fotos'] = '2-3 Fotos' # Grupo intermediário
-    df_analysis.loc[df_analysis['product_photos_qty'] == 1, 'grupo_fotos'] = '1 Foto'
-    df_analysis.loc[df_analysis['product_photos_qty'] > 3, 'grupo_fotos'] = '> 3 Fotos'
-    
-    fig = px.box(df_analysis, 
-                 x='grupo_fotos', 
-                 y='total_vendas',
-                 color='grupo_fotos',
-                 log_y=True, # Usar escala logarítmica para melhor visualização
-                 category_orders={'grupo_fotos': ['1 Foto', '2-3 Fotos', '> 3 Fotos']},
-                 title='Distribuição de Vendas por Quantidade de Fotos',
-                 labels={'grupo_fotos': 'Quantidade de Fotos no Anúncio', 'total_vendas': 'Total de Vendas (Escala Log)'}
-                 )
-    fig.update_layout(showlegend=False)
-    st.plotly_chart(fig, use_container_width=True)
+    box_fotos = resumo_fotos.box
+    with trace.span('box_fotos', 'figura'):
+        fig = figura('box_fotos', lambda: charts.box_from_stats(
+            box_fotos,
+            order=[g for g in grupos_fotos if g in box_fotos.index],
+            log_axis=True, # Usar escala logarítmica para melhor visualização
+            title='Distribuição de Vendas por Quantidade de Fotos',
+            labels=('Quantidade de Fotos no Anúncio', 'Total de Vendas (Escala Log)')))
+    mostrar_grafico(fig)
 # --- TABELA DE MEDIDAS ESTATÍSTICAS (ATUALIZADA) ---
     st.markdown("---")
     st.subheader("Tabela de Estatísticas Descritivas (Volume de Vendas)")
-    # Função para calcular a moda de forma segura
-    def get_mode(x):
-        return x.mode()[0] if not x.mode().empty else np.nan
-        
-    # Agrupar e calcular as métricas solicitadas
-    summary_stats = df_analysis.groupby('grupo_fotos')['total_vendas'].agg(['mean', 'median', get_mode, 'std', 'var']).reset_index()
+    # As métricas já saíram do motor de estatísticas por grupo, na ordem do gráfico
+    summary_stats = stats_fotos.dropna(subset=['count'])[['mean', 'median', 'mode', 'std', 'var']].rename_axis('Grupo de Fotos').reset_index()
     summary_stats.columns = ['Grupo de Fotos', 'Média', 'Mediana', 'Moda', 'Desvio Padrão', 'Variância']
     
-    # Reordenar as linhas para corresponder à ordem do gráfico
-    order = ['1 Foto', '2-3 Fotos', '> 3 Fotos']
-    summary_stats['Grupo de Fotos'] = pd.Categorical(summary_stats['Grupo de Fotos'], categories=order, ordered=True)
-    summary_stats = summary_stats.sort_values('Grupo de Fotos')
-    
-    st.dataframe(summary_stats)
+    mostrar_tabela(summary_stats)
     st.write("""
 
 ---
@@ -557,17 +795,45 @@ elif pagina_selecionada == "Qui-Quadrado (Categoria vs. Estado)":
     """)
     st.markdown("---")
 
-    df_chi = df_final.dropna(subset=['customer_state', 'product_category_name_english'])
-    top_10_states = df_chi['customer_state'].value_counts().nlargest(10).index
-    top_10_categories = df_chi['product_category_name_english'].value_counts().nlargest(10).index
-    df_filtered = df_chi[(df_chi['customer_state'].isin(top_10_states)) & (df_chi['product_category_name_english'].isin(top_10_categories))]
-    contingency_table = pd.crosstab(df_filtered['customer_state'], df_filtered['product_category_name_english'])
-    chi2, p_value, dof, expected = stats.chi2_contingency(contingency_table)
+    resolucao_completa = st.toggle("Resolução completa (todos os estados × todas as categorias)", key="qui_completo")
+    # Tabela de contingência de itens por estado e categoria (Top 10 x Top 10 ou completa),
+    # direto do cubo filtrado
+    with trace.span('tabela_contingencia', 'pandas'):
+        resumo_contingencia = resultado('contingency_summary', filtros, full=resolucao_completa, top_n=10)
+    contingency_table = resumo_contingencia.tabela
+
+    # Na resolução completa muitas células têm contagem esperada baixa: ou as categorias
+    # raras são agrupadas em "outros" ou o valor-p vem do teste de Monte Carlo
+    agrupar_esparsas = False
+    usar_monte_carlo = False
+    if resumo_contingencia.esparsa:
+        tratamento = st.radio("Tratamento das células esparsas", ["Agrupar categorias raras", "Monte Carlo"],
+                              horizontal=True, key="qui_esparsas")
+        agrupar_esparsas = tratamento == "Agrupar categorias raras"
+        usar_monte_carlo = not agrupar_esparsas
+    with trace.span('qui_quadrado', 'scipy'):
+        teste_qui = resultado('chi_square', filtros, full=resolucao_completa, top_n=10, merge_sparse=agrupar_esparsas)
+    chi2, p_value = teste_qui.chi2, teste_qui.p_value
+    if agrupar_esparsas:
+        st.caption(f"Teste sobre {teste_qui.tabela_teste.shape[0]} estados × {teste_qui.tabela_teste.shape[1]} categorias "
+                   f"(as menos frequentes agrupadas em 'Outros'/'outras').")
     
     st.subheader("Resultados do Teste")
     col1, col2 = st.columns(2)
     col1.metric("Estatística Qui-Quadrado (χ²)", f"{chi2:.2f}")
-    col2.metric("Valor-p", f"{p_value:.4f}")
+    col2.metric("Valor-p (assintótico)" if usar_monte_carlo else "Valor-p", f"{p_value:.4f}")
+
+    config_reamostragem = opcoes_reamostragem()
+    if config_reamostragem or usar_monte_carlo:
+        # Valor-p Monte Carlo: não depende da aproximação assintótica do qui-quadrado
+        config_monte_carlo = config_reamostragem or {'n_resamples': resampling.DEFAULT_RESAMPLES, 'seed': 42, 'workers': 1}
+        with trace.span('qui_quadrado_monte_carlo', 'scipy'):
+            with st.spinner("Reamostrando..."):
+                p_monte_carlo = aggregates.chi_square_monte_carlo(fonte, contingency_table, filtros,
+                                                                  full=resolucao_completa, top_n=10, **config_monte_carlo)
+        st.metric("Valor-p (Monte Carlo)", f"{p_monte_carlo:.4f}")
+        if usar_monte_carlo:
+            p_value = p_monte_carlo
     
     # --- Análise do Resultado Adicionada ---
     st.subheader("Análise do Resultado")
@@ -580,16 +846,49 @@ elif pagina_selecionada == "Qui-Quadrado (Categoria vs. Estado)":
 
     st.markdown("---")
     st.subheader("Heatmap da Contagem de Pedidos por Categoria e Estado")
-    fig = px.imshow(contingency_table, text_auto=True,
-                      color_continuous_scale='Plasma',
-                      title='Contagem de Pedidos por Categoria e Estado (Top 10)',
-                      labels={'x': 'Categoria do Produto', 'y': 'Estado do Cliente'})
-    fig.update_layout(height=700)
-    st.plotly_chart(fig, use_container_width=True)
+    # Os números dentro das células só cabem em tabelas pequenas; na resolução completa
+    # os valores ficam no hover e a altura acompanha o número de estados
+    n_estados, n_categorias = contingency_table.shape
+    with trace.span('heatmap', 'figura'):
+        fig = figura('heatmap', lambda: px.imshow(
+            contingency_table, text_auto=max(n_estados, n_categorias) <= 15,
+            color_continuous_scale='Plasma',
+            title=f"Contagem de Pedidos por Categoria e Estado ({'Completo' if resolucao_completa else 'Top 10'})",
+            labels={'x': 'Categoria do Produto', 'y': 'Estado do Cliente'},
+        ).update_layout(height=max(700, 28 * n_estados)), filtros=filtros, completa=resolucao_completa)
+    mostrar_grafico(fig)
 
     with st.expander("Ver Tabela de Contingência Completa (Dados do Gráfico)"):
-        st.dataframe(contingency_table)
+        mostrar_tabela(contingency_table)
 
     st.markdown("""
         Vemos "hotspots" (células de cor clara) muito claros. São Paulo (SP), por ser o maior mercado, domina em volume absoluto em quase todas as top 10 categorias. No entanto, o interessante é observar as proporções. Por exemplo, a popularidade de **'cama_mesa_banho'** em SP é gigantesca, enquanto outros estados podem ter uma preferência maior por **'esporte_lazer'** ou **'beleza_saude'** em relação a sua própria base de clientes.
     """)
+
+# --- AQUECIMENTO DAS OUTRAS PÁGINAS ---
+# Depois que a página da tela já foi desenhada, as análises das outras páginas (com os
+# filtros atuais) vão para uma thread de fundo, das mais visitadas para as menos
+# (`olist.warmup`); os resultados ficam na memória de `olist.aggregates`, e trocar de aba
+# encontra a conta pronta. Reagendado só quando os dados ou os filtros mudam
+if pacote is None and warmup.ENABLED:
+    if st.session_state.get('pagina_registrada') != pagina_selecionada:
+        st.session_state['pagina_registrada'] = pagina_selecionada
+        warmup.record_visit(pagina_selecionada)
+    chave_aquecimento = (fonte.fingerprint, aggregates.freeze(filtros))
+    if st.session_state.get('aquecimento') != chave_aquecimento:
+        st.session_state['aquecimento'] = chave_aquecimento
+        with trace.span('agendar_aquecimento', 'cache'):
+            warmup.schedule(st.session_state['sessao'], resultado,
+                            warmup.page_order(lista_de_paginas, pagina_selecionada), filtros)
+
+# --- DIAGNÓSTICO DE DESEMPENHO ---
+if trace.enabled:
+    registros = trace.records(pagina_selecionada)
+    tracing.append_records(registros)
+    with st.expander("Diagnóstico de desempenho"):
+        por_categoria = tracing.by_category(registros)
+        colunas = st.columns(len(por_categoria) + 1)
+        colunas[0].metric("Renderização", f"{registros[-1]['duracao_ms']:.0f} ms")
+        for coluna, (categoria, duracao_ms) in zip(colunas[1:], por_categoria.items()):
+            coluna.metric(tracing.CATEGORIES[categoria], f"{duracao_ms:.0f} ms")
+        st.dataframe(tracing.report(registros))
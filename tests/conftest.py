@@ -0,0 +1,19 @@
+# Dataset sintético dividido pelos testes da sessão. Da raiz do repositório:
+#   python -m pytest tests
+import pytest
+
+from olist import ingest, synthetic
+from tests.helpers import SCALE, SEED, chdir
+
+
+@pytest.fixture(scope='session')
+def csv_dir(tmp_path_factory):
+    path = tmp_path_factory.mktemp('csvs')
+    synthetic.generate(SCALE, str(path), SEED)
+    return path
+
+
+@pytest.fixture(scope='session')
+def dados(csv_dir):
+    with chdir(csv_dir):
+        return ingest.load_tables(str(csv_dir / 'cache'))
@@ -0,0 +1,18 @@
+# Utilidades dos testes.
+import os
+from contextlib import contextmanager
+
+# Dados sintéticos pequenos (`olist.synthetic`): ~300 pedidos
+SCALE = 0.003
+SEED = 0
+
+
+@contextmanager
+def chdir(path):
+    # `olist.ingest` lê os CSVs do diretório atual, como o app
+    cwd = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(cwd)
@@ -0,0 +1,75 @@
+# Os três backends dos cubos (`olist.cube`, `olist.streaming` e `olist.sqlcube`) dão os
+# mesmos totais, momentos e filtros: categoria principal = a do item mais caro, filtro de
+# pagamento = algum dos tipos usados, código -1 = ausente.
+import os
+
+import pandas as pd
+import pytest
+
+from olist import cube, ingest, sqlcube, streaming
+
+FILTERS = [
+    {},
+    {'customer_state': ['SP', 'RJ']},
+    {'payment_type': ['boleto']},
+    {'payment_type': ['voucher', 'debit_card']},
+    {'product_category_name_english': ['categoria_00', 'categoria_01', 'categoria_02']},
+    {'customer_state': ['SP'], 'payment_type': ['credit_card'], 'review_score': [1, 5]},
+]
+
+
+@pytest.fixture(scope='module')
+def cubos(dados):
+    return cube.build_cubes(dados)
+
+
+@pytest.fixture(scope='module', params=['streaming', 'duckdb'])
+def outros(request, dados, csv_dir):
+    if request.param == 'duckdb':
+        pytest.importorskip('duckdb')
+        return sqlcube.connect(dados, str(csv_dir / 'cache'))
+    # Partições pequenas: vários pedaços combinados com `merge_cubes`
+    analise = str(csv_dir / ingest.ANALISE_CSV)
+    return streaming.build_cubes(analise, str(csv_dir / ingest.PAGAMENTOS_CSV), chunksize=200,
+                                 partition_bytes=os.path.getsize(analise) // 4, cache_dir=str(csv_dir / 'cache'))
+
+
+def _same(obtido, esperado):
+    obtido = obtido.sort_index()
+    esperado = esperado.sort_index()
+    if isinstance(esperado, pd.DataFrame):
+        obtido = obtido.sort_index(axis=1)
+        esperado = esperado.sort_index(axis=1)
+        pd.testing.assert_frame_equal(obtido, esperado, check_dtype=False, check_index_type=False,
+                                      check_column_type=False, check_names=False)
+    else:
+        pd.testing.assert_series_equal(obtido, esperado, check_dtype=False, check_index_type=False, check_names=False)
+
+
+def test_labels_match(cubos, outros):
+    for name in ('itens', 'pedidos', 'pagamentos'):
+        for dim, labels in getattr(cubos, name).labels.items():
+            assert sorted(getattr(outros, name).labels[dim].tolist()) == sorted(labels.tolist()), (name, dim)
+
+
+@pytest.mark.parametrize('filters', FILTERS, ids=lambda f: ','.join(f) or 'sem_filtro')
+@pytest.mark.parametrize('name', ['itens', 'pedidos', 'pagamentos'])
+def test_totals_and_moments_match(cubos, outros, name, filters):
+    esperado = getattr(cubos.where(**filters), name)
+    obtido = getattr(outros.where(**filters), name)
+    assert obtido.empty == esperado.empty
+    measure = esperado.measures[0]
+    dims = [dim for dim in esperado.labels if dim not in esperado.set_dims]
+    for dim in dims:
+        for column in ('count', f'{measure}_n', f'{measure}_sum', f'{measure}_sumsq'):
+            _same(obtido.total(dim, column), esperado.total(dim, column))
+    _same(obtido.total(['customer_state', 'product_category_name_english']),
+          esperado.total(['customer_state', 'product_category_name_english']))
+    _same(obtido.moments('product_category_name_english', 'review_score'),
+          esperado.moments('product_category_name_english', 'review_score'))
+
+
+def test_repeated_filters_combine(cubos, outros):
+    esperado = cubos.where(customer_state=['SP', 'RJ']).where(payment_type=['boleto'])
+    obtido = outros.where(customer_state=['SP', 'RJ']).where(payment_type=['boleto'])
+    _same(obtido.pedidos.total('review_score'), esperado.pedidos.total('review_score'))
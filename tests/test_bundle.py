@@ -0,0 +1,69 @@
+# Cada resultado do pacote (`olist.bundle`), lido de volta do disco, é igual ao
+# calculado na hora.
+import dataclasses
+import json
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from olist import bundle, cube
+
+
+def assert_same(obtido, esperado, path='resultado'):
+    # Escalares do numpy voltam como escalares do Python (o JSON do manifesto); o resto
+    # volta no mesmo tipo
+    if not isinstance(esperado, (np.generic, int, float, str, type(None))):
+        assert type(obtido) is type(esperado), path
+    if dataclasses.is_dataclass(esperado):
+        for field in dataclasses.fields(esperado):
+            assert_same(getattr(obtido, field.name), getattr(esperado, field.name), f'{path}.{field.name}')
+    elif isinstance(esperado, pd.DataFrame):
+        pd.testing.assert_frame_equal(obtido, esperado, obj=path)
+    elif isinstance(esperado, pd.Series):
+        pd.testing.assert_series_equal(obtido, esperado, obj=path)
+    elif isinstance(esperado, pd.Index):
+        pd.testing.assert_index_equal(obtido, esperado, obj=path)
+    elif isinstance(esperado, np.ndarray):
+        np.testing.assert_array_equal(obtido, esperado, err_msg=path)
+        assert obtido.dtype == esperado.dtype, path
+    elif isinstance(esperado, (tuple, list)):
+        assert len(obtido) == len(esperado), path
+        for i, (a, b) in enumerate(zip(obtido, esperado)):
+            assert_same(a, b, f'{path}[{i}]')
+    elif isinstance(esperado, dict):
+        assert obtido.keys() == esperado.keys(), path
+        for key in esperado:
+            assert_same(obtido[key], esperado[key], f'{path}[{key!r}]')
+    else:
+        assert obtido == esperado or (pd.isna(obtido) and pd.isna(esperado)), path
+
+
+@pytest.fixture(scope='module')
+def cubos(dados):
+    return cube.build_cubes(dados)
+
+
+@pytest.fixture(scope='module')
+def pacote(dados, cubos, tmp_path_factory):
+    output = str(tmp_path_factory.mktemp('bundle') / 'bundle')
+    bundle.build(dados, cubos, output)
+    return bundle.open_bundle(output)
+
+
+@pytest.mark.parametrize('name, kwargs', bundle.page_calls(),
+                         ids=[bundle.result_key(name, **kwargs) for name, kwargs in bundle.page_calls()])
+def test_round_trip(pacote, dados, cubos, name, kwargs):
+    esperado = bundle.compute(name, dados, cubos, **kwargs)
+    assert_same(pacote.result(name, **kwargs), esperado)
+
+
+def test_other_version_is_rejected(pacote, tmp_path):
+    copia = tmp_path / 'copia'
+    shutil.copytree(pacote.path, copia)
+    manifest = json.loads((copia / bundle.MANIFEST_NAME).read_text(encoding='utf-8'))
+    manifest['versao'] = bundle.BUNDLE_VERSION + 1
+    (copia / bundle.MANIFEST_NAME).write_text(json.dumps(manifest), encoding='utf-8')
+    with pytest.raises(ValueError):
+        bundle.open_bundle(str(copia))
@@ -0,0 +1,112 @@
+# `olist.cube` com células montadas à mão: filtro de máscara de bits do tipo de
+# pagamento, código -1 (ausente) e a recodificação dos rótulos em `merge_cube`.
+import numpy as np
+import pandas as pd
+import pytest
+
+from olist import cube
+
+# Bits do tipo de pagamento na ordem dos rótulos
+BOLETO, CREDIT_CARD, VOUCHER = 1, 2, 4
+
+
+def _cube(cells, states=('RJ', 'SP'), payments=('boleto', 'credit_card', 'voucher')):
+    cells = pd.DataFrame(cells, columns=['customer_state', 'payment_type', 'review_score', 'count',
+                                         'price_n', 'price_sum', 'price_sumsq'])
+    for dim in ('customer_state', 'payment_type', 'review_score'):
+        cells[dim] = cells[dim].astype(np.int32)
+    labels = {'customer_state': pd.Index(list(states)), 'payment_type': pd.Index(list(payments)),
+              'review_score': pd.Index([1.0, 5.0])}
+    return cube.Cube(cells=cells, labels=labels, measures=('price',), set_dims=('payment_type',))
+
+
+@pytest.fixture
+def itens():
+    return _cube([
+        # estado, pagamento, nota, count, price_n, price_sum, price_sumsq
+        [0, BOLETO, 0, 1, 1, 10.0, 100.0],
+        [1, BOLETO | CREDIT_CARD, 1, 2, 2, 30.0, 500.0],
+        [-1, VOUCHER, 1, 3, 2, 20.0, 200.0],
+        [1, 0, -1, 4, 4, 40.0, 400.0],
+    ])
+
+
+def test_total_skips_missing_codes_of_the_grouped_dimension(itens):
+    pd.testing.assert_series_equal(itens.total('customer_state'),
+                                   pd.Series([1.0, 6.0], index=itens.labels['customer_state'], name='count'))
+    # A célula sem estado entra no total por nota; a sem nota, no total por estado
+    pd.testing.assert_series_equal(itens.total('review_score'),
+                                   pd.Series([1.0, 5.0], index=itens.labels['review_score'], name='count'))
+    assert itens.total('customer_state', 'price_sum').tolist() == [10.0, 70.0]
+
+
+def test_total_by_two_dimensions_keeps_zero_labels(itens):
+    tabela = itens.total(['customer_state', 'review_score'])
+    assert tabela.to_numpy().tolist() == [[1.0, 0.0], [0.0, 2.0]]
+
+
+def test_missing_codes_leave_only_when_the_dimension_is_filtered(itens):
+    assert itens.where(customer_state=[]).cells['count'].sum() == 10
+    assert itens.where(customer_state=None).cells['count'].sum() == 10
+    assert itens.where(customer_state=['RJ', 'SP']).cells['count'].sum() == 7
+    assert itens.where(review_score=[1.0, 5.0]).cells['count'].sum() == 6
+
+
+def test_unknown_labels_select_nothing(itens):
+    assert itens.where(customer_state=['MG']).empty
+    assert itens.where(customer_state=['MG', 'RJ']).cells['count'].sum() == 1
+
+
+def test_payment_filter_selects_orders_that_used_any_type(itens):
+    assert itens.where(payment_type=['credit_card']).cells['count'].tolist() == [2]
+    assert itens.where(payment_type=['boleto']).cells['count'].tolist() == [1, 2]
+    assert itens.where(payment_type=['boleto', 'voucher']).cells['count'].tolist() == [1, 2, 3]
+    # Pedido sem pagamento (máscara 0) só sai quando o tipo é filtrado
+    assert itens.where(payment_type=['boleto', 'credit_card', 'voucher']).cells['count'].sum() == 6
+
+
+def test_filters_combine(itens):
+    filtrado = itens.where(customer_state=['SP']).where(payment_type=['boleto'])
+    assert filtrado.cells['count'].tolist() == [2]
+    assert itens.where(customer_state=['SP'], payment_type=['boleto']).cells['count'].tolist() == [2]
+
+
+def test_set_dimension_cannot_be_grouped(itens):
+    with pytest.raises(ValueError):
+        itens.total('payment_type')
+
+
+def test_moments(itens):
+    momentos = itens.moments('customer_state', 'review_score')
+    assert momentos['count'].tolist() == [1.0, 2.0]
+    assert momentos['sum'].tolist() == [1.0, 10.0]
+    assert momentos['sumsq'].tolist() == [1.0, 50.0]
+
+
+def test_merge_cube_recodes_labels_and_masks():
+    a = _cube([[0, BOLETO | CREDIT_CARD, 0, 1, 1, 10.0, 100.0],
+               [1, CREDIT_CARD, 1, 2, 2, 20.0, 200.0]],
+              states=('RJ', 'SP'), payments=('boleto', 'credit_card'))
+    # No segundo cubo, SP e credit_card têm outros códigos
+    b = _cube([[1, 1, 1, 3, 3, 30.0, 300.0],
+               [0, 1 | 2, -1, 4, 4, 40.0, 400.0]],
+              states=('MG', 'SP'), payments=('credit_card', 'voucher'))
+    merged = cube.merge_cube(a, b)
+
+    assert merged.labels['customer_state'].tolist() == ['MG', 'RJ', 'SP']
+    assert merged.labels['payment_type'].tolist() == ['boleto', 'credit_card', 'voucher']
+    # As células (SP, credit_card, nota 5) dos dois cubos viram uma só
+    assert len(merged.cells) == 3
+    assert merged.total('customer_state').tolist() == [4.0, 1.0, 5.0]
+    assert merged.total('customer_state', 'price_sum').tolist() == [40.0, 10.0, 50.0]
+    assert merged.where(payment_type=['voucher']).total('customer_state').tolist() == [4.0, 0.0, 0.0]
+    assert merged.where(payment_type=['credit_card']).total('customer_state').tolist() == [4.0, 1.0, 5.0]
+    assert merged.where(payment_type=['boleto']).total('customer_state').tolist() == [0.0, 1.0, 0.0]
+    # O código -1 continua ausente depois da recodificação
+    assert merged.total('review_score').tolist() == [1.0, 5.0]
+
+
+def test_union_labels_keeps_the_first_dtype():
+    notas = cube._union_labels(pd.Index([1.0, 5.0], dtype=np.float32), pd.Index([3, 5]))
+    assert notas.dtype == np.float32
+    assert notas.tolist() == [1.0, 3.0, 5.0]
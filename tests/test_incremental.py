@@ -0,0 +1,106 @@
+# Lotes sobrepostos aplicados com `olist.incremental.append` dão os mesmos resumos que
+# montar tudo de novo sobre a união dos pedidos.
+import numpy as np
+import pandas as pd
+import pytest
+
+from olist import cube, incremental, ingest, sketches, synthetic
+from tests.helpers import SCALE, SEED, chdir
+
+QUANTILES = [0.0, 0.25, 0.5, 0.75, 0.99, 1.0]
+
+
+def _write(rows, payments, order_ids, path, prefix):
+    analise = path / f'{prefix}_analise.csv'
+    pagamentos = path / f'{prefix}_pagamentos.csv'
+    rows[rows['order_id'].isin(order_ids)].to_csv(analise, index=False)
+    payments[payments['order_id'].isin(order_ids)].to_csv(pagamentos, index=False)
+    return str(analise), str(pagamentos)
+
+
+@pytest.fixture(scope='module')
+def lotes(tmp_path_factory):
+    # Base com metade dos pedidos e dois lotes que repetem parte do anterior
+    path = tmp_path_factory.mktemp('incremental')
+    synthetic.generate(SCALE, str(path / 'todos'), SEED)
+    rows = pd.read_csv(path / 'todos' / ingest.ANALISE_CSV)
+    payments = pd.read_csv(path / 'todos' / ingest.PAGAMENTOS_CSV)
+    orders = rows['order_id'].unique()
+    n = len(orders)
+    base, lote1, lote2 = orders[:n // 2], orders[n // 3:3 * n // 4], orders[2 * n // 3:]
+
+    base_dir = path / 'base'
+    base_dir.mkdir()
+    rows[rows['order_id'].isin(base)].to_csv(base_dir / ingest.ANALISE_CSV, index=False)
+    payments[payments['order_id'].isin(base)].to_csv(base_dir / ingest.PAGAMENTOS_CSV, index=False)
+    return {'base_dir': base_dir, 'cache_dir': str(base_dir / 'cache'),
+            'lotes': [_write(rows, payments, ids, path, f'lote{i}') for i, ids in enumerate((lote1, lote2), 1)],
+            'uniao': ingest.compact_data(*ingest.read_sources(str(path / 'todos' / ingest.ANALISE_CSV),
+                                                              str(path / 'todos' / ingest.PAGAMENTOS_CSV)))}
+
+
+@pytest.fixture(scope='module')
+def aplicados(lotes):
+    with chdir(lotes['base_dir']):
+        relatorios = [incremental.append(*lote, cache_dir=lotes['cache_dir']) for lote in lotes['lotes']]
+    return relatorios, incremental.load_summaries(relatorios[-1]['chave'], lotes['cache_dir'])
+
+
+def test_overlapping_orders_are_skipped(aplicados):
+    relatorios, _ = aplicados
+    assert all(r['aplicado'] for r in relatorios)
+    assert all(r['linhas_repetidas'] > 0 for r in relatorios)
+
+
+@pytest.mark.parametrize('name', ['itens', 'pedidos', 'pagamentos'])
+def test_cubes_match_rebuild(aplicados, lotes, name):
+    _, resumos = aplicados
+    esperado = getattr(cube.build_cubes(lotes['uniao']), name)
+    obtido = getattr(resumos.cubes, name)
+    for dim in esperado.labels:
+        if dim in esperado.set_dims:
+            continue
+        for column in ['count'] + [f'{esperado.measures[0]}_{s}' for s in ('n', 'sum', 'sumsq')]:
+            pd.testing.assert_series_equal(obtido.total(dim, column).sort_index(), esperado.total(dim, column).sort_index(),
+                                           check_index_type=False, check_exact=False)
+    tipos = esperado.labels['payment_type']
+    for tipo in tipos:
+        pd.testing.assert_series_equal(obtido.where(payment_type=[tipo]).total('customer_state'),
+                                       esperado.where(payment_type=[tipo]).total('customer_state'),
+                                       check_index_type=False)
+
+
+def test_moments_and_quantiles_match_rebuild(aplicados, lotes):
+    _, resumos = aplicados
+    itens = lotes['uniao'].itens
+    for momentos, column in ((resumos.preco, 'price'), (resumos.frete, 'freight_value')):
+        valores = itens[column].dropna()
+        assert momentos.n == len(valores)
+        assert momentos.mean == pytest.approx(valores.mean())
+        assert momentos.std == pytest.approx(valores.std())
+    r = resumos.preco_frete.ols_fit()['r']
+    assert r == pytest.approx(np.corrcoef(itens['price'], itens['freight_value'])[0, 1])
+
+    for sketch, column in ((resumos.quantis_preco, 'price'), (resumos.quantis_frete, 'freight_value')):
+        assert sketch.n == itens[column].notna().sum()
+        for q in QUANTILES:
+            exato = itens[column].quantile(q)
+            assert abs(sketch.quantile(q) - exato) <= sketches.SKETCH_ALPHA * exato + 1e-9
+
+
+def test_reapplying_a_batch_is_a_noop(aplicados, lotes):
+    relatorios, _ = aplicados
+    with chdir(lotes['base_dir']):
+        relatorio = incremental.append(*lotes['lotes'][-1], cache_dir=lotes['cache_dir'])
+    assert relatorio['aplicado'] is False
+    assert relatorio['chave'] == relatorios[-1]['chave']
+
+
+def test_sketch_merge_equals_sketch_of_union():
+    rng = np.random.default_rng(0)
+    a, b = rng.lognormal(4, 1, 1000), np.r_[rng.lognormal(3, 1, 500), np.zeros(10)]
+    merged = sketches.QuantileSketch.from_values(a).merge(sketches.QuantileSketch.from_values(b))
+    union = sketches.QuantileSketch.from_values(np.r_[a, b])
+    np.testing.assert_array_equal(merged.keys, union.keys)
+    np.testing.assert_array_equal(merged.counts, union.counts)
+    assert merged.zeros == union.zeros == 10